@@ -0,0 +1,31 @@
+# gunicorn.conf.py (lido automaticamente pelo gunicorn a partir de backend/)
+"""
+Modo multiprocess do prometheus_client: cada worker grava suas métricas em
+arquivos no PROMETHEUS_MULTIPROC_DIR e /metrics agrega o diretório inteiro
+(ver twitter_clone/metrics.py).
+"""
+import os
+import shutil
+import tempfile
+
+# Precisa estar no ambiente antes de qualquer import do prometheus_client (o
+# modo de armazenamento é escolhido no import e herdado pelos workers no fork)
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "twitter_clone_metrics")
+)
+
+# Importado aqui, e não dentro do child_exit: o hook roda no handler de SIGCHLD
+# e podia interromper o próprio import ("partially initialized module")
+from prometheus_client import multiprocess  # noqa: E402
+
+
+def on_starting(server):
+    # Arquivos de uma execução anterior somariam contadores antigos
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Gauges "live" do worker morto deixam de ser exportados
+    multiprocess.mark_process_dead(worker.pid)
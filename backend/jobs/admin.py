@@ -0,0 +1,17 @@
+from django.contrib import admin
+
+from .models import Job
+from .queue import requeue
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'attempts', 'run_at', 'locked_by', 'created_at']
+    list_filter = ['status', 'name']
+    search_fields = ['key', 'last_error']
+    readonly_fields = ['created_at', 'locked_by', 'locked_until', 'last_error']
+    actions = ['retry']
+
+    @admin.action(description='Reenfileirar')
+    def retry(self, request, queryset):
+        requeue(queryset)
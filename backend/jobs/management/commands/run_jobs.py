@@ -0,0 +1,52 @@
+# jobs/management/commands/run_jobs.py
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from prometheus_client import start_http_server
+
+from jobs import queue
+from jobs.models import Job
+from jobs.worker import Worker
+from twitter_clone.metrics import registry
+
+
+class Command(BaseCommand):
+    help = "Executa os jobs da fila do banco (jobs/queue.py) num pool de threads ou processos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'JOBS_CONCURRENCY', 4),
+                            help="Jobs executados ao mesmo tempo.")
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                            help="thread: jobs de banco/IO; process: jobs de CPU (ex.: avatares).")
+        parser.add_argument('--queue', dest='names', action='append', metavar='NAME',
+                            help="Só jobs com este nome (pode repetir).")
+        parser.add_argument('--once', action='store_true', help="Sai quando não houver mais jobs prontos.")
+        parser.add_argument('--metrics-port', type=int, help="Expõe as métricas dos jobs para o Prometheus.")
+        parser.add_argument('--stats', action='store_true', help="Mostra a fila por tipo de job e sai.")
+        parser.add_argument('--retry-failed', action='store_true', help="Reenfileira os jobs que falharam e sai.")
+
+    def handle(self, *args, concurrency, pool, names, once, metrics_port, stats, retry_failed, **options):
+        if stats:
+            for name, counts in queue.stats().items():
+                self.stdout.write(
+                    f"{name}: {counts['queued']} na fila, {counts['running']} rodando, "
+                    f"{counts['failed']} falharam, mais antigo há {counts['oldest']:.1f}s"
+                )
+            return
+        if retry_failed:
+            failed = Job.objects.filter(status=Job.FAILED)
+            if names:
+                failed = failed.filter(name__in=names)
+            self.stdout.write(f"{queue.requeue(failed)} jobs reenfileirados.")
+            return
+
+        if metrics_port:
+            start_http_server(metrics_port, registry=registry())
+        worker = Worker(concurrency=concurrency, pool=pool, names=names,
+                        poll_interval=getattr(settings, 'JOBS_POLL_INTERVAL', 1.0))
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(f"Worker {worker.id}: pool de {pool} com {concurrency} slots.")
+        processed = worker.run(once=once)
+        self.stdout.write(f"{processed} jobs executados.")
@@ -0,0 +1,36 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Tarefa adiada, executada por `manage.py run_jobs` (ver jobs/queue.py)."""
+    QUEUED, RUNNING, FAILED = 'queued', 'running', 'failed'
+    STATUS_CHOICES = [(s, s) for s in (QUEUED, RUNNING, FAILED)]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # Deduplicação: só um job na fila por chave (ex.: consolidar os likes de um tweet)
+    key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    # Próxima execução: agora, um `delay` pedido no enqueue ou o backoff de um retry
+    run_at = models.DateTimeField(default=timezone.now)
+    # Lease: quem pegou o job e até quando; vencido, outro worker pode pegar de novo
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_ready_idx'),
+            models.Index(fields=['status', 'locked_until'], name='job_lease_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=Q(status='queued'), name='unique_queued_job_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.name}#{self.pk} ({self.status})"
@@ -0,0 +1,220 @@
+# jobs/queue.py
+"""
+Fila de jobs no próprio banco, sem broker externo.
+
+Handlers são registrados em `<app>/jobs.py` e enfileirados de dentro da
+transação de quem gera o trabalho, então o job só existe se a escrita
+commitar:
+
+    @register('timeline.fan_out')
+    def fan_out(tweet_id): ...
+
+    enqueue('timeline.fan_out', {'tweet_id': tweet.pk})
+
+Com JOBS_EAGER (padrão), `enqueue` chama o handler na hora, na própria
+requisição: o comportamento de antes da fila, sem precisar de worker. Com
+JOBS_EAGER=0 o job vira uma linha em `Job` e `manage.py run_jobs` executa.
+
+Para pegar jobs, o worker marca as linhas como `running` com um lease
+(JOBS_LEASE_SECONDS). No Postgres a seleção usa SELECT ... FOR UPDATE SKIP
+LOCKED: workers concorrentes pulam as linhas já travadas em vez de esperar.
+No SQLite (sem SKIP LOCKED) cada linha candidata é tomada por um UPDATE
+condicional; quem perder a corrida simplesmente não recebe a linha. Um lease
+vencido (worker morto no meio) devolve o job à fila. Falhas voltam com
+backoff exponencial até `max_attempts`, depois ficam como `failed` para
+inspeção (admin, `run_jobs --retry-failed`).
+"""
+import json
+import logging
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from prometheus_client import Counter, Histogram
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+JOBS_ENQUEUED = Counter('jobs_enqueued', 'Jobs enfileirados.', ['name'])
+JOBS_PROCESSED = Counter('jobs_processed', 'Jobs executados por resultado.', ['name', 'outcome'])
+JOB_DURATION = Histogram(
+    'job_duration_seconds', 'Duração da execução dos jobs.', ['name'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60),
+)
+JOB_LAG = Histogram(
+    'job_lag_seconds', 'Atraso entre o run_at do job e o início da execução.', ['name'],
+    buckets=(.01, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+
+DONE, RETRY, FAILED, LOST = 'done', 'retry', 'failed', 'lost'
+
+_handlers = {}
+
+
+class UnknownJob(LookupError):
+    pass
+
+
+def register(name):
+    """Decorator: registra `func(**payload)` como handler dos jobs `name`."""
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def eager():
+    return getattr(settings, 'JOBS_EAGER', True)
+
+
+def lease_seconds():
+    return getattr(settings, 'JOBS_LEASE_SECONDS', 300)
+
+
+def backoff(attempts):
+    """Espera antes da tentativa seguinte: exponencial, com teto e jitter de ±20%."""
+    base = getattr(settings, 'JOBS_RETRY_BACKOFF', 5)
+    ceiling = getattr(settings, 'JOBS_RETRY_BACKOFF_MAX', 3600)
+    return min(ceiling, base * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+
+
+def enqueue(name, payload=None, *, delay=0, key=None, max_attempts=None):
+    """
+    Enfileira `name` com `payload` (JSON). Com `key`, não duplica um job da
+    mesma chave que ainda esteja na fila.
+    """
+    if name not in _handlers:
+        raise UnknownJob(f"Job não registrado: {name}")
+    payload = payload or {}
+    if eager():
+        # Ida e volta pelo JSON: o handler recebe o mesmo que receberia do worker
+        return _handlers[name](**json.loads(json.dumps(payload)))
+    job = Job(
+        name=name, payload=payload, key=key,
+        max_attempts=max_attempts or getattr(settings, 'JOBS_MAX_ATTEMPTS', 5),
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    # ignore_conflicts: a constraint parcial de `key` descarta o duplicado sem erro
+    Job.objects.bulk_create([job], ignore_conflicts=key is not None)
+    JOBS_ENQUEUED.labels(name).inc()
+
+
+def _ready(now):
+    return Q(status=Job.QUEUED, run_at__lte=now) | Q(status=Job.RUNNING, locked_until__lt=now)
+
+
+def claim(limit, worker_id, names=None):
+    """Pega até `limit` jobs prontos para `worker_id`; retorna os jobs já marcados como running."""
+    now = timezone.now()
+    token = f"{worker_id}:{uuid.uuid4().hex[:12]}"
+    candidates = Job.objects.filter(_ready(now))
+    if names:
+        candidates = candidates.filter(name__in=names)
+    candidates = candidates.order_by('run_at', 'id')
+    lease = {
+        'status': Job.RUNNING, 'locked_by': token,
+        'locked_until': now + timedelta(seconds=lease_seconds()), 'attempts': F('attempts') + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(candidates.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            Job.objects.filter(pk__in=ids).update(**lease)
+    else:
+        # Sem SKIP LOCKED: UPDATE condicional linha a linha; o lock de escrita do
+        # SQLite garante que só um worker vê a condição ainda verdadeira
+        ids = [
+            pk for pk in candidates.values_list('id', flat=True)[:limit]
+            if Job.objects.filter(_ready(now), pk=pk).update(**lease)
+        ]
+    return list(Job.objects.filter(pk__in=ids, locked_by=token).order_by('run_at', 'id'))
+
+
+def execute(job_id, token):
+    """
+    Executa um job pego por `claim`. Retorna (resultado, segundos); as
+    métricas ficam com quem chama (`record`), que pode estar em outro processo.
+    """
+    job = Job.objects.filter(pk=job_id, locked_by=token).first()
+    if job is None:
+        return LOST, 0.0  # o lease venceu e outro worker pegou o job
+    start = time.perf_counter()
+    try:
+        handler = _handlers.get(job.name)
+        if handler is None:
+            raise UnknownJob(f"Job não registrado: {job.name}")
+        if job.attempts > job.max_attempts:
+            raise RuntimeError("Lease vencido em todas as tentativas (worker morto ou job lento demais)")
+        with transaction.atomic():
+            handler(**job.payload)
+    except Exception as exc:
+        outcome = _fail(job, token, exc)
+    else:
+        Job.objects.filter(pk=job.pk, locked_by=token).delete()
+        outcome = DONE
+    return outcome, time.perf_counter() - start
+
+
+def _fail(job, token, exc):
+    error = f"{type(exc).__name__}: {exc}"
+    retry = job.attempts < job.max_attempts and not isinstance(exc, UnknownJob)
+    if retry:
+        changes = {'status': Job.QUEUED, 'run_at': timezone.now() + timedelta(seconds=backoff(job.attempts))}
+        logger.warning("Job %s#%s falhou (tentativa %s/%s): %s", job.name, job.pk, job.attempts, job.max_attempts, error)
+    else:
+        changes = {'status': Job.FAILED}
+        logger.error("Job %s#%s falhou de vez: %s", job.name, job.pk, error, exc_info=exc)
+    Job.objects.filter(pk=job.pk, locked_by=token).update(
+        locked_by='', locked_until=None, last_error=error[:2000], **changes,
+    )
+    return RETRY if retry else FAILED
+
+
+def started(job):
+    JOB_LAG.labels(job.name).observe(max(0.0, (timezone.now() - job.run_at).total_seconds()))
+
+
+def record(job, result):
+    """Métricas de um resultado de `execute`."""
+    outcome, seconds = result
+    JOBS_PROCESSED.labels(job.name, outcome).inc()
+    JOB_DURATION.labels(job.name).observe(seconds)
+
+
+def run_pending(limit=100, worker_id='inline', names=None):
+    """Executa na thread atual os jobs prontos (testes, shell). Retorna quantos rodaram."""
+    ran = 0
+    while ran < limit:
+        jobs = claim(min(10, limit - ran), worker_id, names)
+        if not jobs:
+            return ran
+        for job in jobs:
+            started(job)
+            record(job, execute(job.pk, job.locked_by))
+        ran += len(jobs)
+    return ran
+
+
+def requeue(queryset):
+    """Volta jobs (ex.: os `failed`) para a fila, zerando as tentativas."""
+    return queryset.update(
+        status=Job.QUEUED, attempts=0, run_at=timezone.now(), locked_by='', locked_until=None,
+    )
+
+
+def stats():
+    """{nome: {status: quantidade, 'oldest': idade em s do job pronto mais antigo}}."""
+    now = timezone.now()
+    result = {}
+    rows = Job.objects.values('name', 'status').annotate(n=Count('id'), oldest=Min('run_at')).order_by('name')
+    for row in rows:
+        entry = result.setdefault(row['name'], {Job.QUEUED: 0, Job.RUNNING: 0, Job.FAILED: 0, 'oldest': 0.0})
+        entry[row['status']] = row['n']
+        if row['status'] == Job.QUEUED:
+            entry['oldest'] = max(0.0, (now - row['oldest']).total_seconds())
+    return result
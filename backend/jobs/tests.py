@@ -0,0 +1,128 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from jobs import queue
+from jobs.models import Job
+from tweets.models import LikeCounterShard, TimelineEntry, Tweet
+from users.models import User
+
+calls = []
+
+
+@queue.register('test.record')
+def record_call(value):
+    calls.append(value)
+
+
+@queue.register('test.flaky')
+def flaky(fail_times):
+    calls.append('try')
+    if calls.count('try') <= fail_times:
+        raise ValueError("falhou")
+
+
+@override_settings(JOBS_EAGER=False)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_eager_runs_inline(self):
+        with override_settings(JOBS_EAGER=True):
+            queue.enqueue('test.record', {'value': 1})
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_worker_runs_and_deletes(self):
+        queue.enqueue('test.record', {'value': 1})
+        queue.enqueue('test.record', {'value': 2}, delay=60)
+        self.assertEqual(calls, [])
+        self.assertEqual(queue.run_pending(), 1)
+        self.assertEqual(calls, [1])
+        # O adiado continua na fila até o run_at
+        self.assertEqual(list(Job.objects.values_list('status', flat=True)), [Job.QUEUED])
+        with self.assertRaises(queue.UnknownJob):
+            queue.enqueue('test.nope')
+
+    def test_retry_with_backoff_then_failed(self):
+        queue.enqueue('test.flaky', {'fail_times': 5}, max_attempts=2)
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            queue.run_pending()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('ValueError', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=3))
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            queue.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('test.flaky', queue.stats())
+
+        calls.clear()
+        queue.requeue(Job.objects.filter(status=Job.FAILED))
+        Job.objects.update(payload={'fail_times': 0})
+        queue.run_pending()
+        self.assertFalse(Job.objects.exists())
+
+    def test_expired_lease_is_reclaimed(self):
+        queue.enqueue('test.record', {'value': 1})
+        [job] = queue.claim(10, 'morto')
+        self.assertEqual(queue.claim(10, 'outro'), [])
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        [again] = queue.claim(10, 'outro')
+        self.assertEqual(again.attempts, 2)
+        # O worker antigo acorda: o lease não é mais dele, nada roda
+        self.assertEqual(queue.execute(job.pk, job.locked_by), (queue.LOST, 0.0))
+        self.assertEqual(queue.execute(again.pk, again.locked_by)[0], queue.DONE)
+        self.assertEqual(calls, [1])
+
+    def test_key_deduplicates_queued_jobs(self):
+        queue.enqueue('test.record', {'value': 1}, key='k')
+        queue.enqueue('test.record', {'value': 2}, key='k')
+        self.assertEqual(Job.objects.count(), 1)
+        queue.claim(10, 'w')
+        # Já rodando: um novo job com a mesma chave entra na fila
+        queue.enqueue('test.record', {'value': 3}, key='k')
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_fan_out_and_like_consolidation_are_deferred(self):
+        author = User.objects.create_user(email="a@example.com", password="password123")
+        reader = User.objects.create_user(email="r@example.com", password="password123")
+        client = APIClient()
+        client.force_authenticate(user=reader)
+        client.post(f'/api/users/toggle-follow/{author.pk}/')
+        queue.run_pending()
+
+        tweet = Tweet.objects.create(author=author, content="adiado")
+        self.assertFalse(TimelineEntry.objects.filter(owner=reader, tweet=tweet).exists())
+        # O autor vê o próprio tweet antes do worker
+        self.assertTrue(TimelineEntry.objects.filter(owner=author, tweet=tweet).exists())
+        queue.run_pending()
+        self.assertTrue(TimelineEntry.objects.filter(owner=reader, tweet=tweet).exists())
+
+        response = client.post(f'/api/tweets/{tweet.pk}/like_tweet/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Job.objects.get().name, 'likes.consolidate')
+        Job.objects.update(run_at=timezone.now())
+        queue.run_pending()
+        tweet.refresh_from_db()
+        self.assertEqual(tweet.likes_count, 1)
+        self.assertFalse(LikeCounterShard.objects.filter(tweet=tweet).exists())
+
+
+@override_settings(JOBS_EAGER=False)
+class RunJobsCommandTest(TransactionTestCase):
+    def test_thread_pool_drains_queue(self):
+        calls.clear()
+        for value in range(5):
+            queue.enqueue('test.record', {'value': value})
+        call_command('run_jobs', '--once', '--concurrency', '2', stdout=StringIO())
+        self.assertEqual(sorted(calls), list(range(5)))
+        self.assertFalse(Job.objects.exists())
@@ -0,0 +1,86 @@
+# jobs/worker.py
+"""
+Loop do `manage.py run_jobs`.
+
+A thread principal pega jobs (`claim`) só quando há vaga no pool e entrega
+cada um a um pool de threads ou de processos. Threads bastam para jobs que
+passam o tempo no banco; processos (`--pool process`) para trabalho de CPU
+como o processamento de avatares. Os processos são criados com "spawn":
+nada de conexões de banco herdadas do pai. As métricas de cada job são
+registradas na thread principal, a partir do resultado devolvido pelo pool.
+"""
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.db import close_old_connections, connections
+
+from . import queue
+
+logger = logging.getLogger(__name__)
+
+
+def _run(job_id, token):
+    try:
+        return queue.execute(job_id, token)
+    finally:
+        close_old_connections()
+
+
+class Worker:
+    def __init__(self, concurrency=4, pool='thread', names=None, poll_interval=1.0):
+        self.concurrency = concurrency
+        self.pool = pool
+        self.names = names
+        self.poll_interval = poll_interval
+        self.id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+
+    def executor(self):
+        if self.pool == 'process':
+            connections.close_all()
+            return ProcessPoolExecutor(
+                self.concurrency, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup,
+            )
+        return ThreadPoolExecutor(self.concurrency, thread_name_prefix='job')
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def _collect(self, done, inflight):
+        for future in done:
+            job = inflight.pop(future)
+            try:
+                queue.record(job, future.result())
+            except Exception:
+                # Só erros do próprio pool (processo morto): o lease devolve o job à fila
+                logger.exception("Worker perdeu o job %s#%s", job.name, job.pk)
+        return len(done)
+
+    def run(self, once=False):
+        """Processa jobs até `stop()`; com `once`, só até a fila ficar vazia. Retorna quantos rodaram."""
+        processed = 0
+        inflight = {}
+        with self.executor() as pool:
+            while not self.stopping.is_set():
+                free = self.concurrency - len(inflight)
+                jobs = queue.claim(free, self.id, self.names) if free else []
+                for job in jobs:
+                    queue.started(job)
+                    inflight[pool.submit(_run, job.pk, job.locked_by)] = job
+                if not inflight:
+                    if once:
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                # Pool cheio: espera alguém terminar; senão, volta a olhar a fila no próximo poll
+                timeout = None if len(inflight) >= self.concurrency else self.poll_interval
+                done, _ = wait(inflight, timeout=timeout, return_when=FIRST_COMPLETED)
+                processed += self._collect(done, inflight)
+            # stop(): termina o que já foi pego, sem pegar mais nada
+            processed += self._collect(wait(inflight).done, inflight)
+        return processed
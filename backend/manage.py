@@ -6,7 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "twitter_clone.settings")
+    # `manage.py test` roda com as settings de teste (twitter_clone/test_settings.py)
+    testing = sys.argv[1:2] == ["test"]
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "twitter_clone.test_settings" if testing else "twitter_clone.settings")
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -1,21 +1,25 @@
 from django.contrib import admin
 from .models import Tweet, Comment
+from .search import search_tweet_ids
 
 
 @admin.register(Tweet)
 class TweetAdmin(admin.ModelAdmin):
     list_display = ['id', 'author', 'content_preview', 'likes_count', 'created_at']
     list_filter = ['created_at']
-    search_fields = ['content', 'author__email']
-    readonly_fields = ['created_at']
+    search_fields = ['author__email']  # o conteúdo é buscado pelo índice full-text
+    readonly_fields = ['created_at', 'likes_count', 'comments_count']
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            ids = [pk for pk, _ in search_tweet_ids(search_term, limit=1000)]
+            results |= queryset.filter(pk__in=ids)
+        return results, may_have_duplicates
     
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_preview.short_description = 'Conteúdo'
-    
-    def likes_count(self, obj):
-        return obj.likes.count()
-    likes_count.short_description = 'Curtidas'
 
 
 @admin.register(Comment)
@@ -1,6 +1,24 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class TweetsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "tweets"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import ensure_search_schema
+
+        post_migrate.connect(ensure_search_schema, sender=self)
+
+        from twitter_clone.metrics import install_query_counter
+
+        connection_created.connect(install_query_counter, dispatch_uid='metrics_query_counter')
+
+        if getattr(settings, 'DB_SIMULATED_LATENCY_MS', 0) or getattr(settings, 'DB_SIMULATED_CONNECT_MS', 0):
+            from twitter_clone.metrics import install_simulated_latency
+
+            connection_created.connect(install_simulated_latency, dispatch_uid='simulated_db_latency')
@@ -0,0 +1,183 @@
+# tweets/archive.py
+"""
+Arquivo frio de tweets antigos, particionado por mês de created_at.
+
+Quase toda leitura cai nos últimos dias, mas tweets_tweet, tweets_comment, os
+likes e seus índices crescem para sempre. `manage.py archive_tweets` move os
+tweets anteriores ao corte, com comentários e likes, em lotes: cada tweet vira
+uma linha na partição do seu mês, com o conteúdo, os comentários e os ids de
+quem curtiu num payload JSON comprimido (zlib).
+
+- PostgreSQL: `tweets_archive` é particionada por RANGE (created_at), com uma
+  partição por mês (`tweets_archive_p202401`, ...) criada sob demanda.
+- SQLite: uma tabela por mês com o mesmo nome, e `tweets_archive` é uma view
+  UNION ALL de todas, recriada quando um mês novo aparece.
+
+As tabelas quentes não são particionadas: no Postgres a chave primária de
+uma tabela particionada precisa incluir created_at, o que quebraria as FKs de
+comentários, likes, fatias e timeline para tweets_tweet(id).
+
+A leitura é o caminho lento (/api/tweets/archive/): ArchivedTweet consulta a
+tabela-mãe ou a view, o que passa por todas as partições, e o payload é
+descomprimido a cada acesso. A tabela-mãe (Postgres) ou a view vazia (SQLite) é
+criada na migration 0011_archivedtweet; as partições, sob demanda.
+"""
+import json
+import zlib
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Tweet
+
+ARCHIVE_TABLE = 'tweets_archive'
+PARTITION_PREFIX = f'{ARCHIVE_TABLE}_p'
+COLUMNS = ['id', 'author_id', 'created_at', 'archived_at', 'likes_count', 'comments_count', 'payload']
+
+Like = Tweet.likes.through
+
+
+def supported(conn=connection):
+    return conn.vendor in ('sqlite', 'postgresql')
+
+
+def _execute(conn, statements):
+    with conn.cursor() as db:
+        for statement in statements:
+            db.execute(statement)
+
+
+def _sqlite_view(names):
+    columns = ', '.join(COLUMNS)
+    body = ' UNION ALL '.join(f"SELECT {columns} FROM {name}" for name in names)
+    return [f"DROP VIEW IF EXISTS {ARCHIVE_TABLE}", f"CREATE VIEW {ARCHIVE_TABLE} AS {body}"]
+
+
+def partitions(conn=connection):
+    """Nomes das partições mensais existentes, da mais antiga para a mais nova."""
+    with conn.cursor() as db:
+        if conn.vendor == 'sqlite':
+            db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB %s ORDER BY name",
+                [f'{PARTITION_PREFIX}[0-9]*'],
+            )
+        elif conn.vendor == 'postgresql':
+            db.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = %s::regclass ORDER BY c.relname",
+                [ARCHIVE_TABLE],
+            )
+        else:
+            return []
+        return [row[0] for row in db.fetchall()]
+
+
+def partition_for(created_at):
+    """(nome, início, fim) da partição mensal (UTC) de um created_at."""
+    value = created_at.astimezone(dt_timezone.utc)
+    start = datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+    end = datetime(value.year + value.month // 12, value.month % 12 + 1, 1, tzinfo=dt_timezone.utc)
+    return f'{PARTITION_PREFIX}{value:%Y%m}', start, end
+
+
+def ensure_partitions(conn, bounds):
+    """Cria as partições de `bounds` ({nome: (início, fim)}) que ainda não existem."""
+    existing = set(partitions(conn))
+    missing = {name: span for name, span in bounds.items() if name not in existing}
+    if not missing:
+        return
+    if conn.vendor == 'postgresql':
+        _execute(conn, [
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {ARCHIVE_TABLE} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            for name, (start, end) in missing.items()
+        ])
+    else:
+        statements = []
+        for name in missing:
+            statements += [
+                f"CREATE TABLE IF NOT EXISTS {name} ("
+                "id integer NOT NULL PRIMARY KEY, author_id bigint NOT NULL, created_at datetime NOT NULL, "
+                "archived_at datetime NOT NULL, likes_count integer NOT NULL, comments_count integer NOT NULL, "
+                "payload blob NOT NULL)",
+                f"CREATE INDEX IF NOT EXISTS {name}_author_idx ON {name} (author_id, created_at)",
+            ]
+        _execute(conn, statements + _sqlite_view(sorted(existing | set(missing))))
+
+
+def compress(data):
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode())
+
+
+def load(payload):
+    """Payload descomprimido: {'content', 'likes': [user_id], 'comments': [{id, author_id, created_at, content}]}."""
+    data = json.loads(zlib.decompress(bytes(payload)))
+    data['comments'] = [
+        {'id': pk, 'author_id': author_id, 'created_at': parse_datetime(created_at), 'content': content}
+        for pk, author_id, created_at, content in data['comments']
+    ]
+    return data
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Move para o arquivo até `batch_size` tweets com created_at < cutoff (os
+    mais antigos primeiro), numa transação: o tweet só sai das tabelas quentes
+    junto com a gravação no arquivo. Retorna {'tweets', 'comments', 'likes'}.
+    """
+    with transaction.atomic():
+        tweets = list(
+            Tweet.objects.filter(created_at__lt=cutoff).order_by('created_at', 'id')
+            .select_for_update().values('id', 'author_id', 'content', 'created_at')[:batch_size]
+        )
+        ids = [tweet['id'] for tweet in tweets]
+        likes = defaultdict(list)
+        for tweet_id, user_id in Like.objects.filter(tweet_id__in=ids).order_by('id').values_list('tweet_id', 'user_id'):
+            likes[tweet_id].append(user_id)
+        comments = defaultdict(list)
+        for tweet_id, pk, author_id, created_at, content in (
+            Comment.objects.filter(tweet_id__in=ids).order_by('created_at', 'id')
+            .values_list('tweet_id', 'id', 'author_id', 'created_at', 'content')
+        ):
+            comments[tweet_id].append([pk, author_id, created_at.isoformat(), content])
+
+        # Contadores a partir das linhas reais: já incluem as fatias não consolidadas
+        adapt = connection.ops.adapt_datetimefield_value
+        archived_at = adapt(timezone.now())
+        bounds, rows = {}, defaultdict(list)
+        for tweet in tweets:
+            name, start, end = partition_for(tweet['created_at'])
+            bounds[name] = (start, end)
+            payload = {'content': tweet['content'], 'likes': likes[tweet['id']], 'comments': comments[tweet['id']]}
+            rows[name].append((
+                tweet['id'], tweet['author_id'], adapt(tweet['created_at']), archived_at,
+                len(likes[tweet['id']]), len(comments[tweet['id']]), compress(payload),
+            ))
+
+        ensure_partitions(connection, bounds)
+        placeholders = ', '.join(['%s'] * len(COLUMNS))
+        with connection.cursor() as db:
+            for name, values in rows.items():
+                db.executemany(f"INSERT INTO {name} ({', '.join(COLUMNS)}) VALUES ({placeholders})", values)
+        # Cascade: comentários, likes, fatias e entradas de timeline
+        Tweet.objects.filter(pk__in=ids).delete()
+
+    return {
+        'tweets': len(tweets),
+        'comments': sum(len(rows) for rows in comments.values()),
+        'likes': sum(len(rows) for rows in likes.values()),
+    }
+
+
+def delete_author(user_id):
+    """Apaga o arquivo de um usuário removido (o arquivo não tem FK para users_user)."""
+    if connection.vendor == 'postgresql':
+        tables = [ARCHIVE_TABLE]
+    else:
+        tables = partitions(connection)
+    with connection.cursor() as db:
+        for table in tables:
+            db.execute(f"DELETE FROM {table} WHERE author_id = %s", [user_id])
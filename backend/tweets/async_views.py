@@ -0,0 +1,171 @@
+# tweets/async_views.py
+"""
+Versões async das leituras quentes de tweets (timeline, comentários, busca),
+servidas pelo app ASGI com ASYNC_READ_PATH=1 (ver twitter_clone/async_urls.py).
+
+Mesmas queries, validadores (ETag/Last-Modified), cache e formato de resposta
+de TweetViewSet; as queries usam o ORM async e o cache/FTS (síncronos) rodam
+via sync_to_async.
+
+`stream` (SSE) só existe no app ASGI: uma conexão aberta por cliente
+ocuparia um worker síncrono inteiro.
+"""
+import asyncio
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+
+from twitter_clone.async_api import async_api_view, render
+from twitter_clone.conditional import aconditional
+
+from . import cache as timeline_cache
+from . import events
+from .models import Tweet
+from .pagination import KeysetPagination, SearchPagination, TimelinePagination
+from .serializers import CommentSerializer, TweetSerializer
+from .timeline import ahome_timeline
+
+
+async def _timeline_page(request, paginator):
+    user = request.user
+    page = await paginator.apaginate_timeline(user, Tweet.objects.with_engagement(user), request)
+    serializer = TweetSerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data).data
+
+
+@async_api_view()
+async def timeline(request):
+    """GET /api/tweets/ — ver TweetViewSet.list."""
+    paginator = TimelinePagination()
+    params = request.query_params
+    cursor = params.get('before', '') + ':' + params.get('after', '')
+    variant = f"{request.get_host()}:{paginator.get_page_size(request)}:{cursor}"
+    etag, last_modified = await sync_to_async(timeline_cache.feed_version)(request.user, variant)
+    use_cache = timeline_cache.cache_enabled() and cursor == ':'
+
+    async def build_response():
+        if not use_cache:
+            return render(await _timeline_page(request, paginator))
+        key = timeline_cache.page_key(etag)
+        data = await sync_to_async(timeline_cache.get_page)(key)
+        if data is None:
+            data = await _timeline_page(request, paginator)
+            await sync_to_async(timeline_cache.set_page)(key, data)
+        return render(data)
+
+    return await aconditional(request, *timeline_cache.validators(etag, last_modified), build_response)
+
+
+@async_api_view(auth_required=False)
+async def comments(request, pk):
+    """GET /api/tweets/{id}/comments/ — ver TweetViewSet.comments."""
+    user = request.user
+    tweets = await ahome_timeline(user) if user.is_authenticated else Tweet.objects.all()
+    tweet = await aget_object_or_404(tweets, pk=pk)
+    latest = await tweet.comments.aaggregate(n=Count('id'), last_id=Max('id'), last_at=Max('created_at'))
+    etag = hashlib.md5(
+        f"{tweet.pk}:{latest['n']}:{latest['last_id']}:{request.get_full_path()}".encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    last_modified = latest['last_at'].timestamp() if latest['last_at'] else None
+
+    async def build_response():
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(tweet.comments.select_related('author'), request)
+        serializer = CommentSerializer(page, many=True)
+        return render(paginator.get_paginated_response(serializer.data).data)
+
+    return await aconditional(request, etag, last_modified, build_response)
+
+
+@async_api_view()
+async def search(request):
+    """GET /api/tweets/search/?q= — ver TweetViewSet.search."""
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return render({'next': None, 'previous': None, 'results': []})
+    paginator = SearchPagination()
+    page = await paginator.apaginate_search(query, request)
+    serializer = TweetSerializer(page, many=True, context={'request': request})
+    return render(paginator.get_paginated_response(serializer.data).data)
+
+
+def _sse(event, event_id=None, data=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data or {})}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _last_event_id(request):
+    # Header enviado pelo EventSource ao reconectar; a query string serve a polyfills
+    value = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+async def _missed(user, last_id):
+    """
+    Tweets criados depois de `last_id` por quem `user` segue, em ordem. None se
+    passarem de TWEET_STREAM_REPLAY_LIMIT: aí o cliente deve recarregar o feed.
+    """
+    limit = getattr(settings, 'TWEET_STREAM_REPLAY_LIMIT', 100)
+    authors = Q(author=user) | Q(author__in=user.following.values('id'))
+    newest = Tweet.objects.filter(authors, pk__gt=last_id).select_related('author').order_by('-id')[:limit + 1]
+    tweets = [tweet async for tweet in newest]
+    if len(tweets) > limit:
+        return None, tweets[0].id
+    return tweets[::-1], None
+
+
+async def _events(user, authors, last_id):
+    heartbeat = getattr(settings, 'TWEET_STREAM_HEARTBEAT', 15)
+    hub = events.get_hub()
+    # Assina antes de consultar o banco: nada criado entre as duas coisas se perde
+    subscription = hub.subscribe(authors, events.queue_size())
+    try:
+        yield f"retry: {getattr(settings, 'TWEET_STREAM_RETRY_MS', 3000)}\n\n"
+        replayed = set()
+        if last_id is not None:
+            missed, newest_id = await _missed(user, last_id)
+            if missed is None:
+                yield _sse('reset', newest_id)
+            else:
+                for tweet in missed:
+                    replayed.add(tweet.id)
+                    yield _sse('tweet', tweet.id, events.compact(tweet))
+
+        while True:
+            if subscription.overflowed and subscription.queue.empty():
+                return  # cliente lento: reconecta e busca o resto com Last-Event-ID
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"  # mantém proxies e o cliente sabendo que a conexão vive
+                continue
+            if event.id not in replayed:
+                yield _sse('tweet', event.id, event.data)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+@async_api_view()
+async def stream(request):
+    """GET /api/tweets/stream/ — SSE com os tweets novos de quem o usuário segue."""
+    user = request.user
+    authors = {user.pk}
+    authors.update([pk async for pk in user.following.values_list('id', flat=True)])
+    response = StreamingHttpResponse(
+        _events(user, authors, _last_event_id(request)), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: não segura os eventos no buffer
+    return response
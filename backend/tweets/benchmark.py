@@ -0,0 +1,244 @@
+# tweets/benchmark.py
+"""
+Benchmark dos endpoints da API, em processo, com o test client do Django.
+
+Cada cenário monta uma requisição (usuário, tweet e alvo sorteados por uma
+seed) e é executado N vezes em sequência. Por endpoint medimos latência
+(p50/p95/p99), throughput, número e tempo de queries SQL (via
+`twitter_clone.metrics.QueryCounter`, sem ligar o DEBUG) e bytes da resposta.
+
+O resultado é um dict JSON-serializável; `compare()` confronta com um baseline
+salvo e lista as regressões. Ver `manage.py benchmark`.
+"""
+import platform
+import random
+import statistics
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from twitter_clone.metrics import QueryCounter, count_queries
+
+from .models import Tweet
+from .timeline import home_timeline
+
+User = get_user_model()
+
+# Tweets recentes de cada timeline usados pelos cenários de like/comentário
+TIMELINE_SAMPLE = 200
+
+
+class Scenario:
+    """Um endpoint: `build(ctx)` devolve (user_id, método, path, dados) de uma requisição."""
+
+    def __init__(self, name, build):
+        self.name = name
+        self.build = build
+
+
+class Context:
+    """
+    Amostra do dataset de onde os cenários sorteiam usuários e tweets. As
+    ações de detalhe de tweet só enxergam a timeline de quem pede, então o
+    tweet é sorteado da timeline do usuário.
+    """
+
+    def __init__(self, rng, timelines, handles):
+        self.rng = rng
+        self.user_ids = sorted(timelines)
+        self.readers = [pk for pk in self.user_ids if timelines[pk]]
+        self.timelines = timelines
+        self.handles = handles
+
+    def user(self):
+        return self.rng.choice(self.user_ids)
+
+    def user_and_tweet(self):
+        user_id = self.rng.choice(self.readers)
+        return user_id, self.rng.choice(self.timelines[user_id])
+
+    def other_user(self, user_id):
+        while True:
+            target = self.rng.choice(self.user_ids)
+            if target != user_id:
+                return target
+
+    def handle_prefix(self):
+        handle = self.rng.choice(self.handles)
+        return handle[:max(2, len(handle) - 1)]
+
+
+def _get(path):
+    return lambda ctx: (ctx.user(), 'get', path, None)
+
+
+def _on_tweet(method, action, data=None):
+    def build(ctx):
+        user_id, tweet_id = ctx.user_and_tweet()
+        return user_id, method, f'/api/tweets/{tweet_id}/{action}/', data
+    return build
+
+
+def _toggle_follow(ctx):
+    user_id = ctx.user()
+    return user_id, 'post', f'/api/users/toggle-follow/{ctx.other_user(user_id)}/', None
+
+
+SCENARIOS = [
+    Scenario('timeline', _get('/api/tweets/')),
+    Scenario('like_toggle', _on_tweet('post', 'like_tweet')),
+    Scenario('add_comment', _on_tweet('post', 'add_comment', {'content': 'benchmark'})),
+    Scenario('comments', _on_tweet('get', 'comments')),
+    Scenario('search_users', lambda ctx: (ctx.user(), 'get', f'/api/users/search/?q={ctx.handle_prefix()}', None)),
+    Scenario('toggle_follow', _toggle_follow),
+    Scenario('followers_following', _get('/api/users/followers-following/')),
+    Scenario('profile', _get('/api/users/profile/')),
+]
+
+
+def scenario_names():
+    return [scenario.name for scenario in SCENARIOS]
+
+
+def percentile(sorted_values, pct):
+    """Percentil com interpolação linear (mesmo método do numpy por padrão)."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * pct / 100
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def _response_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def summarize(latencies_ns, queries, sql_ns, sizes, statuses):
+    latencies = sorted(ns / 1e6 for ns in latencies_ns)
+    total_seconds = sum(latencies_ns) / 1e9
+    return {
+        'requests': len(latencies),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'mean': round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            'max': round(latencies[-1], 3) if latencies else 0.0,
+        },
+        'throughput_rps': round(len(latencies) / total_seconds, 1) if total_seconds else 0.0,
+        'queries': {
+            'mean': round(statistics.fmean(queries), 2) if queries else 0.0,
+            'max': max(queries, default=0),
+        },
+        'sql_ms_mean': round(statistics.fmean(sql_ns) / 1e6, 3) if sql_ns else 0.0,
+        'bytes_mean': round(statistics.fmean(sizes)) if sizes else 0,
+        'status': {str(code): statuses.count(code) for code in sorted(set(statuses))},
+    }
+
+
+def run_scenario(scenario, ctx, clients, iterations, warmup):
+    latencies, queries, sql_ns, sizes, statuses = [], [], [], [], []
+    for i in range(warmup + iterations):
+        user_id, method, path, data = scenario.build(ctx)
+        request = getattr(clients[user_id], method)
+        kwargs = {'data': data, 'content_type': 'application/json'} if data is not None else {}
+        counter = QueryCounter()
+        with count_queries(counter):
+            start = time.perf_counter_ns()
+            response = request(path, **kwargs)
+            size = _response_size(response)
+            elapsed = time.perf_counter_ns() - start
+        if i < warmup:
+            continue
+        latencies.append(elapsed)
+        queries.append(counter.count)
+        sql_ns.append(counter.time_ns)
+        sizes.append(size)
+        statuses.append(response.status_code)
+    return summarize(latencies, queries, sql_ns, sizes, statuses)
+
+
+def _client_for(user):
+    token = RefreshToken.for_user(user).access_token
+    return Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+def run_benchmark(iterations=200, warmup=20, seed=0, sample_users=100, only=None, users=None):
+    """
+    Roda os cenários (todos ou os de `only`) e devolve o relatório.
+    `users` limita a amostra a um queryset (ex.: os usuários do dataset gerado).
+    """
+    rng = random.Random(seed)
+    users = users if users is not None else User.objects.all()
+    user_ids = sorted(users.values_list('pk', flat=True))
+    if len(user_ids) < 2:
+        raise ValueError('O benchmark precisa de pelo menos 2 usuários no banco.')
+
+    sample = sorted(rng.sample(user_ids, min(sample_users, len(user_ids))))
+    sampled = User.objects.in_bulk(sample)
+    clients = {pk: _client_for(user) for pk, user in sampled.items()}
+    timelines = {
+        pk: list(home_timeline(user).values_list('pk', flat=True)[:TIMELINE_SAMPLE])
+        for pk, user in sampled.items()
+    }
+    if not any(timelines.values()):
+        raise ValueError('Nenhum usuário da amostra tem tweets na timeline.')
+    handles = sorted(user.handle for user in sampled.values())
+    ctx = Context(rng, timelines, handles)
+
+    report = {
+        'meta': {
+            'iterations': iterations,
+            'warmup': warmup,
+            'seed': seed,
+            'sample_users': len(sample),
+            'users': len(user_ids),
+            'tweets': Tweet.objects.count(),
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+        },
+        'endpoints': {},
+    }
+    # O throttle roda (o custo dele entra na medição), mas sem limite que barre a carga
+    unlimited = {scope: {kind: '1000000/s' for kind in limits} for scope, limits in settings.RATE_LIMITS.items()}
+    with override_settings(RATE_LIMITS=unlimited):
+        for scenario in SCENARIOS:
+            if only and scenario.name not in only:
+                continue
+            report['endpoints'][scenario.name] = run_scenario(scenario, ctx, clients, iterations, warmup)
+    return report
+
+
+def compare(report, baseline, tolerance=0.25, query_tolerance=0):
+    """
+    Regressões de `report` em relação a `baseline`: p50/p95 acima de
+    baseline * (1 + tolerance), ou média de queries acima de
+    baseline + query_tolerance. Endpoints fora do baseline são ignorados.
+    """
+    regressions = []
+    for name, current in report['endpoints'].items():
+        base = baseline.get('endpoints', {}).get(name)
+        if base is None:
+            continue
+        for pct in ('p50', 'p95'):
+            limit = base['latency_ms'][pct] * (1 + tolerance)
+            if current['latency_ms'][pct] > limit:
+                regressions.append(
+                    f"{name}: latência {pct} {current['latency_ms'][pct]}ms > {limit:.3f}ms "
+                    f"(baseline {base['latency_ms'][pct]}ms)"
+                )
+        limit = base['queries']['mean'] + query_tolerance
+        if current['queries']['mean'] > limit:
+            regressions.append(
+                f"{name}: {current['queries']['mean']} queries/req > {limit} (baseline {base['queries']['mean']})"
+            )
+    return regressions
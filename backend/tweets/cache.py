@@ -0,0 +1,149 @@
+# tweets/cache.py
+"""
+Cache da primeira página da timeline de cada usuário.
+
+Cada usuário tem uma versão no cache (`tl:ver:<id>`, um timestamp em ns) que
+é renovada quando algo que aparece no feed de quem o segue muda: tweet
+criado/apagado, like, comentário, follow/unfollow, edição de perfil (ver
+tweets/signals.py).
+
+A chave da página combina a versão do leitor com as versões de todos que ele
+segue, então um evento invalida só os feeds afetados, sem fan-out de
+invalidações. O mesmo digest serve de ETag e a maior versão de Last-Modified
+(ver TweetViewSet.list).
+
+As versões só são vistas por todos os processos com um cache compartilhado
+(CACHE_BACKEND "file"/"redis"); num "locmem" por processo, o bump() de uma
+escrita (ou do worker run_jobs) só chega a quem a fez. Por isso o digest
+inclui também o tweet mais novo do feed, lido do banco (timeline.newest_keys):
+um tweet novo muda o ETag em qualquer processo, sem depender do cache.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .timeline import newest_keys
+
+VERSION_KEY = 'tl:ver:{}'
+FOLLOWING_KEY = 'tl:following:{}:{}'
+PAGE_KEY = 'tl:page:{}'
+STATS_KEY = 'tl:stats:{}'
+
+
+def get_cache():
+    return caches[getattr(settings, 'TIMELINE_CACHE_ALIAS', 'default')]
+
+
+def cache_enabled():
+    return getattr(settings, 'TIMELINE_CACHE_ENABLED', True)
+
+
+def conditional_enabled():
+    return getattr(settings, 'TIMELINE_CONDITIONAL_GET', True)
+
+
+def validators(etag, last_modified):
+    """(etag, last_modified) para o GET condicional do feed, ou (None, None) se desligado."""
+    return (etag, last_modified) if conditional_enabled() else (None, None)
+
+
+def page_ttl():
+    return getattr(settings, 'TIMELINE_CACHE_TTL', 60)
+
+
+def _new_version():
+    # Timestamp: nunca reaproveita um valor antigo se a chave tiver sido despejada
+    # (LRU/TTL) e serve de Last-Modified
+    return time.time_ns()
+
+
+def bump(*user_ids):
+    """Invalida os feeds (e ETags) que dependem destes usuários."""
+    user_ids = set(filter(None, user_ids))
+    if user_ids:
+        version = _new_version()
+        get_cache().set_many({VERSION_KEY.format(pk): version for pk in user_ids}, None)
+
+
+def get_versions(user_ids):
+    """Versões atuais; quem não tem versão no cache ganha uma nova."""
+    cache = get_cache()
+    keys = {VERSION_KEY.format(pk): pk for pk in user_ids}
+    found = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {keys[key]: value for key, value in found.items()}
+
+
+def _identity(user):
+    # date_joined distingue um usuário novo que reaproveitou o id de um apagado
+    return f"{user.pk}.{user.date_joined.timestamp()}"
+
+
+def _following_ids(user, version):
+    cache = get_cache()
+    key = FOLLOWING_KEY.format(_identity(user), version)
+    ids = cache.get(key)
+    if ids is None:
+        ids = sorted(user.following.values_list('id', flat=True))
+        cache.set(key, ids, page_ttl() * 10)
+    return ids
+
+
+def feed_version(user, variant=''):
+    """
+    (digest, last_modified) do feed de `user`: o digest muda sempre que o
+    leitor ou alguém que ele segue muda (versões) ou chega um tweet novo ao
+    feed (banco); last_modified é o mais recente dos dois, em segundos.
+    """
+    reader_version = get_versions([user.pk])[user.pk]
+    following = _following_ids(user, reader_version)
+    versions = get_versions(following) if following else {}
+    newest = newest_keys(user)
+    digest = hashlib.md5(usedforsecurity=False)
+    digest.update(f"{_identity(user)}:{reader_version}:{variant}".encode())
+    for pk in following:
+        digest.update(f"|{pk}:{versions[pk]}".encode())
+    for created_at, pk in newest:
+        digest.update(f"|{created_at.isoformat()}:{pk}".encode())
+    last_modified = max([
+        reader_version / 1e9, *(value / 1e9 for value in versions.values()),
+        *(created_at.timestamp() for created_at, _ in newest),
+    ])
+    return digest.hexdigest(), last_modified
+
+
+def page_key(digest):
+    return PAGE_KEY.format(digest)
+
+
+def _count(event):
+    cache = get_cache()
+    key = STATS_KEY.format(event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None) or cache.incr(key)
+
+
+def get_page(key):
+    data = get_cache().get(key)
+    _count('hits' if data is not None else 'misses')
+    return data
+
+
+def set_page(key, data):
+    get_cache().set(key, data, page_ttl())
+
+
+def stats():
+    cache = get_cache()
+    values = cache.get_many([STATS_KEY.format('hits'), STATS_KEY.format('misses')])
+    hits = values.get(STATS_KEY.format('hits'), 0)
+    misses = values.get(STATS_KEY.format('misses'), 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
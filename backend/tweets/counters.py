@@ -0,0 +1,73 @@
+# tweets/counters.py
+"""
+Likes com contador fatiado (sharded counter).
+
+O toggle faz uma checagem indexada no through table (tweet_id, user_id) e
+um insert/delete, sem carregar a lista de quem curtiu. O contador é espalhado
+em LIKE_COUNTER_SHARDS linhas de LikeCounterShard, somadas na leitura.
+
+Com a fila de jobs ativa (JOBS_EAGER=0), criar uma fatia agenda o job
+`likes.consolidate` (tweets/jobs.py), que depois de LIKE_CONSOLIDATE_DELAY
+segundos soma as fatias em Tweet.likes_count. Sem worker, as fatias ficam
+até o `repair_counters`: consolidar na requisição voltaria a serializar os
+likes na linha do tweet.
+"""
+import random
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from jobs.queue import eager, enqueue
+
+from . import cache as timeline_cache
+from .models import LikeCounterShard, Tweet
+
+Like = Tweet.likes.through
+
+
+def like_shard_count():
+    return getattr(settings, 'LIKE_COUNTER_SHARDS', 8)
+
+
+def add_likes(tweet_id, delta):
+    """Soma `delta` em uma fatia aleatória do contador do tweet."""
+    shard = random.randrange(like_shard_count())
+    rows = LikeCounterShard.objects.filter(tweet_id=tweet_id, shard=shard)
+    if rows.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            LikeCounterShard.objects.create(tweet_id=tweet_id, shard=shard, count=delta)
+    except IntegrityError:
+        # Outra requisição criou a fatia entre o UPDATE e o INSERT
+        rows.update(count=F('count') + delta)
+        return
+    if not eager():
+        # Uma vez por fatia nova (não por like); a chave evita jobs repetidos na fila
+        enqueue('likes.consolidate', {'tweet_id': tweet_id}, key=f'likes:{tweet_id}',
+                delay=getattr(settings, 'LIKE_CONSOLIDATE_DELAY', 60))
+
+
+def total_likes(tweet):
+    """Base consolidada + soma das fatias."""
+    pending = tweet.like_shards.aggregate(total=Sum('count'))['total'] or 0
+    return tweet.likes_count + pending
+
+
+def toggle_like(tweet, user):
+    """Curte/descurte e retorna True se o tweet ficou curtido."""
+    with transaction.atomic():
+        existing = Like.objects.filter(tweet_id=tweet.pk, user_id=user.pk)
+        if existing.exists():
+            deleted, _ = existing.delete()
+            if deleted:
+                add_likes(tweet.pk, -deleted)
+            liked = False
+        else:
+            _, created = Like.objects.get_or_create(tweet_id=tweet.pk, user_id=user.pk)
+            if created:
+                add_likes(tweet.pk, 1)
+            liked = True
+    timeline_cache.bump(tweet.author_id)
+    return liked
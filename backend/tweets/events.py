@@ -0,0 +1,172 @@
+# tweets/events.py
+"""
+Pub/sub de tweets novos para o stream SSE (/api/tweets/stream/, ver
+tweets/async_views.py).
+
+TweetViewSet.perform_create publica cada tweet, depois do commit, no hub
+configurado em TWEET_EVENTS_HUB; cada conexão SSE assina os autores que o
+usuário segue. O InProcessHub só recebe direto os tweets do mesmo processo;
+os de outros workers (e do run_jobs) chegam por um único poller por processo,
+que a cada TWEET_STREAM_CATCHUP segundos busca no banco os tweets novos dos
+autores assinados e os publica no hub (uma query por processo, não por
+conexão). Cada busca relê uma margem (POLL_OVERLAP), porque um tweet com id
+menor pode ser commitado depois; o hub descarta o que já publicou. Para
+entrega imediata entre workers, troque por um hub apoiado num broker com a
+mesma interface (publish/subscribe/unsubscribe).
+
+O id do evento é o id do tweet, então o que uma conexão perder (queda,
+fila cheia, tweet publicado em outro worker) é recuperado do banco quando o
+cliente reconecta com Last-Event-ID.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+from .models import Tweet
+
+logger = logging.getLogger(__name__)
+
+Event = namedtuple('Event', 'id author_id data')
+
+POLL_OVERLAP = timedelta(seconds=30)
+
+
+def poll_interval():
+    return getattr(settings, 'TWEET_STREAM_CATCHUP', 15)
+
+
+def queue_size():
+    return getattr(settings, 'TWEET_STREAM_QUEUE_SIZE', 100)
+
+
+def compact(tweet):
+    """Payload enxuto do tweet, sem os campos que dependem de quem lê (liked_by_me...)."""
+    handle = tweet.author.email.split('@')[0]
+    return {
+        'id': tweet.id,
+        'content': tweet.content,
+        'author_id': tweet.author_id,
+        'handle': handle,
+        'timestamp': serializers.DateTimeField().to_representation(tweet.created_at),
+    }
+
+
+class Subscription:
+    """Fila limitada de uma conexão SSE; vive no event loop de quem assinou."""
+
+    def __init__(self, authors, maxsize):
+        self.authors = frozenset(authors)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, event):
+        # Cliente lento: em vez de crescer sem limite, para de enfileirar; o
+        # stream termina ao esvaziar a fila e o cliente retoma pelo Last-Event-ID
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class InProcessHub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_author = {}
+        self._published = {}  # id do tweet -> time.monotonic() da publicação, em ordem
+        self._poller = None
+
+    def subscribe(self, authors, maxsize):
+        """Chamado dentro do event loop (view async)."""
+        subscription = Subscription(authors, maxsize)
+        with self._lock:
+            for author_id in subscription.authors:
+                self._by_author.setdefault(author_id, set()).add(subscription)
+        self._start_poller()
+        return subscription
+
+    def _start_poller(self):
+        loop = asyncio.get_running_loop()
+        if self._poller is None or self._poller.done() or self._poller.get_loop() is not loop:
+            self._poller = loop.create_task(self._poll())
+
+    async def _poll(self):
+        """Publica os tweets que outros processos gravaram; termina sem assinantes."""
+        since = timezone.now()
+        while True:
+            await asyncio.sleep(poll_interval())
+            with self._lock:
+                authors = list(self._by_author)
+            if not authors:
+                return
+            started = timezone.now()
+            tweets = (
+                Tweet.objects.filter(author_id__in=authors, created_at__gte=since - POLL_OVERLAP)
+                .select_related('author').order_by('id')
+            )
+            try:
+                async for tweet in tweets:
+                    self.publish(Event(tweet.id, tweet.author_id, compact(tweet)))
+            except DatabaseError:
+                logger.warning("Stream: falha ao buscar tweets novos no banco", exc_info=True)
+                continue  # tenta de novo a partir do mesmo `since`
+            since = started
+
+    def _seen(self, event_id):
+        """True se o tweet já foi publicado há pouco; senão o registra. Chamar com o lock."""
+        now = time.monotonic()
+        window = 2 * (POLL_OVERLAP.total_seconds() + poll_interval())
+        while self._published and next(iter(self._published.values())) < now - window:
+            del self._published[next(iter(self._published))]
+        if event_id in self._published:
+            return True
+        self._published[event_id] = now
+        return False
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for author_id in subscription.authors:
+                subscribers = self._by_author.get(author_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._by_author[author_id]
+
+    def publish(self, event):
+        """Pode ser chamado de qualquer thread (views síncronas rodam fora do loop)."""
+        with self._lock:
+            if self._seen(event.id):
+                return  # relido pelo poller, ou publicado aqui e relido
+            subscribers = list(self._by_author.get(event.author_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:  # loop já encerrado (worker saindo)
+                self.unsubscribe(subscription)
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = import_string(getattr(settings, 'TWEET_EVENTS_HUB', 'tweets.events.InProcessHub'))()
+        return _hub
+
+
+def publish_tweet(tweet):
+    get_hub().publish(Event(tweet.id, tweet.author_id, compact(tweet)))
@@ -0,0 +1,57 @@
+# tweets/jobs.py
+"""
+Trabalho das timelines e dos contadores que pode sair da requisição
+(jobs/queue.py). Com JOBS_EAGER, tudo roda na hora, como antes da fila.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+
+from jobs.queue import register
+
+from . import cache as timeline_cache
+from .models import LikeCounterShard, Tweet
+from .timeline import backfill_follow, fan_out_tweet, remove_follow
+
+User = get_user_model()
+
+
+@register('timeline.fan_out')
+def fan_out(tweet_id):
+    tweet = Tweet.objects.select_related('author').filter(pk=tweet_id).first()
+    if tweet is None:
+        return  # apagado antes de o worker chegar nele
+    fan_out_tweet(tweet)
+    # Quem leu o feed entre o commit e o fan-out guardou uma página sem o tweet
+    timeline_cache.bump(tweet.author_id)
+
+
+@register('timeline.follow')
+def follow_changed(follower_id, followee_id):
+    """
+    Backfill ou limpeza conforme o estado *atual* do follow: um follow seguido
+    de unfollow pode ser processado fora de ordem sem deixar lixo na timeline.
+    """
+    users = User.objects.in_bulk([follower_id, followee_id])
+    follower, followee = users.get(follower_id), users.get(followee_id)
+    if follower is None or followee is None:
+        return
+    if followee.followers.filter(pk=follower_id).exists():
+        backfill_follow(follower, followee)
+    else:
+        remove_follow(follower, followee)
+    timeline_cache.bump(follower_id, followee_id)
+
+
+@register('likes.consolidate')
+def consolidate_likes(tweet_id):
+    """Soma as fatias do contador em Tweet.likes_count e apaga as fatias somadas."""
+    with transaction.atomic():
+        # Trava só as fatias que existem; uma fatia criada agora fica para o próximo job
+        shards = list(
+            LikeCounterShard.objects.select_for_update().filter(tweet_id=tweet_id).values_list('id', 'count')
+        )
+        if not shards:
+            return
+        Tweet.objects.filter(pk=tweet_id).update(likes_count=F('likes_count') + sum(count for _, count in shards))
+        LikeCounterShard.objects.filter(id__in=[pk for pk, _ in shards]).delete()
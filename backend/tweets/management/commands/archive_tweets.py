@@ -0,0 +1,78 @@
+# tweets/management/commands/archive_tweets.py
+"""
+Move tweets antigos, com comentários e likes, para o arquivo frio (tweets/archive.py).
+
+    python manage.py archive_tweets                      # mais velhos que TWEET_ARCHIVE_AFTER_DAYS
+    python manage.py archive_tweets --before 2024-01-01 --batch-size 200 --pause 0.5
+
+Cada lote é uma transação curta (no máximo --batch-size tweets), então o
+comando pode rodar com o site no ar e ser interrompido a qualquer momento.
+"""
+import time
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from tweets import archive
+from tweets.models import Tweet
+
+
+class Command(BaseCommand):
+    help = "Arquiva os tweets anteriores ao corte em partições mensais comprimidas, em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'TWEET_ARCHIVE_AFTER_DAYS', 365),
+                            help="Arquiva tweets com mais de N dias.")
+        parser.add_argument('--before', help="Corte explícito (data ou data/hora ISO); tem prioridade sobre --days.")
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'TWEET_ARCHIVE_BATCH_SIZE', 500),
+                            help="Tweets por transação.")
+        parser.add_argument('--max-batches', type=int, help="Para depois de N lotes.")
+        parser.add_argument('--pause', type=float, default=0.0, help="Segundos de pausa entre lotes.")
+        parser.add_argument('--dry-run', action='store_true', help="Apenas conta os tweets que seriam arquivados.")
+
+    def handle(self, *args, days, before, batch_size, max_batches, pause, dry_run, **options):
+        if not archive.supported(connection):
+            raise CommandError(f"Arquivo de tweets não suportado em {connection.vendor}.")
+        if batch_size < 1:
+            raise CommandError("--batch-size precisa ser positivo.")
+        cutoff = self.cutoff(days, before)
+
+        if dry_run:
+            pending = Tweet.objects.filter(created_at__lt=cutoff).count()
+            self.stdout.write(f"{pending} tweets anteriores a {cutoff.isoformat()} seriam arquivados.")
+            return
+
+        totals = {'tweets': 0, 'comments': 0, 'likes': 0}
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            moved = archive.archive_batch(cutoff, batch_size)
+            if not moved['tweets']:
+                break
+            batches += 1
+            for key, value in moved.items():
+                totals[key] += value
+            if moved['tweets'] < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+        self.stdout.write(
+            f"{totals['tweets']} tweets arquivados ({totals['comments']} comentários, "
+            f"{totals['likes']} likes) em {batches} lotes."
+        )
+
+    def cutoff(self, days, before):
+        if before is None:
+            return timezone.now() - timedelta(days=days)
+        try:
+            value = parse_datetime(before) or parse_datetime(f'{before}T00:00:00')
+        except ValueError:
+            value = None
+        if value is None:
+            raise CommandError(f"--before inválido: {before}")
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, dt_timezone.utc)
+        return value
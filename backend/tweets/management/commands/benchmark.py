@@ -0,0 +1,119 @@
+# tweets/management/commands/benchmark.py
+"""
+Benchmark dos endpoints (ver tweets/benchmark.py).
+
+Por padrão cria um banco de teste descartável, gera o dataset com
+`generate_dataset` (mesma seed = mesmo dataset) e roda os cenários nele;
+o banco de desenvolvimento não é tocado.
+
+    python manage.py benchmark --output bench.json
+    python manage.py benchmark --baseline benchmarks/baseline.json   # falha se regredir
+    python manage.py benchmark --save-baseline benchmarks/baseline.json
+"""
+import json
+import sys
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+
+from tweets.benchmark import compare, run_benchmark, scenario_names
+
+User = get_user_model()
+
+DATASET_DOMAIN = 'bench.example.com'
+
+
+class Command(BaseCommand):
+    help = "Mede latência (p50/p95/p99), throughput, queries SQL e bytes dos principais endpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help="Requisições medidas por endpoint.")
+        parser.add_argument('--warmup', type=int, default=20, help="Requisições descartadas antes de medir.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--sample-users', type=int, default=100, help="Usuários que fazem as requisições.")
+        parser.add_argument('--only', nargs='+', choices=scenario_names(), help="Roda só estes endpoints.")
+        parser.add_argument('--users', type=int, default=2000, help="Tamanho do dataset gerado.")
+        parser.add_argument('--tweets', type=int, default=20000)
+        parser.add_argument('--likes', type=int, default=60000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--no-cache', action='store_true', help="Desliga o cache de página da timeline.")
+        parser.add_argument('--use-current-db', action='store_true',
+                            help="Roda no banco configurado, sem gerar dataset (ex.: cópia de produção).")
+        parser.add_argument('--keepdb', action='store_true', help="Reaproveita o banco de teste entre execuções.")
+        parser.add_argument('--output', help="Arquivo JSON de saída (padrão: stdout).")
+        parser.add_argument('--baseline', help="JSON de referência; o comando falha se houver regressão.")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Folga de latência sobre o baseline (0.25 = +25%%).")
+        parser.add_argument('--query-tolerance', type=float, default=0,
+                            help="Queries a mais por requisição aceitas sobre o baseline.")
+        parser.add_argument('--save-baseline', help="Grava o resultado como novo baseline.")
+
+    def handle(self, *args, **options):
+        settings_override = override_settings(TIMELINE_CACHE_ENABLED=False) if options['no_cache'] else None
+        if settings_override:
+            settings_override.enable()
+        try:
+            if options['use_current_db']:
+                report = self.run(options, users=None)
+            else:
+                report = self.run_on_test_db(options)
+        finally:
+            if settings_override:
+                settings_override.disable()
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            Path(options['output']).write_text(output + '\n')
+        else:
+            self.stdout.write(output)
+        if options['save_baseline']:
+            Path(options['save_baseline']).write_text(output + '\n')
+            self.stderr.write(f"Baseline salvo em {options['save_baseline']}.")
+        if options['baseline']:
+            self.check_baseline(report, options)
+
+    def run(self, options, users):
+        return run_benchmark(
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            seed=options['seed'],
+            sample_users=options['sample_users'],
+            only=options['only'],
+            users=users,
+        )
+
+    def run_on_test_db(self, options):
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0, interactive=False, keepdb=options['keepdb'],
+            aliases={'default'}, serialized_aliases=set(),
+        )
+        try:
+            users = User.objects.filter(email__endswith=f"@{DATASET_DOMAIN}")
+            if not users.exists():
+                self.stderr.write("Gerando dataset...")
+                call_command(
+                    'generate_dataset', users=options['users'], tweets=options['tweets'],
+                    likes=options['likes'], comments=options['comments'], seed=options['seed'],
+                    email_domain=DATASET_DOMAIN, stdout=sys.stderr,
+                )
+            self.stderr.write("Medindo...")
+            return self.run(options, users)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+    def check_baseline(self, report, options):
+        baseline = json.loads(Path(options['baseline']).read_text())
+        if baseline.get('meta', {}).get('database') != report['meta']['database']:
+            self.stderr.write("Aviso: baseline medido em outro banco; latências não são comparáveis.")
+        regressions = compare(report, baseline, options['tolerance'], options['query_tolerance'])
+        if regressions:
+            raise CommandError("Regressões em relação ao baseline:\n" + "\n".join(regressions))
+        self.stderr.write(self.style.SUCCESS("Sem regressões em relação ao baseline."))
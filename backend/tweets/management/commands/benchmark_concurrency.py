@@ -0,0 +1,145 @@
+# tweets/management/commands/benchmark_concurrency.py
+"""
+Carga com muitos clientes lentos simultâneos contra um servidor já rodando.
+
+Cada cliente abre uma conexão, envia o request aos poucos (`--trickle`
+segundos entre a primeira e a última linha, como uma rede móvel ruim) e lê a
+resposta (`--read-rate` limita a leitura). Com workers síncronos (gunicorn
+WSGI) cada requisição ocupa um worker inteiro enquanto espera; com o app ASGI
+(uvicorn) o event loop atende as outras no meio tempo. Compare, com o mesmo
+banco:
+
+    gunicorn twitter_clone.wsgi -w 4 --bind 127.0.0.1:8000
+    ASYNC_READ_PATH=1 gunicorn twitter_clone.asgi:application -k uvicorn_worker.UvicornWorker -w 4 --bind 127.0.0.1:8000
+
+    python manage.py benchmark_concurrency --email user1@bench.example.com --clients 200
+
+Em loopback, requests e respostas pequenos cabem nos buffers do kernel e o
+cliente lento quase não segura o worker síncrono; a diferença aparece quando
+a espera é no servidor (banco remoto). Para simular isso localmente, suba os
+dois servidores com DB_SIMULATED_LATENCY_MS=20.
+"""
+import asyncio
+import json
+import random
+import socket
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from tweets.benchmark import percentile
+
+User = get_user_model()
+
+READ_BUFFER = 4096
+
+
+async def _connect(host, port, recv_buffer):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if recv_buffer:
+        # Janela TCP pequena: o servidor só consegue enviar no ritmo em que lemos
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, (host, port))
+    return await asyncio.open_connection(sock=sock)
+
+
+async def slow_request(host, port, lines, trickle, read_rate, timeout):
+    """
+    (status, segundos) de uma requisição enviada linha a linha ao longo de
+    `trickle` s e lida a `read_rate` bytes/s (0 = sem limite).
+    """
+    start = time.perf_counter()
+    reader, writer = await asyncio.wait_for(_connect(host, port, READ_BUFFER if read_rate else 0), timeout)
+    try:
+        pause = trickle / max(len(lines) - 1, 1)
+        for i, line in enumerate(lines):
+            writer.write(line.encode() + b'\r\n')
+            await writer.drain()
+            if i < len(lines) - 1:
+                await asyncio.sleep(pause)
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        while chunk := await asyncio.wait_for(reader.read(READ_BUFFER), timeout):  # até o servidor fechar
+            if read_rate:
+                await asyncio.sleep(len(chunk) / read_rate)
+    finally:
+        writer.close()
+    return int(status_line.split()[1]), time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = "Mede latência/throughput com muitos clientes lentos simultâneos (WSGI x ASGI)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Servidor já em execução.")
+        parser.add_argument('--path', default='/api/tweets/')
+        parser.add_argument('--email', required=True, help="Usuário do banco do servidor usado no JWT.")
+        parser.add_argument('--clients', type=int, default=200, help="Conexões simultâneas.")
+        parser.add_argument('--requests', type=int, default=1, help="Requisições por cliente.")
+        parser.add_argument('--trickle', type=float, default=1.0, help="Segundos para enviar cada request.")
+        parser.add_argument('--read-rate', type=int, default=0,
+                            help="Bytes/s com que cada cliente lê a resposta (0 = sem limite).")
+        parser.add_argument('--ramp', type=float, default=0.0,
+                            help="Espalha o início dos clientes em até N segundos (chegadas escalonadas).")
+        parser.add_argument('--timeout', type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário {options['email']} não existe.")
+        url = urlsplit(options['url'])
+        token = RefreshToken.for_user(user).access_token
+        lines = [
+            f"GET {options['path']} HTTP/1.1",
+            f"Host: {url.netloc}",
+            f"Authorization: Bearer {token}",
+            "Accept: application/json",
+            "Connection: close",
+            "",
+        ]
+        report = asyncio.run(self.run(url.hostname, url.port or 80, lines, options))
+        self.stdout.write(json.dumps(report, indent=2))
+
+    async def run(self, host, port, lines, options):
+        rng = random.Random(0)
+
+        async def client():
+            await asyncio.sleep(rng.uniform(0, options['ramp']))
+            results = []
+            for _ in range(options['requests']):
+                try:
+                    results.append(await slow_request(
+                        host, port, lines, options['trickle'], options['read_rate'], options['timeout'],
+                    ))
+                except (OSError, asyncio.TimeoutError, IndexError, ValueError) as exc:
+                    results.append((type(exc).__name__, None))
+            return results
+
+        start = time.perf_counter()
+        batches = await asyncio.gather(*(client() for _ in range(options['clients'])))
+        wall = time.perf_counter() - start
+
+        results = [result for batch in batches for result in batch]
+        latencies = sorted(seconds * 1000 for code, seconds in results if code == 200)
+        outcomes = {}
+        for code, _ in results:
+            outcomes[str(code)] = outcomes.get(str(code), 0) + 1
+        return {
+            'clients': options['clients'],
+            'requests': len(results),
+            'ok': len(latencies),
+            'outcomes': outcomes,
+            'wall_seconds': round(wall, 2),
+            'throughput_rps': round(len(latencies) / wall, 1) if wall else 0.0,
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 1),
+                'p95': round(percentile(latencies, 95), 1),
+                'p99': round(percentile(latencies, 99), 1),
+            },
+            # Piso teórico: só o tempo que o próprio cliente leva para enviar
+            'trickle_ms': options['trickle'] * 1000,
+        }
@@ -0,0 +1,178 @@
+# tweets/management/commands/benchmark_pooling.py
+"""
+Requisições/s de um endpoint barato com e sem reaproveitamento de conexões.
+
+Para cada configuração, sobe um gunicorn WSGI com o ambiente alterado, dispara
+`--clients` clientes simultâneos e derruba o servidor:
+
+    none        SQL_CONN_MAX_AGE=0: conexão nova a cada requisição
+    persistent  SQL_CONN_MAX_AGE=60: uma conexão por worker, reaproveitada
+    pool        SQL_POOL=1: pool do psycopg 3 no processo (só Postgres)
+
+    python manage.py benchmark_pooling --clients 32 --requests 50
+
+O endpoint é o toggle-follow (POST, poucas queries curtas): as leituras
+quentes (perfil, primeira página do feed) saem dos caches em memória sem
+abrir conexão e não mediriam nada.
+
+Num banco local abrir conexão custa pouco; o ganho aparece com o banco na
+rede (TLS, autenticação). Para simular, use `--connect-ms 20`
+(DB_SIMULATED_CONNECT_MS nos servidores).
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from tweets.benchmark import percentile
+
+from .benchmark_concurrency import slow_request
+
+User = get_user_model()
+
+CONFIGS = {
+    'none': {'SQL_CONN_MAX_AGE': '0', 'SQL_POOL': '0'},
+    'persistent': {'SQL_CONN_MAX_AGE': '60', 'SQL_POOL': '0'},
+    'pool': {'SQL_POOL': '1'},
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = "Compara requisições/s com conexão nova por requisição, conexões persistentes e pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--configs', default='none,persistent,pool',
+                            help=f"Configurações, separadas por vírgula ({', '.join(CONFIGS)}).")
+        parser.add_argument('--workers', type=int, default=4, help="Workers do gunicorn.")
+        parser.add_argument('--clients', type=int, default=32, help="Clientes simultâneos.")
+        parser.add_argument('--requests', type=int, default=50, help="Requisições por cliente.")
+        parser.add_argument('--connect-ms', type=float, default=0,
+                            help="Atraso simulado ao abrir cada conexão com o banco.")
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['configs'].split(',') if name.strip()]
+        unknown = set(names) - set(CONFIGS)
+        if unknown:
+            raise CommandError(f"Configurações desconhecidas: {', '.join(sorted(unknown))}")
+        if 'pool' in names and settings.DATABASES['default']['ENGINE'] != 'django.db.backends.postgresql':
+            self.stderr.write("pool: só com Postgres (SQL_ENGINE); ignorado.")
+            names.remove('pool')
+
+        user, target = self.bench_users()
+        token = RefreshToken.for_user(user).access_token
+        report = {}
+        for name in names:
+            port = free_port()
+            lines = [
+                f"POST /api/users/toggle-follow/{target.pk}/ HTTP/1.1",
+                f"Host: 127.0.0.1:{port}",
+                f"Authorization: Bearer {token}",
+                "Content-Length: 0",
+                "Connection: close",
+                "",
+            ]
+            with self.server(name, port, options):
+                report[name] = asyncio.run(self.load(port, lines, options))
+                report[name]['health'] = self.health(port)
+            self.stderr.write(f"{name}: {report[name]['throughput_rps']} req/s")
+        if 'none' in report:
+            for name, result in report.items():
+                result['speedup_vs_none'] = round(result['throughput_rps'] / report['none']['throughput_rps'], 2)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def bench_users(self):
+        users = []
+        for email in ('pool-a@bench.example.com', 'pool-b@bench.example.com'):
+            user = User.objects.filter(email=email).first() or User.objects.create_user(email=email, password='bench-pass')
+            users.append(user)
+        return users
+
+    def server(self, name, port, options):
+        env = {
+            **os.environ, **CONFIGS[name],
+            'RATE_LIMIT_ENABLED': '0',
+            'DB_SIMULATED_CONNECT_MS': str(options['connect_ms']),
+        }
+        command = [
+            sys.executable, '-m', 'gunicorn', 'twitter_clone.wsgi',
+            '-w', str(options['workers']), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+        ]
+        return _Server(command, env, port, options['timeout'])
+
+    def health(self, port):
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/health/', timeout=5) as response:
+            return json.load(response)['databases']['default']
+
+    async def load(self, port, lines, options):
+        async def client():
+            results = []
+            for _ in range(options['requests']):
+                try:
+                    results.append(await slow_request('127.0.0.1', port, lines, 0, 0, options['timeout']))
+                except (OSError, asyncio.TimeoutError, IndexError, ValueError) as exc:
+                    results.append((type(exc).__name__, None))
+            return results
+
+        start = time.perf_counter()
+        batches = await asyncio.gather(*(client() for _ in range(options['clients'])))
+        wall = time.perf_counter() - start
+        results = [result for batch in batches for result in batch]
+        latencies = sorted(seconds * 1000 for code, seconds in results if code == 200)
+        outcomes = {}
+        for code, _ in results:
+            outcomes[str(code)] = outcomes.get(str(code), 0) + 1
+        return {
+            'requests': len(results),
+            'outcomes': outcomes,
+            'wall_seconds': round(wall, 2),
+            'throughput_rps': round(len(latencies) / wall, 1) if wall else 0.0,
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 1),
+                'p95': round(percentile(latencies, 95), 1),
+            },
+        }
+
+
+class _Server:
+    """gunicorn em subprocesso, pronto quando /health/ responde."""
+
+    def __init__(self, command, env, port, timeout):
+        self.command, self.env, self.port, self.timeout = command, env, port, timeout
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.command, env=self.env, cwd=settings.BASE_DIR)
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise CommandError(f"gunicorn saiu com código {self.process.returncode}")
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{self.port}/health/', timeout=1).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise CommandError("gunicorn não ficou pronto a tempo")
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
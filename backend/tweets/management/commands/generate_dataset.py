@@ -0,0 +1,226 @@
+# tweets/management/commands/generate_dataset.py
+"""
+Gera uma rede social sintética para benchmarks.
+
+- Seguidores em lei de potência: poucos usuários concentram a maioria dos
+  seguidores e o número de contas seguidas tem cauda longa (Pareto).
+- Tweets com autores também em lei de potência, mas num ranking de atividade
+  independente do de popularidade (senão as contas mais seguidas seriam
+  também as que mais postam e as timelines explodiriam), e horários
+  distribuídos nos últimos `--days` dias, com mais posts durante o dia.
+- Likes concentrados nos tweets de contas populares; comentários sempre
+  depois do tweet.
+
+Tudo vem de um random.Random(--seed) e de uma data base fixa (--end), então a
+mesma linha de comando gera o mesmo dataset. Inserções usam bulk_create em
+lotes, uma transação por lote; no fim os contadores e as timelines são
+recalculados em massa.
+"""
+import itertools
+import random
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from tweets.models import Comment, Tweet
+from tweets.timeline import rebuild_timelines
+from users.models import email_handle
+
+User = get_user_model()
+Follow = User.followers.through
+Like = Tweet.likes.through
+
+WORDS = (
+    "hoje amanhã café código python django deploy bug feature timeline tweet "
+    "banco índice cache query lento rápido produção teste review merge praia "
+    "futebol música filme série livro viagem trabalho reunião almoço jantar "
+    "chuva sol calor frio cidade projeto ideia dados rede seguidores"
+).split()
+
+
+@contextmanager
+def keep_created_at(*models):
+    """Desliga auto_now_add durante a carga para gravar os horários gerados."""
+    fields = [model._meta.get_field('created_at') for model in models]
+    try:
+        for field in fields:
+            field.auto_now_add = False
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def zipf_cum_weights(n, exponent):
+    """Pesos acumulados 1/(rank+1)^s: o rank 0 é o mais popular."""
+    return list(itertools.accumulate(1.0 / (rank + 1) ** exponent for rank in range(n)))
+
+
+class Command(BaseCommand):
+    help = "Gera usuários, grafo de seguidores (lei de potência), tweets, likes e comentários de forma determinística."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--tweets', type=int, default=10000)
+        parser.add_argument('--likes', type=int, default=30000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--avg-follows', type=int, default=20, help="Média de contas seguidas por usuário.")
+        parser.add_argument('--exponent', type=float, default=1.1, help="Expoente da lei de potência (popularidade).")
+        parser.add_argument('--days', type=int, default=30, help="Janela de tempo dos tweets.")
+        parser.add_argument('--end', default='2025-01-01T00:00:00+00:00', help="Data do tweet mais recente possível.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--password', default='password123', help="Senha de todos os usuários gerados.")
+        parser.add_argument('--email-domain', default='bench.example.com')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.end = datetime.fromisoformat(options['end']).astimezone(timezone.utc)
+        domain = options['email_domain']
+        if User.objects.filter(email__endswith=f"@{domain}").exists():
+            raise CommandError(f"Já existem usuários @{domain}; use outro --email-domain ou limpe o banco.")
+
+        user_ids = self.create_users(options['users'], domain)
+        popularity = user_ids[:]
+        self.rng.shuffle(popularity)  # quem é "celebridade" também vem da seed
+        weights = zipf_cum_weights(len(popularity), options['exponent'])
+
+        activity = user_ids[:]
+        self.rng.shuffle(activity)
+
+        self.create_follows(user_ids, popularity, weights)
+        tweets = self.create_tweets(options['tweets'], activity, weights)
+        rank = {pk: i for i, pk in enumerate(popularity)}
+        pick = self.tweet_picker(tweets, rank, options['exponent'])
+        self.create_likes(options['likes'], user_ids, pick)
+        self.create_comments(options['comments'], user_ids, pick)
+
+        self.stdout.write("Recalculando contadores e timelines...")
+        call_command('repair_counters', batch_size=self.batch_size, stdout=self.stdout)
+        rebuild_timelines(batch_size=self.batch_size)
+        self.stdout.write(self.style.SUCCESS("Dataset gerado."))
+
+    # ------------------------------------------------------------------
+    def bulk_insert(self, model, objects, **kwargs):
+        """bulk_create em lotes de --batch-size, uma transação por lote."""
+        total = 0
+        iterator = iter(objects)
+        while batch := list(itertools.islice(iterator, self.batch_size)):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=self.batch_size, **kwargs)
+            total += len(batch)
+        return total
+
+    def new_ids(self, model, before):
+        return list(model.objects.filter(pk__gt=before).order_by('pk').values_list('pk', flat=True))
+
+    def random_time(self):
+        """Horário nos últimos --days dias, com pico entre 9h e 23h."""
+        day = self.rng.randrange(self.options['days'])
+        hour = self.rng.choice(range(9, 24)) if self.rng.random() < 0.8 else self.rng.randrange(24)
+        moment = (self.end - timedelta(days=day)).replace(
+            hour=hour, minute=self.rng.randrange(60), second=self.rng.randrange(60),
+        )
+        if moment > self.end:
+            # Horário depois de --end no último dia: vai para o início da janela
+            moment -= timedelta(days=self.options['days'])
+        return moment
+
+    def sentence(self, size):
+        return " ".join(self.rng.choice(WORDS) for _ in range(size)).capitalize()
+
+    # ------------------------------------------------------------------
+    def create_users(self, count, domain):
+        password = make_password(self.options['password'])  # um único hash: PBKDF2 por usuário seria lento demais
+        before = User.objects.aggregate(m=Max('pk'))['m'] or 0
+        joined = self.end - timedelta(days=self.options['days'])
+
+        def users():
+            for i in range(count):
+                email = f"user{i}@{domain}"
+                yield User(email=email, handle=email_handle(email), password=password,
+                           bio=self.sentence(6), date_joined=joined)
+
+        self.bulk_insert(User, users())
+        ids = self.new_ids(User, before)
+        self.stdout.write(f"{len(ids)} usuários.")
+        return ids
+
+    def create_follows(self, user_ids, popularity, weights):
+        # Pareto com média ~avg-follows; cada usuário segue contas sorteadas pela popularidade
+        alpha = 2.0
+        scale = self.options['avg_follows'] * (alpha - 1) / alpha
+
+        def follows():
+            for follower in user_ids:
+                wanted = min(int(scale * self.rng.paretovariate(alpha)), len(user_ids) - 1)
+                targets = set(self.rng.choices(popularity, cum_weights=weights, k=wanted))
+                targets.discard(follower)
+                for followee in sorted(targets):
+                    yield Follow(from_user_id=followee, to_user_id=follower)
+
+        total = self.bulk_insert(Follow, follows(), ignore_conflicts=True)
+        self.stdout.write(f"{total} follows.")
+
+    def create_tweets(self, count, activity, weights):
+        before = Tweet.objects.aggregate(m=Max('pk'))['m'] or 0
+        authors = self.rng.choices(activity, cum_weights=weights, k=count)
+
+        def tweets():
+            for author_id in authors:
+                yield Tweet(author_id=author_id, content=self.sentence(self.rng.randint(3, 20)),
+                            created_at=self.random_time())
+
+        with keep_created_at(Tweet):
+            self.bulk_insert(Tweet, tweets())
+        rows = list(Tweet.objects.filter(pk__gt=before).order_by('pk').values_list('pk', 'author_id', 'created_at'))
+        self.stdout.write(f"{len(rows)} tweets.")
+        return rows
+
+    def tweet_picker(self, tweets, rank, exponent):
+        """Sorteia tweets com peso pela popularidade do autor (mesma lei de potência dos follows)."""
+        if not tweets:
+            return None
+        cum = list(itertools.accumulate(1.0 / (rank[author_id] + 1) ** exponent for _, author_id, _ in tweets))
+        return lambda: tweets[min(bisect_left(cum, self.rng.random() * cum[-1]), len(tweets) - 1)]
+
+    def create_likes(self, count, user_ids, pick):
+        if pick is None or not count:
+            return
+
+        def likes():
+            seen = set()
+            for _ in range(count):
+                tweet_id = pick()[0]
+                pair = (tweet_id, self.rng.choice(user_ids))
+                if pair not in seen:
+                    seen.add(pair)
+                    yield Like(tweet_id=pair[0], user_id=pair[1])
+
+        total = self.bulk_insert(Like, likes(), ignore_conflicts=True)
+        self.stdout.write(f"{total} likes.")
+
+    def create_comments(self, count, user_ids, pick):
+        if pick is None or not count:
+            return
+
+        def comments():
+            for _ in range(count):
+                tweet_id, _, created_at = pick()
+                delay = timedelta(minutes=self.rng.randint(1, 60 * 24))
+                # Tweets perto de --end: o comentário não passa do fim da janela
+                yield Comment(tweet_id=tweet_id, author_id=self.rng.choice(user_ids),
+                              content=self.sentence(self.rng.randint(2, 12)), created_at=min(created_at + delay, self.end))
+
+        with keep_created_at(Comment):
+            total = self.bulk_insert(Comment, comments())
+        self.stdout.write(f"{total} comentários.")
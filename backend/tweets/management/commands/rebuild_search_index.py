@@ -0,0 +1,14 @@
+# tweets/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from tweets.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Recria o índice full-text de tweets (FTS5 no SQLite, GIN/tsvector no PostgreSQL)."
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        backend.rebuild()
+        self.stdout.write(f"Índice de busca reconstruído ({connection.vendor}: {type(backend).__name__}).")
@@ -0,0 +1,15 @@
+# tweets/management/commands/rebuild_timelines.py
+from django.core.management.base import BaseCommand
+
+from tweets.timeline import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = "Rematerializa as timelines (TimelineEntry) a partir de tweets e follows existentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Tweets por lote (faixa de ids).")
+
+    def handle(self, *args, batch_size, **options):
+        batches = rebuild_timelines(batch_size=batch_size)
+        self.stdout.write(f"Timelines reconstruídas em {batches} lotes.")
@@ -0,0 +1,76 @@
+# tweets/management/commands/repair_counters.py
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F, Max, Q
+
+from tweets import archive
+from tweets.models import ArchivedTweet, Comment, LikeCounterShard, Tweet, count_subquery, pending_likes_subquery
+
+User = get_user_model()
+
+
+def counter_specs():
+    """(model, {coluna: expressão que recalcula o valor real}, {coluna: valor armazenado})"""
+    follows = User.followers.through.objects.all()
+    tweets = count_subquery(Tweet.objects.all(), 'author_id')
+    if archive.supported(connection):
+        # Tweets arquivados continuam contando no perfil
+        tweets += count_subquery(ArchivedTweet.objects.all(), 'author_id')
+    return [
+        (Tweet, {
+            'likes_count': count_subquery(Tweet.likes.through.objects.all(), 'tweet_id'),
+            'comments_count': count_subquery(Comment.objects.all(), 'tweet_id'),
+        }, {
+            # likes = base + fatias ainda não consolidadas (tweets/counters.py)
+            'likes_count': F('likes_count') + pending_likes_subquery(),
+        }),
+        (User, {
+            'followers_count': count_subquery(follows, 'from_user_id'),
+            'following_count': count_subquery(follows, 'to_user_id'),
+            'tweets_count': tweets,
+        }, {}),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Recalcula os contadores desnormalizados (Tweet e User) e corrige divergências em lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Linhas por lote (faixa de ids).")
+        parser.add_argument('--dry-run', action='store_true', help="Apenas reporta as divergências.")
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        for model, real, stored in counter_specs():
+            fixed = self.repair_model(model, real, stored, batch_size, dry_run)
+            verb = "divergentes" if dry_run else "corrigidos"
+            self.stdout.write(f"{model.__name__}: {fixed} registros {verb}.")
+
+    def repair_model(self, model, real, stored, batch_size, dry_run):
+        fields = list(real)
+        annotations = {f'real_{name}': expr for name, expr in real.items()}
+        annotations.update({f'stored_{name}': expr for name, expr in stored.items()})
+        drifted = Q()
+        for name in fields:
+            current = F(f'stored_{name}') if name in stored else F(name)
+            drifted |= ~Q(**{f'real_{name}': current})
+
+        last_id = model.objects.aggregate(m=Max('pk'))['m'] or 0
+        fixed = 0
+        for start in range(0, last_id + 1, batch_size):
+            with transaction.atomic():
+                rows = list(
+                    model.objects.filter(pk__gte=start, pk__lt=start + batch_size)
+                    .annotate(**annotations).filter(drifted)
+                    .select_for_update().only('pk', *fields)
+                )
+                for row in rows:
+                    for name in fields:
+                        setattr(row, name, getattr(row, f'real_{name}'))
+                if rows and not dry_run:
+                    model.objects.bulk_update(rows, fields)
+                    if model is Tweet:
+                        # O valor real já inclui os likes pendentes nas fatias
+                        LikeCounterShard.objects.filter(tweet__in=rows).delete()
+            fixed += len(rows)
+        return fixed
@@ -0,0 +1,42 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_timelines(apps, schema_editor):
+    """Materializa as timelines a partir dos tweets e follows já existentes."""
+    User = apps.get_model('users', 'User')
+    Tweet = apps.get_model('tweets', 'Tweet')
+    TimelineEntry = apps.get_model('tweets', 'TimelineEntry')
+    limit = getattr(settings, 'TIMELINE_FANOUT_FOLLOWER_LIMIT', 5000)
+
+    followers = defaultdict(list)
+    for followee_id, follower_id in User.followers.through.objects.values_list('from_user_id', 'to_user_id'):
+        followers[followee_id].append(follower_id)
+
+    entries = []
+    for tweet_id, author_id, created_at in Tweet.objects.values_list('id', 'author_id', 'created_at').iterator():
+        owners = [author_id]
+        if len(followers[author_id]) <= limit:
+            owners += followers[author_id]
+        entries += [TimelineEntry(owner_id=owner_id, tweet_id=tweet_id, created_at=created_at) for owner_id in owners]
+        if len(entries) >= BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            entries = []
+    if entries:
+        TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tweets', '0006_timelineentry'),
+        ('users', '0003_remove_user_following_user_followers'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
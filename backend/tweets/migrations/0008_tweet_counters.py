@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:33
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, field):
+    counted = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(n=Count('*')).values('n')
+    return Coalesce(Subquery(counted), Value(0))
+
+
+def populate_counters(apps, schema_editor):
+    """Preenche os contadores desnormalizados a partir dos dados existentes."""
+    User = apps.get_model('users', 'User')
+    Tweet = apps.get_model('tweets', 'Tweet')
+    Comment = apps.get_model('tweets', 'Comment')
+    follows = User.followers.through.objects.all()
+
+    Tweet.objects.update(
+        likes_count=_count(Tweet.likes.through.objects.all(), 'tweet_id'),
+        comments_count=_count(Comment.objects.all(), 'tweet_id'),
+    )
+    User.objects.update(
+        followers_count=_count(follows, 'from_user_id'),
+        following_count=_count(follows, 'to_user_id'),
+        tweets_count=_count(Tweet.objects.all(), 'author_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tweets', '0007_backfill_timelines'),
+        ('users', '0004_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tweet',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tweet',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
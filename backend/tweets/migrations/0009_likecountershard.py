@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tweets', '0008_tweet_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LikeCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('tweet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='like_shards', to='tweets.tweet')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tweet', 'shard'), name='unique_like_counter_shard')],
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.db import migrations
+
+# DDL congelado nesta migration (não importa tweets/search.py): mudanças
+# futuras no módulo não alteram o que ela aplica. O post_migrate de
+# tweets/search.py reaplica o schema atual depois de todas as migrations.
+FTS_TABLE = 'tweets_tweet_fts'
+PG_INDEX = 'tweets_tweet_search_idx'
+
+SQLITE_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"content, content='tweets_tweet', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON tweets_tweet BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON tweets_tweet BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF content ON tweets_tweet BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content); "
+    f"INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')",
+]
+
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+PG_DROP = [
+    f"DROP INDEX IF EXISTS {PG_INDEX}",
+    "ALTER TABLE tweets_tweet DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def pg_schema():
+    config = getattr(settings, 'SEARCH_TEXT_CONFIG', 'simple')
+    return [
+        "ALTER TABLE tweets_tweet ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{config}'::regconfig, coalesce(content, ''))) STORED",
+        f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON tweets_tweet USING GIN (search_vector)",
+    ]
+
+
+def create_search_index(apps, schema_editor):
+    """FTS5 + triggers no SQLite, tsvector gerado + GIN no PostgreSQL."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        statements = SQLITE_SCHEMA
+    elif vendor == 'postgresql':
+        statements = pg_schema()
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_DROP, 'postgresql': PG_DROP}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tweets', '0009_likecountershard'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.db import migrations, models
+
+# DDL congelado nesta migration (não importa tweets/archive.py, que importa os
+# models atuais): mudanças futuras no módulo não alteram o que ela aplica.
+ARCHIVE_TABLE = 'tweets_archive'
+COLUMNS = ['id', 'author_id', 'created_at', 'archived_at', 'likes_count', 'comments_count', 'payload']
+
+PG_SCHEMA = [
+    f"CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE} ("
+    "id bigint NOT NULL, author_id bigint NOT NULL, created_at timestamptz NOT NULL, "
+    "archived_at timestamptz NOT NULL, likes_count integer NOT NULL, comments_count integer NOT NULL, "
+    "payload bytea NOT NULL, PRIMARY KEY (created_at, id)) PARTITION BY RANGE (created_at)",
+    f"CREATE INDEX IF NOT EXISTS {ARCHIVE_TABLE}_id_idx ON {ARCHIVE_TABLE} (id)",
+    f"CREATE INDEX IF NOT EXISTS {ARCHIVE_TABLE}_author_idx ON {ARCHIVE_TABLE} (author_id, created_at)",
+]
+
+# Sem partições ainda: a view começa vazia e é recriada quando surge um mês novo
+SQLITE_SCHEMA = [
+    f"DROP VIEW IF EXISTS {ARCHIVE_TABLE}",
+    f"CREATE VIEW {ARCHIVE_TABLE} AS SELECT " + ', '.join(f'NULL AS {column}' for column in COLUMNS) + ' WHERE 0',
+]
+
+
+def create_archive(apps, schema_editor):
+    """Tabela particionada por mês no PostgreSQL, view sobre as tabelas mensais no SQLite."""
+    statements = {'sqlite': SQLITE_SCHEMA, 'postgresql': PG_SCHEMA}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_archive(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {ARCHIVE_TABLE}")  # leva as partições junto
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB %s",
+                [f'{ARCHIVE_TABLE}_p[0-9]*'],
+            )
+            partitions = [row[0] for row in cursor.fetchall()]
+        schema_editor.execute(f"DROP VIEW IF EXISTS {ARCHIVE_TABLE}")
+        for name in partitions:
+            schema_editor.execute(f"DROP TABLE {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tweets', '0010_tweet_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTweet',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+                ('likes_count', models.PositiveIntegerField()),
+                ('comments_count', models.PositiveIntegerField()),
+                ('payload', models.BinaryField()),
+                ('author', models.ForeignKey(db_constraint=False, on_delete=models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'tweets_archive',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_archive, drop_archive),
+    ]
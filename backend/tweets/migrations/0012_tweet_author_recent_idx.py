@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tweets', '0011_archivedtweet'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tweet',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='tweet_author_recent_idx'),
+        ),
+    ]
@@ -1,16 +1,65 @@
 # tweets/models.py
 from django.db import models
+from django.db.models import Count, Exists, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.utils.functional import cached_property
 
 User = get_user_model()
 
+
+def count_subquery(queryset, field):
+    """COUNT(*) correlacionado por `field`, sem o GROUP BY/JOIN de Count() no queryset externo."""
+    counted = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(n=Count('*')).values('n')
+    return Coalesce(Subquery(counted), Value(0))
+
+
+def pending_likes_subquery():
+    """Soma das fatias de LikeCounterShard de cada tweet (ver tweets/counters.py)."""
+    summed = (
+        LikeCounterShard.objects.filter(tweet_id=OuterRef('pk')).order_by()
+        .values('tweet_id').annotate(total=Sum('count')).values('total')
+    )
+    return Coalesce(Subquery(summed), Value(0))
+
+
+class TweetQuerySet(models.QuerySet):
+    def with_engagement(self, user=None):
+        """
+        Anota as flags usadas pelo TweetSerializer (is_liked, is_author_followed)
+        e a soma das fatias de likes (pending_likes) para que a página inteira
+        saia em uma query.
+        """
+        queryset = self.select_related('author').annotate(pending_likes=pending_likes_subquery())
+        if user is not None and user.is_authenticated:
+            queryset = queryset.annotate(
+                is_liked=Exists(Tweet.likes.through.objects.filter(tweet_id=OuterRef('pk'), user_id=user.id)),
+                is_author_followed=Exists(User.followers.through.objects.filter(
+                    from_user_id=OuterRef('author_id'), to_user_id=user.id,
+                )),
+            )
+        return queryset
+
+
 class Tweet(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     likes = models.ManyToManyField(User, related_name="liked_tweets", blank=True)
 
+    # Contadores desnormalizados (atualizados com F(); ver `manage.py repair_counters`)
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = TweetQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Tweets das celebridades seguidas (mesclados no feed) e backfill de follow
+            models.Index(fields=['author', '-created_at', '-id'], name='tweet_author_recent_idx'),
+        ]
+
 class Comment(models.Model):
     tweet = models.ForeignKey(Tweet, related_name='comments', on_delete=models.CASCADE)
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -20,3 +69,66 @@ class Comment(models.Model):
 
     def __str__(self):
         return f"{self.author.username}: {self.content[:20]}"
+
+
+class TimelineEntry(models.Model):
+    """
+    Linha materializada da timeline de um usuário (fan-out-on-write).
+    `created_at` é copiado do tweet para que a leitura seja um range scan
+    no índice (owner, created_at).
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='timeline_entries', on_delete=models.CASCADE)
+    tweet = models.ForeignKey(Tweet, related_name='timeline_entries', on_delete=models.CASCADE)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'tweet'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-tweet'], name='timeline_owner_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner_id} <- tweet {self.tweet_id}"
+
+
+class LikeCounterShard(models.Model):
+    """
+    Fatia do contador de likes de um tweet. Cada like/unlike soma +1/-1 em uma
+    fatia aleatória, então likes simultâneos num tweet viral não disputam a mesma
+    linha. Total = Tweet.likes_count (base consolidada) + soma das fatias.
+    """
+    tweet = models.ForeignKey(Tweet, related_name='like_shards', on_delete=models.CASCADE)
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)  # delta, pode ser negativo
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tweet', 'shard'], name='unique_like_counter_shard'),
+        ]
+
+
+class ArchivedTweet(models.Model):
+    """
+    Tweet movido para o arquivo frio por `manage.py archive_tweets` (ver
+    tweets/archive.py). A tabela é a mãe particionada por mês (Postgres) ou
+    uma view sobre as tabelas mensais (SQLite), por isso não é gerenciada.
+    Conteúdo, comentários e likes ficam comprimidos em `payload`.
+    """
+    id = models.BigIntegerField(primary_key=True)  # mesmo id que o tweet tinha
+    author = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+    likes_count = models.PositiveIntegerField()
+    comments_count = models.PositiveIntegerField()
+    payload = models.BinaryField()
+
+    class Meta:
+        managed = False
+        db_table = 'tweets_archive'
+
+    @cached_property
+    def data(self):
+        from .archive import load
+        return load(self.payload)
@@ -0,0 +1,218 @@
+# tweets/pagination.py
+"""
+Paginação por keyset (cursor) em (created_at, id).
+
+Ao contrário de OFFSET, cada página é um range scan a partir do cursor, então
+a página N custa o mesmo que a página 1. O cursor é opaco para o cliente.
+"""
+import base64
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .models import Tweet
+from .search import search_tweet_ids
+from .timeline import atimeline_keys, timeline_keys
+
+
+def encode_parts(*parts):
+    raw = '|'.join(str(part) for part in parts).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_parts(cursor, *parsers):
+    """Aplica um parser por parte do cursor; levanta NotFound se o cursor for inválido."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        parts = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        if len(parts) != len(parsers):
+            raise ValueError(cursor)
+        values = tuple(parse(part) for parse, part in zip(parsers, parts))
+        if None in values:
+            raise ValueError(cursor)
+        return values
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise NotFound('Cursor inválido.')
+
+
+def encode_cursor(created_at, pk):
+    return encode_parts(created_at.isoformat(), pk)
+
+
+def decode_cursor(cursor):
+    """Retorna (created_at, id) ou levanta NotFound se o cursor for inválido."""
+    return decode_parts(cursor, parse_datetime, int)
+
+
+class KeysetPagination(BasePagination):
+    """
+    `?before=<cursor>` traz itens mais antigos, `?after=<cursor>` mais novos.
+    O tamanho da página vem de `?page_size=` (limitado por API_MAX_PAGE_SIZE).
+    """
+    before_query_param = 'before'
+    after_query_param = 'after'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        default = getattr(settings, 'API_PAGE_SIZE', 20)
+        maximum = getattr(settings, 'API_MAX_PAGE_SIZE', 100)
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, default))
+        except (TypeError, ValueError):
+            size = default
+        return max(1, min(size, maximum))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._page(list(self._keyset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """Versão async (views ASGI): mesma query, lida com o ORM async."""
+        return self._page([obj async for obj in self._keyset(queryset, request)])
+
+    def _keyset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.before = request.query_params.get(self.before_query_param)
+        self.after = request.query_params.get(self.after_query_param)
+
+        if self.after:
+            created_at, pk = decode_cursor(self.after)
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+            ).order_by('created_at', 'pk')
+        else:
+            if self.before:
+                created_at, pk = decode_cursor(self.before)
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+                )
+            queryset = queryset.order_by('-created_at', '-pk')
+
+        # Um item a mais só para saber se existe próxima página
+        return queryset[:self.page_size + 1]
+
+    def _page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.after:
+            rows.reverse()
+
+        self.page = rows
+        # Mais antigos existem se havia sobra (sem `after`) ou se viemos de um `after`
+        self.has_older = has_more if not self.after else True
+        # Mais novos existem se viemos de um `before` ou se havia sobra num `after`
+        self.has_newer = bool(self.before) if not self.after else has_more
+        return rows
+
+    def _link(self, param, obj):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.before_query_param)
+        url = remove_query_param(url, self.after_query_param)
+        return replace_query_param(url, param, encode_cursor(obj.created_at, obj.pk))
+
+    def get_next_link(self):
+        if not self.page or not self.has_older:
+            return None
+        return self._link(self.before_query_param, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.page or not self.has_newer:
+            return None
+        return self._link(self.after_query_param, self.page[0])
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class TimelinePagination(KeysetPagination):
+    """
+    Mesmo cursor em (created_at, id), mas o feed pagina sobre as chaves de
+    TimelineEntry (tweets/timeline.py) e só busca os tweets da página.
+    """
+
+    def paginate_timeline(self, user, queryset, request):
+        keys = timeline_keys(user, *self._cursors(request))
+        return self._timeline_page(keys, queryset.in_bulk([pk for _, pk in keys]))
+
+    async def apaginate_timeline(self, user, queryset, request):
+        keys = await atimeline_keys(user, *self._cursors(request))
+        return self._timeline_page(keys, await queryset.ain_bulk([pk for _, pk in keys]))
+
+    def _cursors(self, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.before = request.query_params.get(self.before_query_param)
+        self.after = request.query_params.get(self.after_query_param)
+        before = decode_cursor(self.before) if self.before and not self.after else None
+        after = decode_cursor(self.after) if self.after else None
+        # Um item a mais só para saber se existe próxima página
+        return before, after, self.page_size + 1
+
+    def _timeline_page(self, keys, tweets):
+        # Tweet apagado entre as duas queries: fica fora da página
+        return self._page([tweets[pk] for _, pk in keys if pk in tweets])
+
+
+class SearchPagination(KeysetPagination):
+    """
+    Keyset sobre (score, id) para resultados ranqueados da busca full-text.
+    Só anda para frente: `?before=<cursor>` traz os próximos resultados.
+    """
+
+    def paginate_search(self, query, request):
+        hits = self._search_hits(query, request)
+        tweets = Tweet.objects.with_engagement(request.user).in_bulk([pk for pk, _ in hits])
+        return self._search_page(hits, tweets)
+
+    async def apaginate_search(self, query, request):
+        hits = await sync_to_async(self._search_hits)(query, request)
+        tweets = await Tweet.objects.with_engagement(request.user).ain_bulk([pk for pk, _ in hits])
+        return self._search_page(hits, tweets)
+
+    def _search_hits(self, query, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        before = request.query_params.get(self.before_query_param)
+        cursor = decode_parts(before, float, int) if before else None
+
+        hits = search_tweet_ids(query, self.page_size + 1, cursor)
+        self.has_older = len(hits) > self.page_size
+        hits = hits[:self.page_size]
+        self.last_hit = hits[-1] if hits else None
+        return hits
+
+    def _search_page(self, hits, tweets):
+        self.page = [tweets[pk] for pk, _ in hits if pk in tweets]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_older or self.last_hit is None:
+            return None
+        pk, score = self.last_hit
+        url = remove_query_param(self.request.build_absolute_uri(), self.after_query_param)
+        return replace_query_param(url, self.before_query_param, encode_parts(repr(float(score)), pk))
+
+    def get_previous_link(self):
+        return None
@@ -0,0 +1,193 @@
+# tweets/search.py
+"""
+Busca full-text de tweets.
+
+- SQLite: tabela virtual FTS5 `tweets_tweet_fts` (external content) mantida por
+  triggers de insert/update/delete, ranqueada por bm25.
+- PostgreSQL: coluna gerada `search_vector` (tsvector) com índice GIN,
+  ranqueada por ts_rank.
+- Outros bancos: fallback com `icontains` (sem índice, score 0).
+
+O schema é criado na migration 0010_tweet_search_index e reaplicado em todo
+post_migrate (no SQLite, recriar a tabela tweets_tweet numa migration apaga
+os triggers). `manage.py rebuild_search_index` reconstrói o índice.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.migrations.recorder import MigrationRecorder
+
+FTS_TABLE = 'tweets_tweet_fts'
+PG_INDEX = 'tweets_tweet_search_idx'
+SCHEMA_MIGRATION = '0010_tweet_search_index'
+
+SQLITE_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"content, content='tweets_tweet', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON tweets_tweet BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON tweets_tweet BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF content ON tweets_tweet BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content); "
+    f"INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content); END",
+]
+
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+PG_DROP = [
+    f"DROP INDEX IF EXISTS {PG_INDEX}",
+    "ALTER TABLE tweets_tweet DROP COLUMN IF EXISTS search_vector",
+]
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_config():
+    """Configuração de text search do PostgreSQL (ex.: 'simple', 'portuguese')."""
+    return getattr(settings, 'SEARCH_TEXT_CONFIG', 'simple')
+
+
+def pg_schema():
+    return [
+        "ALTER TABLE tweets_tweet ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{search_config()}'::regconfig, coalesce(content, ''))) STORED",
+        f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON tweets_tweet USING GIN (search_vector)",
+    ]
+
+
+def pg_vector_expression(conn):
+    """Expressão atual da coluna gerada `search_vector` (None se ainda não existe)."""
+    with conn.cursor() as db:
+        db.execute(
+            "SELECT pg_get_expr(d.adbin, d.adrelid) FROM pg_attrdef d "
+            "JOIN pg_attribute a ON a.attrelid = d.adrelid AND a.attnum = d.adnum "
+            "WHERE d.adrelid = 'tweets_tweet'::regclass AND a.attname = 'search_vector'"
+        )
+        row = db.fetchone()
+    return row[0] if row else None
+
+
+def _execute(conn, statements):
+    with conn.cursor() as db:
+        for statement in statements:
+            db.execute(statement)
+
+
+def install_schema(conn):
+    """Cria (de forma idempotente) o índice full-text no banco de `conn`."""
+    if conn.vendor == 'sqlite':
+        _execute(conn, SQLITE_SCHEMA)
+    elif conn.vendor == 'postgresql':
+        _execute(conn, pg_schema())
+
+
+def drop_schema(conn):
+    if conn.vendor == 'sqlite':
+        _execute(conn, SQLITE_DROP)
+    elif conn.vendor == 'postgresql':
+        _execute(conn, PG_DROP)
+
+
+def ensure_search_schema(sender, using, **kwargs):
+    """Handler de post_migrate: recria triggers/índice que uma migration possa ter removido."""
+    conn = connections[using]
+    if ('tweets', SCHEMA_MIGRATION) in MigrationRecorder(conn).applied_migrations():
+        install_schema(conn)
+
+
+def _tokens(query):
+    return TOKEN_RE.findall(query)
+
+
+def _keyset_sql(cursor):
+    """Condição para ficar depois do cursor (score, id) na ordem score DESC, id DESC."""
+    if cursor is None:
+        return '', []
+    score, pk = cursor
+    return 'WHERE score < %s OR (score = %s AND id < %s)', [score, score, pk]
+
+
+class SQLiteFTSBackend:
+    def search(self, query, limit, cursor=None):
+        tokens = _tokens(query)
+        if not tokens:
+            return []
+        # Cada termo entre aspas (AND implícito): entrada do usuário nunca vira sintaxe FTS5
+        match = ' '.join('"%s"' % token for token in tokens)
+        where, params = _keyset_sql(cursor)
+        sql = (
+            f'SELECT id, score FROM ('
+            f'  SELECT rowid AS id, -bm25({FTS_TABLE}) AS score FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+            f') {where} ORDER BY score DESC, id DESC LIMIT %s'
+        )
+        with connection.cursor() as db:
+            db.execute(sql, [match, *params, limit])
+            return db.fetchall()
+
+    def rebuild(self):
+        install_schema(connection)
+        with connection.cursor() as db:
+            db.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+
+
+class PostgresBackend:
+    def search(self, query, limit, cursor=None):
+        if not _tokens(query):
+            return []
+        where, params = _keyset_sql(cursor)
+        sql = (
+            'SELECT id, score FROM ('
+            '  SELECT t.id, ts_rank(t.search_vector, q) AS score'
+            '  FROM tweets_tweet t, websearch_to_tsquery(%s::regconfig, %s) q'
+            '  WHERE t.search_vector @@ q'
+            f') s {where} ORDER BY score DESC, id DESC LIMIT %s'
+        )
+        with connection.cursor() as db:
+            db.execute(sql, [search_config(), query, *params, limit])
+            return db.fetchall()
+
+    def rebuild(self):
+        # A coluna gerada acompanha o conteúdo, mas guarda os vetores na
+        # configuração com que foi criada: se SEARCH_TEXT_CONFIG mudou, recria
+        # a coluna (o ADD COLUMN IF NOT EXISTS manteria a antiga)
+        expression = pg_vector_expression(connection)
+        if expression is not None and f"'{search_config()}'::regconfig" not in expression:
+            _execute(connection, PG_DROP)
+        install_schema(connection)
+        with connection.cursor() as db:
+            db.execute(f'REINDEX INDEX {PG_INDEX}')
+
+
+class ContainsBackend:
+    """Fallback sem índice para bancos sem suporte (ex.: MySQL em dev)."""
+
+    def search(self, query, limit, cursor=None):
+        from .models import Tweet
+
+        queryset = Tweet.objects.filter(content__icontains=query.strip())
+        if cursor is not None:
+            queryset = queryset.filter(pk__lt=cursor[1])
+        return [(pk, 0.0) for pk in queryset.order_by('-pk').values_list('pk', flat=True)[:limit]]
+
+    def rebuild(self):
+        pass
+
+
+def get_backend():
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    if connection.vendor == 'postgresql':
+        return PostgresBackend()
+    return ContainsBackend()
+
+
+def search_tweet_ids(query, limit, cursor=None):
+    """Lista de (tweet_id, score) ranqueada, a partir de um cursor (score, id) opcional."""
+    return get_backend().search(query, limit, cursor)
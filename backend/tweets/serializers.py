@@ -1,7 +1,9 @@
 # tweet/serializers.py
 from rest_framework import serializers
 from .models import Tweet
-from .models import Tweet, Comment
+from .models import Tweet, Comment, ArchivedTweet
+from .counters import total_likes
+from users.avatars import FEED, avatar_url
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -11,9 +13,9 @@ class TweetSerializer(serializers.ModelSerializer):
     author_id = serializers.IntegerField(source='author.id', read_only=True)  # <- ID do autor
     timestamp = serializers.DateTimeField(source='created_at', read_only=True)
     is_following = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()  # contador de likes
+    likes_count = serializers.SerializerMethodField()  # contador de likes (base + fatias)
     liked_by_me = serializers.SerializerMethodField()  # se o usuário curtiu
-    replies_count = serializers.SerializerMethodField()  # contador de comentários
+    replies_count = serializers.IntegerField(source='comments_count', read_only=True)  # contador de comentários
     retweets_count = serializers.SerializerMethodField()  # contador de retweets (sempre 0 por enquanto)
     handle = serializers.SerializerMethodField()  # handle do autor
     avatar_url = serializers.SerializerMethodField()  # avatar do autor
@@ -30,31 +32,33 @@ class TweetSerializer(serializers.ModelSerializer):
         return obj.author.email.split("@")[0]
     
     def get_avatar_url(self, obj):
-        if obj.author.avatar:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.author.avatar.url)
-            return obj.author.avatar.url
-        return None
+        # Variante pequena (48px): o feed não baixa o avatar em tamanho cheio
+        return avatar_url(obj.author, self.context.get('request'), FEED)
+
+    # Os métodos abaixo usam as anotações de Tweet.objects.with_engagement()
+    # quando presentes; sem elas (ex.: tweet recém-criado) caem em uma query.
 
     def get_is_following(self, obj):
+        if hasattr(obj, 'is_author_followed'):
+            return obj.is_author_followed
         request = self.context.get('request')
         if request and hasattr(request, 'user') and request.user.is_authenticated:
             return obj.author.followers.filter(id=request.user.id).exists()
         return False
 
     def get_likes_count(self, obj):
-        return obj.likes.count()
+        if hasattr(obj, 'pending_likes'):
+            return obj.likes_count + obj.pending_likes
+        return total_likes(obj)
     
     def get_liked_by_me(self, obj):
+        if hasattr(obj, 'is_liked'):
+            return obj.is_liked
         request = self.context.get('request')
         if request and hasattr(request, 'user') and request.user.is_authenticated:
             return obj.likes.filter(id=request.user.id).exists()
         return False
     
-    def get_replies_count(self, obj):
-        return obj.comments.count()
-    
     def get_retweets_count(self, obj):
         return 0  # funcionalidade não implementada ainda
 
@@ -67,6 +71,63 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'tweet', 'author', 'author_email', 'content', 'created_at']
         read_only_fields = ['author', 'author_email', 'created_at', 'tweet']
 
+class ArchivedTweetSerializer(serializers.ModelSerializer):
+    """Tweet do arquivo frio (tweets/archive.py): só leitura, contadores congelados."""
+    content = serializers.SerializerMethodField()
+    username = serializers.SerializerMethodField()
+    timestamp = serializers.DateTimeField(source='created_at', read_only=True)
+    liked_by_me = serializers.SerializerMethodField()
+    replies_count = serializers.IntegerField(source='comments_count', read_only=True)
+    handle = serializers.SerializerMethodField()
+    archived = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedTweet
+        fields = ['id', 'content', 'username', 'author_id', 'timestamp', 'likes_count', 'liked_by_me',
+                  'replies_count', 'handle', 'archived']
+
+    def get_content(self, obj):
+        return obj.data['content']
+
+    def get_username(self, obj):
+        return obj.author.email.split("@")[0]
+
+    def get_handle(self, obj):
+        return obj.author.email.split("@")[0]
+
+    def get_liked_by_me(self, obj):
+        request = self.context.get('request')
+        if request and hasattr(request, 'user') and request.user.is_authenticated:
+            return request.user.id in obj.data['likes']
+        return False
+
+    def get_archived(self, obj):
+        return True
+
+
+class ArchivedTweetDetailSerializer(ArchivedTweetSerializer):
+    """Com os comentários, que estão no mesmo payload."""
+    comments = serializers.SerializerMethodField()
+
+    class Meta(ArchivedTweetSerializer.Meta):
+        fields = ArchivedTweetSerializer.Meta.fields + ['comments']
+
+    def get_comments(self, obj):
+        comments = obj.data['comments']
+        # Comentários de contas removidas somem, como no cascade das tabelas quentes
+        authors = User.objects.in_bulk({comment['author_id'] for comment in comments})
+        return [
+            {
+                'id': comment['id'],
+                'author': comment['author_id'],
+                'author_email': authors[comment['author_id']].email,
+                'content': comment['content'],
+                'created_at': serializers.DateTimeField().to_representation(comment['created_at']),
+            }
+            for comment in comments if comment['author_id'] in authors
+        ]
+
+
 class UserUpdateSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
     avatar = serializers.ImageField(required=False)
@@ -0,0 +1,74 @@
+# tweets/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import archive
+from . import cache as timeline_cache
+from .models import Comment, Tweet
+from .timeline import add_to_own_timeline
+from jobs.queue import enqueue
+
+User = get_user_model()
+Like = Tweet.likes.through
+
+
+@receiver(post_save, sender=Tweet)
+def tweet_created(sender, instance, created, **kwargs):
+    """Distribui o tweet novo nas timelines (TweetViewSet.perform_create, admin, shell...)."""
+    if created:
+        # O autor vê o próprio tweet na hora; só o fan-out para os seguidores vai para a fila
+        add_to_own_timeline(instance)
+        enqueue('timeline.fan_out', {'tweet_id': instance.pk})  # tweets/jobs.py
+    timeline_cache.bump(instance.author_id)
+
+
+@receiver(post_delete, sender=Tweet)
+def tweet_deleted(sender, instance, **kwargs):
+    timeline_cache.bump(instance.author_id)
+
+
+@receiver(m2m_changed, sender=User.followers.through)
+def follow_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Mantém as timelines em dia quando alguém segue/deixa de seguir (toggle_follow)."""
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    for other_id in pk_set:
+        # followers.add(): instance é quem é seguido; following.add(): instance é quem segue
+        follower_id, followee_id = (instance.pk, other_id) if reverse else (other_id, instance.pk)
+        enqueue('timeline.follow', {'follower_id': follower_id, 'followee_id': followee_id})
+    timeline_cache.bump(instance.pk, *pk_set)
+
+
+# toggle_like escreve direto no through table e invalida o cache por conta própria;
+# sem receivers de post_delete em Like/Comment, o cascade do tweet continua rápido.
+@receiver(m2m_changed, sender=Like)
+def likes_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # user.liked_tweets.add(...): autores dos tweets afetados
+        authors = Tweet.objects.filter(pk__in=pk_set or ()).values_list('author_id', flat=True)
+        timeline_cache.bump(*authors)
+    else:
+        timeline_cache.bump(instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        timeline_cache.bump(Tweet.objects.filter(pk=instance.tweet_id).values_list('author_id', flat=True).first())
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Email/avatar aparecem nos tweets do usuário no feed de quem o segue."""
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    timeline_cache.bump(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """O arquivo frio não tem FK para users_user (ver tweets/archive.py)."""
+    archive.delete_author(instance.pk)
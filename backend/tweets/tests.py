@@ -1,8 +1,35 @@
-from django.test import TestCase
+import asyncio
+import json
+import re
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from prometheus_client import REGISTRY
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import status
-from tweets.models import Tweet
+from tweets.models import ArchivedTweet, Tweet, Comment, LikeCounterShard, TimelineEntry
+from tweets.counters import toggle_like, total_likes
+from tweets import archive
+from tweets import cache as timeline_cache
+from tweets import timeline
+from tweets import events
+from tweets.benchmark import compare, run_benchmark, scenario_names
 from users.models import User
+from twitter_clone.db_router import PIN_KEY, ReplicaRouter, ReplicaRoutingMiddleware, RoutingState, _state
+from twitter_clone.metrics import MetricsMiddleware
+from twitter_clone.static import serve_static
 
 
 class TweetAPITest(TestCase):
@@ -37,3 +64,773 @@ class TweetAPITest(TestCase):
         response = self.client.post('/api/tweets/', data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.json().get("content"), "Another test tweet")
+
+
+class TimelineTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="reader@example.com", password="password123")
+        self.author = User.objects.create_user(email="author@example.com", password="password123")
+        self.client.force_authenticate(self.user)
+
+    def feed_contents(self):
+        return [t["content"] for t in self.client.get('/api/tweets/').json()["results"]]
+
+    def test_follow_backfills_and_new_tweets_fan_out(self):
+        """Seguir copia tweets antigos; tweets novos chegam via fan-out."""
+        Tweet.objects.create(author=self.author, content="antigo")
+        self.client.post(f'/api/users/toggle-follow/{self.author.id}/')
+        Tweet.objects.create(author=self.author, content="novo")
+        self.assertEqual(self.feed_contents(), ["novo", "antigo"])
+
+    def test_unfollow_removes_tweets_from_timeline(self):
+        self.client.post(f'/api/users/toggle-follow/{self.author.id}/')
+        Tweet.objects.create(author=self.author, content="some")
+        self.client.post(f'/api/users/toggle-follow/{self.author.id}/')
+        self.assertEqual(self.feed_contents(), [])
+
+    @override_settings(TIMELINE_FANOUT_FOLLOWER_LIMIT=0)
+    def test_celebrity_tweets_are_merged_on_read(self):
+        """Autores acima do limite não fazem fan-out, mas aparecem no feed."""
+        self.client.post(f'/api/users/toggle-follow/{self.author.id}/')
+        Tweet.objects.create(author=self.author, content="celebridade")
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.user).exists())
+        self.assertEqual(self.feed_contents(), ["celebridade"])
+
+    @override_settings(TIMELINE_FANOUT_FOLLOWER_LIMIT=1)
+    def test_tweets_posted_as_celebrity_survive_dropping_below_the_limit(self):
+        fan = APIClient()
+        fan.force_authenticate(User.objects.create_user(email="fan@example.com", password="password123"))
+        self.client.post(f'/api/users/toggle-follow/{self.author.id}/')
+        fan.post(f'/api/users/toggle-follow/{self.author.id}/')
+        Tweet.objects.create(author=self.author, content="sem fan-out")
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.user, tweet__author=self.author).exists())
+
+        # Voltou ao limite: os tweets da época de celebridade continuam no feed
+        fan.post(f'/api/users/toggle-follow/{self.author.id}/')
+        Tweet.objects.create(author=self.author, content="com fan-out")
+        self.assertEqual(self.feed_contents(), ["com fan-out", "sem fan-out"])
+
+    def test_page_reads_the_timeline_index_in_order(self):
+        """Uma página lê no máximo `limit` entradas de (owner, created_at), sem ordenar a timeline inteira."""
+        self.client.post(f'/api/users/toggle-follow/{self.author.id}/')
+        cursor = (timezone.now(), 10 ** 9)
+        for before in (None, cursor):
+            [entries] = timeline._key_querysets(self.user, [], before, None, 21)
+            plan = entries.explain()
+            self.assertIn('timeline_owner_recent_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="pager@example.com", password="password123")
+        self.client.force_authenticate(self.user)
+        self.tweets = [Tweet.objects.create(author=self.user, content=f"tweet {i}") for i in range(5)]
+
+    def test_before_and_after_cursors_walk_the_timeline(self):
+        first = self.client.get('/api/tweets/?page_size=2').json()
+        self.assertEqual([t["content"] for t in first["results"]], ["tweet 4", "tweet 3"])
+        self.assertIsNone(first["previous"])
+
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([t["content"] for t in second["results"]], ["tweet 2", "tweet 1"])
+
+        back = self.client.get(second["previous"]).json()
+        self.assertEqual([t["content"] for t in back["results"]], ["tweet 4", "tweet 3"])
+
+        last = self.client.get(second["next"]).json()
+        self.assertEqual([t["content"] for t in last["results"]], ["tweet 0"])
+        self.assertIsNone(last["next"])
+
+    def test_comments_are_paginated(self):
+        tweet = self.tweets[0]
+        for i in range(3):
+            Comment.objects.create(tweet=tweet, author=self.user, content=f"c{i}")
+        data = self.client.get(f'/api/tweets/{tweet.id}/comments/?page_size=2').json()
+        self.assertEqual([c["content"] for c in data["results"]], ["c2", "c1"])
+        rest = self.client.get(data["next"]).json()
+        self.assertEqual([c["content"] for c in rest["results"]], ["c0"])
+        self.assertIsNone(rest["next"])
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get('/api/tweets/?before=nao-e-um-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(TIMELINE_CACHE_ENABLED=False)
+class TimelineQueryCountTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="counter@example.com", password="password123")
+        self.others = [User.objects.create_user(email=f"other{i}@example.com", password="x") for i in range(3)]
+        self.client.force_authenticate(self.user)
+        for other in self.others:
+            self.client.post(f'/api/users/toggle-follow/{other.id}/')
+
+    def create_tweets(self, n):
+        for i in range(n):
+            tweet = Tweet.objects.create(author=self.others[i % 3], content=f"t{i}")
+            tweet.likes.add(self.others[(i + 1) % 3])
+            Comment.objects.create(tweet=tweet, author=self.user, content="oi")
+        call_command('repair_counters', stdout=StringIO())
+
+    def count_feed_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/tweets/?page_size=50')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response.json()["results"]
+
+    def test_feed_query_count_does_not_grow_with_page_size(self):
+        """O número de queries do feed é constante, não proporcional aos tweets."""
+        self.client.get('/api/tweets/')  # aquece a lista de seguidos no cache (tweets/cache.py)
+        self.create_tweets(2)
+        small, _ = self.count_feed_queries()
+        self.create_tweets(20)
+        large, results = self.count_feed_queries()
+        self.assertEqual(len(results), 22)
+        self.assertEqual(small, large)
+        self.assertTrue(all(t["likes_count"] == 1 and t["replies_count"] == 1 for t in results))
+        self.assertTrue(all(t["is_following"] and not t["liked_by_me"] for t in results))
+
+
+class CounterTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="fan@example.com", password="password123")
+        self.author = User.objects.create_user(email="star@example.com", password="password123")
+        self.client.force_authenticate(self.user)
+        self.client.post(f'/api/users/toggle-follow/{self.author.id}/')
+        self.tweet = Tweet.objects.create(author=self.author, content="contado")
+
+    def test_endpoints_keep_counters_in_sync(self):
+        self.assertEqual(self.client.post(f'/api/tweets/{self.tweet.id}/like_tweet/').json()["total_likes"], 1)
+        self.client.post(f'/api/tweets/{self.tweet.id}/add_comment/', {"content": "oi"})
+        self.tweet.refresh_from_db()
+        self.author.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual((total_likes(self.tweet), self.tweet.comments_count), (1, 1))
+        self.assertEqual((self.author.followers_count, self.user.following_count), (1, 1))
+
+        self.assertEqual(self.client.post(f'/api/tweets/{self.tweet.id}/like_tweet/').json()["total_likes"], 0)
+        response = self.client.post(f'/api/users/toggle-follow/{self.author.id}/')
+        self.assertEqual(response.json()["followers_count"], 0)
+
+    def test_repair_counters_fixes_drift(self):
+        self.tweet.likes.add(self.user)  # escrita fora dos endpoints: contador fica defasado
+        out = StringIO()
+        call_command('repair_counters', batch_size=1, stdout=out)
+        self.tweet.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.tweet.likes_count, 1)
+        self.assertEqual(self.author.tweets_count, 1)
+        self.assertIn("Tweet: 1 registros corrigidos", out.getvalue())
+
+
+@override_settings(LIKE_COUNTER_SHARDS=4)
+class ShardedLikeCounterTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(email="viral@example.com", password="password123")
+        self.tweet = Tweet.objects.create(author=self.author, content="viral")
+        self.fans = [User.objects.create_user(email=f"fan{i}@example.com", password="x") for i in range(12)]
+
+    def test_likes_spread_over_shards_and_sum_on_read(self):
+        for fan in self.fans:
+            self.assertTrue(toggle_like(self.tweet, fan))
+        self.assertFalse(toggle_like(self.tweet, self.fans[0]))
+        self.assertLessEqual(LikeCounterShard.objects.filter(tweet=self.tweet).count(), 4)
+        self.assertEqual(total_likes(self.tweet), 11)
+        self.assertEqual(self.tweet.likes.count(), 11)
+
+    def test_repair_counters_folds_shards_into_base(self):
+        for fan in self.fans[:3]:
+            toggle_like(self.tweet, fan)
+        self.tweet.likes.remove(self.fans[0])  # fora do toggle: fatias defasadas
+        call_command('repair_counters', stdout=StringIO())
+        self.tweet.refresh_from_db()
+        self.assertEqual(self.tweet.likes_count, 2)
+        self.assertFalse(LikeCounterShard.objects.filter(tweet=self.tweet).exists())
+        self.assertEqual(total_likes(self.tweet), 2)
+
+
+class TweetSearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="searcher@example.com", password="password123")
+        self.client.force_authenticate(self.user)
+        author = User.objects.create_user(email="writer@example.com", password="password123")
+        self.hit = Tweet.objects.create(author=author, content="Café com pão de queijo")
+        self.strong = Tweet.objects.create(author=author, content="café café café")
+        Tweet.objects.create(author=author, content="nada a ver")
+
+    def search(self, query, **params):
+        return self.client.get('/api/tweets/search/', {"q": query, **params}).json()
+
+    def test_search_is_ranked_and_ignores_accents(self):
+        results = self.search("cafe")["results"]
+        self.assertEqual([t["id"] for t in results], [self.strong.id, self.hit.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.hit.content = "chá gelado"
+        self.hit.save()
+        self.strong.delete()
+        self.assertEqual(self.search("café")["results"], [])
+        self.assertEqual([t["id"] for t in self.search("gelado")["results"]], [self.hit.id])
+
+    def test_search_is_keyset_paginated(self):
+        first = self.search("café", page_size=1)
+        self.assertEqual([t["id"] for t in first["results"]], [self.strong.id])
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([t["id"] for t in second["results"]], [self.hit.id])
+        self.assertIsNone(second["next"])
+
+    def test_fts_syntax_in_query_is_not_an_error(self):
+        response = self.client.get('/api/tweets/search/', {"q": 'café" OR -(*'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TweetArchiveTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.reader = User.objects.create_user(email="reader@example.com", password="password123")
+        self.author = User.objects.create_user(email="veteran@example.com", password="password123")
+        self.client.force_authenticate(self.reader)
+        self.client.post(f'/api/users/toggle-follow/{self.author.id}/')
+        self.old = [Tweet.objects.create(author=self.author, content=f"antigo {i}") for i in range(3)]
+        self.recent = Tweet.objects.create(author=self.author, content="recente")
+        User.objects.filter(pk=self.author.pk).update(tweets_count=4)
+        for i, tweet in enumerate(self.old):
+            # 40 dias de distância: um mês (partição) por tweet
+            Tweet.objects.filter(pk=tweet.pk).update(created_at=timezone.now() - timedelta(days=400 + 40 * i))
+        toggle_like(self.old[0], self.reader)
+        self.client.post(f'/api/tweets/{self.old[0].id}/add_comment/', {"content": "lembra disso?"})
+
+    def test_archive_moves_old_tweets_in_batches(self):
+        out = StringIO()
+        call_command('archive_tweets', days=365, batch_size=2, stdout=out)
+        self.assertIn("3 tweets arquivados (1 comentários, 1 likes) em 2 lotes", out.getvalue())
+        self.assertEqual(list(Tweet.objects.values_list('id', flat=True)), [self.recent.id])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(LikeCounterShard.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exclude(tweet=self.recent).exists())
+        self.assertEqual(len(archive.partitions()), 3)
+        self.assertEqual(ArchivedTweet.objects.get(pk=self.old[0].id).likes_count, 1)
+
+        # Arquivados continuam no contador do perfil
+        call_command('repair_counters', stdout=StringIO())
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.tweets_count, 4)
+
+        call_command('archive_tweets', stdout=out)
+        self.assertIn("0 tweets arquivados", out.getvalue())
+
+    def test_archived_tweets_stay_readable(self):
+        call_command('archive_tweets', stdout=StringIO())
+        data = self.client.get(f'/api/tweets/archive/{self.old[0].id}/').json()
+        self.assertEqual((data["content"], data["likes_count"], data["replies_count"]), ("antigo 0", 1, 1))
+        self.assertTrue(data["archived"] and data["liked_by_me"])
+        self.assertEqual([(c["author_email"], c["content"]) for c in data["comments"]],
+                         [("reader@example.com", "lembra disso?")])
+        response = self.client.get(f'/api/tweets/archive/{self.recent.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        first = self.client.get('/api/tweets/archive/', {"author": self.author.id, "page_size": 2}).json()
+        self.assertEqual([t["id"] for t in first["results"]], [self.old[0].id, self.old[1].id])
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([t["id"] for t in second["results"]], [self.old[2].id])
+        response = self.client.get('/api/tweets/archive/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deleting_author_deletes_archive(self):
+        call_command('archive_tweets', stdout=StringIO())
+        self.reader.delete()
+        data = self.client.get(f'/api/tweets/archive/{self.old[0].id}/').json()
+        self.assertEqual(data["comments"], [])
+        self.author.delete()
+        self.assertFalse(ArchivedTweet.objects.exists())
+
+
+class TimelineCacheTest(TestCase):
+    # Um hit ainda lê do banco o tweet mais novo do feed (ETag, timeline.newest_keys)
+    VALIDATOR_QUERIES = 2
+
+    def setUp(self):
+        timeline_cache.get_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="cached@example.com", password="password123")
+        self.friend = User.objects.create_user(email="friend@example.com", password="password123")
+        self.stranger = User.objects.create_user(email="stranger@example.com", password="password123")
+        self.client.force_authenticate(self.user)
+        self.client.post(f'/api/users/toggle-follow/{self.friend.id}/')
+        self.tweet = Tweet.objects.create(author=self.friend, content="primeiro")
+
+    def feed(self):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get('/api/tweets/').json()
+        return data, len(ctx.captured_queries)
+
+    def test_second_read_is_served_from_cache(self):
+        first, _ = self.feed()
+        second, queries = self.feed()
+        self.assertEqual(first, second)
+        self.assertEqual(queries, self.VALIDATOR_QUERIES)
+        self.assertEqual(timeline_cache.stats()["hits"], 1)
+
+    def test_followee_events_invalidate_the_page(self):
+        self.feed()
+        Tweet.objects.create(author=self.stranger, content="irrelevante")
+        self.assertEqual(self.feed()[1], self.VALIDATOR_QUERIES)
+
+        other_fan = User.objects.create_user(email="fan2@example.com", password="x")
+        toggle_like(self.tweet, other_fan)
+        data, queries = self.feed()
+        self.assertGreater(queries, self.VALIDATOR_QUERIES)
+        self.assertEqual(data["results"][0]["likes_count"], 1)
+
+        Tweet.objects.create(author=self.friend, content="segundo")
+        self.assertEqual(self.feed()[0]["results"][0]["content"], "segundo")
+
+    def test_cache_stats_requires_admin(self):
+        self.assertEqual(self.client.get('/api/tweets/cache_stats/').status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(set(self.client.get('/api/tweets/cache_stats/').json()), {"hits", "misses", "hit_ratio"})
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        timeline_cache.get_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="poller@example.com", password="password123")
+        self.client.force_authenticate(self.user)
+        self.tweet = Tweet.objects.create(author=self.user, content="poll me")
+
+    def assert_revalidates(self, url, change):
+        first = self.client.get(url)
+        self.assertTrue(first.has_header("ETag"))
+        etag = first["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        change()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(changed["ETag"], etag)
+
+    def test_feed(self):
+        self.assert_revalidates('/api/tweets/', lambda: Tweet.objects.create(author=self.user, content="novo"))
+        self.assertTrue(self.client.get('/api/tweets/').has_header("Last-Modified"))
+
+    @override_settings(TIMELINE_CONDITIONAL_GET=False)
+    def test_feed_without_conditional_get(self):
+        response = self.client.get('/api/tweets/', HTTP_IF_NONE_MATCH='"*"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header("ETag"))
+
+    def test_comments(self):
+        url = f'/api/tweets/{self.tweet.id}/comments/'
+        self.assert_revalidates(url, lambda: self.client.post(f'/api/tweets/{self.tweet.id}/add_comment/', {"content": "oi"}))
+
+    def test_profile(self):
+        self.assert_revalidates('/api/users/profile/', lambda: self.client.patch('/api/users/profile/', {"bio": "nova bio"}))
+
+    def test_not_modified_skips_serialization(self):
+        etag = self.client.get('/api/tweets/')["ETag"]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/tweets/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # Só o tweet mais novo da timeline e das celebridades seguidas
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+    def test_feed_etag_sees_writes_from_other_processes(self):
+        etag = self.client.get('/api/tweets/')["ETag"]
+        # Fan-out feito por outro processo (run_jobs, outro worker): nenhum bump()
+        # chega a este cache, só as linhas no banco
+        [tweet] = Tweet.objects.bulk_create([Tweet(author=self.user, content="de outro processo")])
+        TimelineEntry.objects.create(owner=self.user, tweet=tweet, created_at=tweet.created_at)
+        response = self.client.get('/api/tweets/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"][0]["content"], "de outro processo")
+
+
+class GenerateDatasetTest(TestCase):
+    def generate(self, domain, seed=7):
+        call_command('generate_dataset', users=30, tweets=80, likes=150, comments=40, avg_follows=5,
+                     seed=seed, batch_size=25, email_domain=domain, stdout=StringIO())
+        tweets = Tweet.objects.filter(author__email__endswith=f"@{domain}").order_by('pk')
+        return list(tweets.values_list('content', 'created_at', 'likes_count', 'comments_count'))
+
+    def test_same_seed_gives_same_dataset(self):
+        first = self.generate('a.example.com')
+        self.assertEqual(first, self.generate('b.example.com'))
+        self.assertNotEqual(first, self.generate('c.example.com', seed=8))
+
+    def test_tweets_stay_inside_the_window(self):
+        end = datetime(2025, 1, 1, 12, 30, tzinfo=dt_timezone.utc)
+        call_command('generate_dataset', users=10, tweets=200, likes=0, comments=200, avg_follows=2, days=2,
+                     seed=1, end=end.isoformat(), email_domain='window.example.com', stdout=StringIO())
+        moments = Tweet.objects.filter(author__email__endswith='@window.example.com').values_list('created_at', flat=True)
+        self.assertLessEqual(max(moments), end)
+        self.assertGreaterEqual(min(moments), end - timedelta(days=3))
+        comments = Comment.objects.filter(author__email__endswith='@window.example.com')
+        self.assertEqual(comments.count(), 200)
+        self.assertLessEqual(max(comments.values_list('created_at', flat=True)), end)
+
+    def test_counters_and_timelines_are_consistent(self):
+        self.generate('a.example.com')
+        out = StringIO()
+        call_command('repair_counters', dry_run=True, stdout=out)
+        self.assertEqual(re.findall(r': (\d+) registros', out.getvalue()), ['0', '0'])
+
+        # Popularidade em lei de potência: o mais seguido tem bem mais que a média
+        counts = sorted(User.objects.values_list('followers_count', flat=True), reverse=True)
+        self.assertGreater(counts[0], 2 * sum(counts) / len(counts))
+
+        follower = User.objects.filter(following_count__gt=0).first()
+        expected = set(Tweet.objects.filter(author__in=follower.following.all()).values_list('pk', flat=True))
+        expected |= set(Tweet.objects.filter(author=follower).values_list('pk', flat=True))
+        self.assertEqual(set(TimelineEntry.objects.filter(owner=follower).values_list('tweet_id', flat=True)), expected)
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        call_command('generate_dataset', users=20, tweets=60, likes=50, comments=20, avg_follows=6,
+                     seed=3, batch_size=50, stdout=StringIO())
+
+    def test_reports_every_endpoint(self):
+        report = run_benchmark(iterations=3, warmup=1, sample_users=10)
+        self.assertEqual(set(report['endpoints']), set(scenario_names()))
+        for name, result in report['endpoints'].items():
+            self.assertEqual(result['requests'], 3, name)
+            self.assertTrue(all(code.startswith('2') for code in result['status']), (name, result['status']))
+            if name != 'profile':  # perfil sai do request.user, que vem do cache do JWT
+                self.assertGreater(result['queries']['mean'], 0, name)
+            self.assertGreater(result['bytes_mean'], 0, name)
+            self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['p99'])
+
+    def test_compare_flags_regressions(self):
+        report = run_benchmark(iterations=2, warmup=0, sample_users=5, only=['profile'])
+        self.assertEqual(compare(report, report), [])
+        baseline = json.loads(json.dumps(report))
+        baseline['endpoints']['profile']['latency_ms']['p95'] = 0.0
+        baseline['endpoints']['profile']['queries']['mean'] = 0
+        self.assertEqual(len(compare(report, baseline)), 2)
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="metrics@example.com", password="password123")
+        self.client.force_authenticate(self.user)
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_records_per_view_and_method(self):
+        labels = {'view': 'tweet-list', 'method': 'GET'}
+        before = self.sample('http_requests_total', status='200', **labels)
+        queries_before = self.sample('http_request_db_queries_sum', **labels)
+        self.client.get('/api/tweets/')
+        self.assertEqual(self.sample('http_requests_total', status='200', **labels), before + 1)
+        self.assertGreater(self.sample('http_request_db_queries_sum', **labels), queries_before)
+        self.assertGreater(self.sample('http_response_size_bytes_count', **labels), 0)
+
+        self.client.get('/nao-existe/')
+        self.assertGreater(self.sample('http_requests_total', view='<unresolved>', method='GET', status='404'), 0)
+
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{', body)
+        self.assertIn('view="tweet-list"', body)
+
+    @override_settings(ROOT_URLCONF='twitter_clone.async_urls')
+    def test_async_requests_count_queries_from_orm_threads(self):
+        # Views async: o ORM roda em threads do sync_to_async, fora da conexão do loop
+        labels = {'view': 'tweet-search', 'method': 'GET'}
+        before = self.sample('http_request_db_queries_sum', **labels)
+        token = RefreshToken.for_user(self.user).access_token
+        response = async_to_sync(AsyncClient().get)('/api/tweets/search/?q=x', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self.sample('http_request_db_queries_sum', **labels), before)
+        self.assertTrue(MetricsMiddleware.async_capable)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_token_protects_endpoint(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+
+class StaticFilesTest(SimpleTestCase):
+    def test_asgi_serves_static_files_outside_django(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        Path(tmp.name, 'app.css').write_text('body {}')
+
+        async def django_app(scope, receive, send):
+            raise AssertionError("estático chegou ao Django")
+
+        app = serve_static(django_app, tmp.name, '/static/')
+
+        async def get(path):
+            communicator = ApplicationCommunicator(app, {
+                'type': 'http', 'http_version': '1.1', 'method': 'GET', 'path': path,
+                'query_string': b'', 'headers': [], 'server': ('testserver', 80),
+            })
+            await communicator.send_input({'type': 'http.request', 'body': b''})
+            start = await communicator.receive_output(2)
+            body = await communicator.receive_output(2)
+            return start['status'], body['body']
+
+        self.assertEqual(async_to_sync(get)('/static/app.css'), (200, b'body {}'))
+        self.assertEqual(async_to_sync(get)('/static/missing.css')[0], 404)
+
+
+class HealthCheckTest(TestCase):
+    def test_reports_database_latency(self):
+        response = self.client.get('/health/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        body = response.json()
+        self.assertEqual(body['status'], 'ok')
+        self.assertTrue(body['databases']['default']['ok'])
+        self.assertNotIn('pool', body['databases']['default'])  # SQLite: sem pool
+
+
+class AsyncReadPathTest(TestCase):
+    def setUp(self):
+        timeline_cache.get_cache().clear()
+        self.user = User.objects.create_user(email="reader@example.com", password="password123")
+        author = User.objects.create_user(email="writer@example.com", password="password123")
+        author.followers.add(self.user)
+        self.tweet = Tweet.objects.create(author=author, content="leitura async")
+        Comment.objects.create(tweet=self.tweet, author=self.user, content="comentário")
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        self.paths = [
+            '/api/tweets/',
+            '/api/tweets/?page_size=1',
+            f'/api/tweets/{self.tweet.id}/comments/',
+            '/api/tweets/search/?q=leitura',
+            '/api/users/profile/',
+        ]
+
+    @override_settings(TIMELINE_CACHE_ENABLED=False)  # as duas versões montam a página do zero
+    def test_async_views_match_sync_views(self):
+        sync = {path: self.client.get(path, **self.auth) for path in self.paths}
+        with override_settings(ROOT_URLCONF='twitter_clone.async_urls'):
+            for path in self.paths:
+                response = async_to_sync(AsyncClient().get)(path, headers={'Authorization': self.auth['HTTP_AUTHORIZATION']})
+                self.assertEqual(response.status_code, 200, path)
+                self.assertEqual(response.json(), sync[path].json(), path)
+                self.assertEqual(response.get('ETag'), sync[path].get('ETag'), path)
+
+    @override_settings(ROOT_URLCONF='twitter_clone.async_urls')
+    def test_auth_and_fallback_to_sync_view(self):
+        self.assertEqual(self.client.get('/api/tweets/').status_code, status.HTTP_401_UNAUTHORIZED)
+        bad = self.client.get('/api/tweets/', HTTP_AUTHORIZATION='Bearer nope')
+        self.assertEqual(bad.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', bad)
+
+        etag = self.client.get('/api/tweets/', **self.auth)['ETag']
+        self.assertEqual(self.client.get('/api/tweets/', HTTP_IF_NONE_MATCH=etag, **self.auth).status_code, 304)
+
+        created = self.client.post('/api/tweets/', {'content': 'via POST'}, content_type='application/json', **self.auth)
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        patched = self.client.patch('/api/users/profile/', {'bio': 'async'}, content_type='application/json', **self.auth)
+        self.assertEqual(patched.json()['bio'], 'async')
+        self.assertEqual(self.client.get('/api/tweets/999999/comments/', **self.auth).status_code, 404)
+
+
+@override_settings(ROOT_URLCONF='twitter_clone.async_urls', TWEET_STREAM_HEARTBEAT=0.05)
+class TweetStreamTest(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(email="listener@example.com", password="password123")
+        self.author = User.objects.create_user(email="poster@example.com", password="password123")
+        self.stranger = User.objects.create_user(email="stranger@example.com", password="password123")
+        self.author.followers.add(self.reader)
+        self.auth = f'Bearer {RefreshToken.for_user(self.reader).access_token}'
+        # Hub novo: o rollback entre testes reaproveita ids de tweet já publicados
+        events._hub = None
+
+    def post_tweet(self, user, content):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return client.post('/api/tweets/', {'content': content}, format='json').json()['id']
+
+    def read_stream(self, until, action=None, headers=None):
+        """Abre o stream, roda `action` e lê frames até until(frames) ser verdadeiro."""
+        async def run():
+            response = await AsyncClient().get(
+                '/api/tweets/stream/', headers={'Authorization': self.auth, **(headers or {})},
+            )
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            chunks = aiter(response.streaming_content)
+            frames = [(await anext(chunks)).decode()]
+            if action:
+                await sync_to_async(action)()
+            deadline = asyncio.get_running_loop().time() + 5  # pings sozinhos não encerram a leitura
+            while not until(frames):
+                self.assertLess(asyncio.get_running_loop().time(), deadline, frames[-3:])
+                frames.append((await asyncio.wait_for(anext(chunks), 2)).decode())
+            await chunks.aclose()
+            return frames
+
+        return async_to_sync(run)()
+
+    @staticmethod
+    def tweet_events(frames):
+        return [frame for frame in frames if frame.startswith('event:')]
+
+    def test_pushes_new_tweets_from_followed_authors(self):
+        ids = {}
+
+        def post():
+            ids['stranger'] = self.post_tweet(self.stranger, "não sigo")
+            ids['author'] = self.post_tweet(self.author, "ao vivo")
+
+        frames = self.read_stream(lambda frames: self.tweet_events(frames), action=post)
+        self.assertTrue(frames[0].startswith('retry:'))
+        [event] = self.tweet_events(frames)
+        self.assertIn(f"id: {ids['author']}", event)
+        payload = json.loads(event.split('data: ', 1)[1])
+        self.assertEqual(payload['content'], "ao vivo")
+        self.assertEqual(payload['handle'], "poster")
+
+    def test_heartbeat(self):
+        frames = self.read_stream(lambda frames: ': ping\n\n' in frames)
+        self.assertEqual(self.tweet_events(frames), [])
+
+    def test_reconnect_replays_missed_tweets(self):
+        first = Tweet.objects.create(author=self.author, content="visto")
+        missed = [Tweet.objects.create(author=self.author, content=f"perdido {i}") for i in range(2)]
+        Tweet.objects.create(author=self.stranger, content="não sigo")
+
+        frames = self.read_stream(
+            lambda frames: len(self.tweet_events(frames)) == 2, headers={'Last-Event-ID': str(first.id)},
+        )
+        self.assertEqual(
+            [re.search(r'id: (\d+)', event).group(1) for event in self.tweet_events(frames)],
+            [str(tweet.id) for tweet in missed],
+        )
+
+        with override_settings(TWEET_STREAM_REPLAY_LIMIT=1):
+            frames = self.read_stream(lambda frames: self.tweet_events(frames), headers={'Last-Event-ID': str(first.id)})
+        [reset] = self.tweet_events(frames)
+        self.assertTrue(reset.startswith('event: reset'))
+        self.assertIn(f"id: {missed[-1].id}", reset)
+
+    @override_settings(TWEET_STREAM_CATCHUP=0.05)
+    def test_catches_up_tweets_published_by_other_workers(self):
+        # Sem captureOnCommitCallbacks o hub não recebe nada, como um tweet
+        # criado em outro processo: só o poller do processo o entrega
+        ids = {}
+
+        def post():
+            ids['author'] = Tweet.objects.create(author=self.author, content="outro worker").id
+            Tweet.objects.create(author=self.stranger, content="não sigo")
+            # Commit atrasado: created_at anterior à última busca, dentro da margem
+            late = Tweet.objects.create(author=self.author, content="commit lento")
+            Tweet.objects.filter(pk=late.pk).update(created_at=timezone.now() - timedelta(seconds=10))
+            ids['late'] = late.id
+
+        frames = self.read_stream(lambda frames: len(self.tweet_events(frames)) == 2, action=post)
+        contents = [json.loads(event.split('data: ', 1)[1])['content'] for event in self.tweet_events(frames)]
+        self.assertEqual(contents, ["outro worker", "commit lento"])
+
+    def test_one_poller_per_process(self):
+        async def run():
+            hub = events.get_hub()
+            first = hub.subscribe({self.author.id}, 10)
+            poller = hub._poller
+            second = hub.subscribe({self.stranger.id}, 10)
+            self.assertIs(hub._poller, poller)
+            hub.unsubscribe(first)
+            hub.unsubscribe(second)
+            poller.cancel()
+
+        async_to_sync(run)()
+
+    @override_settings(TWEET_STREAM_QUEUE_SIZE=1)
+    def test_slow_client_stream_closes_instead_of_buffering(self):
+        def publish():
+            for i in range(3):
+                events.get_hub().publish(events.Event(1000 + i, self.author.id, {'id': 1000 + i}))
+
+        async def run():
+            response = await AsyncClient().get('/api/tweets/stream/', headers={'Authorization': self.auth})
+            chunks = aiter(response.streaming_content)
+            await anext(chunks)  # retry
+            publish()
+            await asyncio.sleep(0.01)  # entregas agendadas no loop
+            frames = []
+            async for chunk in chunks:
+                frames.append(chunk.decode())
+            return frames
+
+        frames = async_to_sync(run)()
+        self.assertEqual(len(frames), 1)
+        self.assertIn("id: 1000", frames[0])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], TIMELINE_CACHE_ENABLED=False)
+class ReplicaRoutingTest(TransactionTestCase):
+    # A "réplica" é um segundo SQLite vazio: tudo que é escrito no primário
+    # fica de fora, como numa réplica atrasada
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="replica@example.com", password="password123")
+        Tweet.objects.create(author=self.user, content="antigo")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def feed(self):
+        return [row['content'] for row in self.client.get('/api/tweets/').json()['results']]
+
+    def test_reads_use_replica_until_own_write(self):
+        with CaptureQueriesContext(connections['replica']) as replica, CaptureQueriesContext(connection) as primary:
+            self.assertEqual(self.feed(), [])
+        self.assertTrue(replica.captured_queries)
+        self.assertEqual(primary.captured_queries, [])
+
+        response = self.client.post('/api/tweets/', {'content': 'novo'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # Read-your-writes: o autor fica no primário pela janela de stickiness
+        self.assertEqual(self.feed(), ['novo', 'antigo'])
+
+        cache.delete(PIN_KEY.format(self.user.pk))  # janela expirou
+        self.assertEqual(self.feed(), [])
+
+    def test_unsafe_methods_read_from_primary(self):
+        tweet = Tweet.objects.get()
+        response = self.client.post(f'/api/tweets/{tweet.pk}/like_tweet/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ReplicaRouter().db_for_read(Tweet), 'default')
+        token = _state.set(RoutingState(RequestFactory().delete('/')))
+        try:
+            self.assertEqual(ReplicaRouter().db_for_read(Tweet), 'default')
+        finally:
+            _state.reset(token)
+
+    def test_async_middleware_routes_without_a_thread(self):
+        async def view(request):
+            # O router roda na thread do ORM, com o contexto copiado da requisição
+            return HttpResponse(await sync_to_async(ReplicaRouter().db_for_read)(Tweet))
+
+        middleware = ReplicaRoutingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        factory = RequestFactory()
+        self.assertEqual(async_to_sync(middleware)(factory.get('/')).content, b'replica')
+        self.assertEqual(async_to_sync(middleware)(factory.post('/')).content, b'default')
+
+    def test_primary_outside_requests_after_writes_and_in_transactions(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Tweet), 'default')
+        token = _state.set(RoutingState(RequestFactory().get('/')))
+        try:
+            self.assertEqual(router.db_for_read(Tweet), 'replica')
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Tweet), 'default')
+            router.db_for_write(Tweet)
+            self.assertEqual(router.db_for_read(Tweet), 'default')
+        finally:
+            _state.reset(token)
@@ -0,0 +1,231 @@
+# tweets/timeline.py
+"""
+Timelines materializadas (fan-out-on-write).
+
+Cada tweet novo é copiado para a timeline de quem segue o autor, então a
+leitura de uma página do feed (`timeline_keys`) é um range scan limitado no
+índice (owner, created_at) de `TimelineEntry`, a partir do cursor. Autores com
+muitos seguidores (acima de TIMELINE_FANOUT_FOLLOWER_LIMIT) não fazem fan-out:
+os tweets deles vêm de uma segunda query limitada, no índice (author,
+created_at) de Tweet, e são mesclados na hora da leitura. Só então os tweets
+da página são buscados por id.
+
+Quem já pulou o fan-out fica marcado (User.fanout_on_read) e continua sendo
+mesclado na leitura mesmo abaixo do limite: os tweets daquela época não têm
+entradas nas timelines dos seguidores.
+"""
+import heapq
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Max, Q
+
+from .models import Tweet, TimelineEntry
+
+User = get_user_model()
+
+FANOUT_BATCH_SIZE = 1000
+
+
+def fanout_follower_limit():
+    return getattr(settings, 'TIMELINE_FANOUT_FOLLOWER_LIMIT', 5000)
+
+
+def backfill_limit():
+    return getattr(settings, 'TIMELINE_BACKFILL_LIMIT', 200)
+
+
+def is_celebrity(user):
+    """Autor com seguidores demais para fan-out-on-write (lê o contador do banco, não da instância)."""
+    followers_count = User.objects.filter(pk=user.pk).values_list('followers_count', flat=True).first() or 0
+    return followers_count > fanout_follower_limit()
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(entries, batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True)
+
+
+def add_to_own_timeline(tweet):
+    """Entrada do próprio autor, gravada na hora (o fan-out pode ficar para a fila)."""
+    _bulk_insert([TimelineEntry(owner_id=tweet.author_id, tweet_id=tweet.id, created_at=tweet.created_at)])
+
+
+def fan_out_tweet(tweet):
+    """Insere o tweet na timeline de cada seguidor do autor, se possível."""
+    author = tweet.author
+    if is_celebrity(author):
+        # Fan-out-on-read: os seguidores leem os tweets direto em timeline_keys()
+        User.objects.filter(pk=author.pk, fanout_on_read=False).update(fanout_on_read=True)
+        return
+
+    entries = []
+    follower_ids = author.followers.values_list('id', flat=True).iterator(chunk_size=FANOUT_BATCH_SIZE)
+    for follower_id in follower_ids:
+        entries.append(TimelineEntry(owner_id=follower_id, tweet_id=tweet.id, created_at=tweet.created_at))
+        if len(entries) >= FANOUT_BATCH_SIZE:
+            _bulk_insert(entries)
+            entries = []
+    if entries:
+        _bulk_insert(entries)
+
+
+def backfill_follow(follower, followee):
+    """Copia os tweets recentes de `followee` para a timeline de `follower`."""
+    if is_celebrity(followee):
+        return
+    recent = (
+        Tweet.objects.filter(author=followee)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'created_at')[:backfill_limit()]
+    )
+    _bulk_insert([
+        TimelineEntry(owner_id=follower.id, tweet_id=tweet_id, created_at=created_at)
+        for tweet_id, created_at in recent
+    ])
+
+
+def remove_follow(follower, followee):
+    """Remove os tweets de `followee` da timeline de `follower`."""
+    TimelineEntry.objects.filter(owner=follower, tweet__author=followee).delete()
+
+
+def _celebrities_followed(user):
+    celebrities = Q(followers_count__gt=fanout_follower_limit()) | Q(fanout_on_read=True)
+    return user.following.filter(celebrities).values_list('id', flat=True)
+
+
+def celebrity_following_ids(user):
+    """IDs das contas seguidas por `user` que são lidas via fan-out-on-read (inclusive as marcadas)."""
+    return list(_celebrities_followed(user))
+
+
+async def acelebrity_following_ids(user):
+    return [pk async for pk in _celebrities_followed(user)]
+
+
+def newest_keys(user):
+    """
+    (created_at, tweet_id) mais novos da timeline materializada e dos autores
+    mesclados na leitura: estado do banco para o ETag do feed (tweets/cache.py).
+    """
+    sources = [
+        TimelineEntry.objects.filter(owner=user).order_by('-created_at', '-tweet_id')
+        .values_list('created_at', 'tweet_id'),
+        Tweet.objects.filter(author_id__in=_celebrities_followed(user)).order_by('-created_at', '-id')
+        .values_list('created_at', 'id'),
+    ]
+    return [key for key in (queryset.first() for queryset in sources) if key is not None]
+
+
+def _after(queryset, created_at, pk, field):
+    return queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, **{f'{field}__gt': pk}))
+
+
+def _before(queryset, created_at, pk, field):
+    return queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, **{f'{field}__lt': pk}))
+
+
+def _key_querysets(user, celebrity_ids, before, after, limit):
+    """Uma query limitada por fonte (timeline materializada, celebridades), já no cursor."""
+    sources = [(TimelineEntry.objects.filter(owner=user), 'tweet_id')]
+    if celebrity_ids:
+        sources.append((Tweet.objects.filter(author_id__in=celebrity_ids), 'id'))
+    querysets = []
+    for queryset, field in sources:
+        if after:
+            queryset = _after(queryset, *after, field).order_by('created_at', field)
+        else:
+            if before:
+                queryset = _before(queryset, *before, field)
+            queryset = queryset.order_by('-created_at', f'-{field}')
+        querysets.append(queryset.values_list('created_at', field)[:limit])
+    return querysets
+
+
+def _merge_keys(results, after, limit):
+    # Um tweet pode estar nas duas fontes (o autor virou celebridade depois do fan-out)
+    keys = heapq.merge(*results, reverse=not after)
+    page, seen = [], set()
+    for key in keys:
+        if key not in seen:
+            seen.add(key)
+            page.append(key)
+            if len(page) == limit:
+                break
+    return page
+
+
+def timeline_keys(user, before=None, after=None, limit=20):
+    """
+    Até `limit` pares (created_at, tweet_id) do feed de `user`: os mais novos
+    antes de `before`, ou (em ordem crescente) os mais antigos depois de `after`.
+    """
+    querysets = _key_querysets(user, celebrity_following_ids(user), before, after, limit)
+    return _merge_keys([list(queryset) for queryset in querysets], after, limit)
+
+
+async def atimeline_keys(user, before=None, after=None, limit=20):
+    querysets = _key_querysets(user, await acelebrity_following_ids(user), before, after, limit)
+    return _merge_keys([[key async for key in queryset] for queryset in querysets], after, limit)
+
+
+def _timeline_queryset(user, celebrity_ids):
+    entries = TimelineEntry.objects.filter(owner=user).values('tweet_id')
+    condition = Q(pk__in=entries)
+    if celebrity_ids:
+        condition |= Q(author_id__in=celebrity_ids)
+    return Tweet.objects.filter(condition).order_by('-created_at', '-id')
+
+
+def home_timeline(user):
+    """
+    Tweets visíveis no feed de `user` (timeline materializada + celebridades
+    seguidas), para buscar um tweet específico; para paginar use timeline_keys.
+    """
+    return _timeline_queryset(user, celebrity_following_ids(user))
+
+
+async def ahome_timeline(user):
+    """home_timeline() para views async: a única query prévia usa o ORM async."""
+    return _timeline_queryset(user, await acelebrity_following_ids(user))
+
+
+def rebuild_timelines(batch_size=5000):
+    """
+    Rematerializa as timelines de todos os tweets (carga em massa, dados
+    importados). Usa INSERT ... SELECT por faixa de ids de tweet, sem trazer
+    linhas para o Python. Retorna o número de faixas processadas.
+    """
+    entries = TimelineEntry._meta.db_table
+    tweets = Tweet._meta.db_table
+    users = User._meta.db_table
+    follows = User.followers.through._meta.db_table
+    if connection.vendor == 'postgresql':
+        insert, conflict = 'INSERT INTO', 'ON CONFLICT DO NOTHING'
+    else:
+        insert, conflict = 'INSERT OR IGNORE INTO', ''
+
+    own_sql = (
+        f'{insert} {entries} (owner_id, tweet_id, created_at) '
+        f'SELECT t.author_id, t.id, t.created_at FROM {tweets} t WHERE t.id >= %s AND t.id < %s {conflict}'
+    )
+    # from_user é quem é seguido (o autor), to_user é o seguidor
+    followers_sql = (
+        f'{insert} {entries} (owner_id, tweet_id, created_at) '
+        f'SELECT f.to_user_id, t.id, t.created_at FROM {tweets} t '
+        f'JOIN {follows} f ON f.from_user_id = t.author_id '
+        f'JOIN {users} u ON u.id = t.author_id AND u.followers_count <= %s '
+        f'WHERE t.id >= %s AND t.id < %s {conflict}'
+    )
+    # Os tweets de quem está acima do limite ficam sem entradas: leitura via merge
+    User.objects.filter(followers_count__gt=fanout_follower_limit(), fanout_on_read=False).update(fanout_on_read=True)
+    last_id = Tweet.objects.aggregate(m=Max('pk'))['m'] or 0
+    batches = 0
+    for start in range(0, last_id + 1, batch_size):
+        end = start + batch_size
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(own_sql, [start, end])
+            cursor.execute(followers_sql, [fanout_follower_limit(), start, end])
+        batches += 1
+    return batches
@@ -1,28 +1,73 @@
 
+import hashlib
+
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action, api_view
+from django.db import transaction
+from django.db.models import Count, F, Max
 from django.http import JsonResponse
-from .models import Tweet
-from .serializers import TweetSerializer, CommentSerializer, UserUpdateSerializer
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.shortcuts import get_object_or_404
+from django.contrib.auth import get_user_model
+from .models import ArchivedTweet, Tweet
+from .serializers import (
+    ArchivedTweetDetailSerializer, ArchivedTweetSerializer, TweetSerializer, CommentSerializer, UserUpdateSerializer,
+)
+from .timeline import home_timeline
+from .pagination import KeysetPagination, SearchPagination, TimelinePagination
+from .counters import toggle_like, total_likes
+from . import cache as timeline_cache
+from .events import publish_tweet
+from twitter_clone.conditional import conditional
+from twitter_clone.throttling import token_bucket
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.decorators import api_view, permission_classes
 
+User = get_user_model()
+
 class TweetViewSet(viewsets.ModelViewSet):
     serializer_class = TweetSerializer
     permission_classes = [permissions.IsAuthenticated]  # padrão para todo o ViewSet
+    pagination_class = TimelinePagination  # cursor em (created_at, id)
 
     def get_queryset(self):
         """Retorna tweets apenas de usuários que o user logado segue + seus próprios tweets"""
+        # Lê da timeline materializada (ver tweets/timeline.py)
         user = self.request.user
-        # Usuários que o user está seguindo
-        following_users = user.following.all()
-        # Tweets de quem você segue + seus próprios tweets
-        return Tweet.objects.filter(
-            author__in=following_users
-        ).order_by('-created_at') | Tweet.objects.filter(
-            author=user
-        ).order_by('-created_at')
+        return home_timeline(user).with_engagement(user)
+    
+    def list(self, request, *args, **kwargs):
+        """
+        ETag/Last-Modified vêm das versões do cache de timeline (tweets/cache.py),
+        então um If-None-Match válido vira 304 sem tocar no serializer.
+        A primeira página (sem cursor) também sai do cache por usuário.
+        """
+        params = request.query_params
+        cursor = params.get('before', '') + ':' + params.get('after', '')
+        variant = f"{request.get_host()}:{self.paginator.get_page_size(request)}:{cursor}"
+        etag, last_modified = timeline_cache.feed_version(request.user, variant)
+        use_cache = timeline_cache.cache_enabled() and cursor == ':'
+        return conditional(
+            request, *timeline_cache.validators(etag, last_modified),
+            lambda: self._list_page(request, etag if use_cache else None, *args, **kwargs),
+        )
+
+    def _list_page(self, request, cache_digest, *args, **kwargs):
+        if cache_digest is None:
+            return self._timeline_page(request)
+        key = timeline_cache.page_key(cache_digest)
+        data = timeline_cache.get_page(key)
+        if data is None:
+            data = self._timeline_page(request).data
+            timeline_cache.set_page(key, data)
+        return Response(data)
+
+    def _timeline_page(self, request):
+        """Keyset sobre TimelineEntry; os tweets da página saem numa query só."""
+        user = request.user
+        page = self.paginator.paginate_timeline(user, Tweet.objects.with_engagement(user), request)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     def get_serializer_context(self):
         """Garante que o request está disponível no serializer"""
@@ -31,8 +76,19 @@ class TweetViewSet(viewsets.ModelViewSet):
         return context
 
     def perform_create(self, serializer):
-        """Associa o tweet ao usuário autenticado."""
-        serializer.save(author=self.request.user)
+        """Associa o tweet ao usuário autenticado (o fan-out é feito em tweets/signals.py)."""
+        with transaction.atomic():
+            tweet = serializer.save(author=self.request.user)
+            User.objects.filter(pk=self.request.user.pk).update(tweets_count=F('tweets_count') + 1)
+            # Stream SSE (tweets/events.py): só depois do commit o tweet é visível
+            transaction.on_commit(lambda: publish_tweet(tweet))
+
+    def perform_destroy(self, instance):
+        """Remove o tweet e decrementa o contador do autor."""
+        with transaction.atomic():
+            author_id = instance.author_id
+            instance.delete()
+            User.objects.filter(pk=author_id, tweets_count__gt=0).update(tweets_count=F('tweets_count') - 1)
 
     def create(self, request, *args, **kwargs):
         """Cria e retorna o tweet recém-criado em JSON."""
@@ -42,40 +98,82 @@ class TweetViewSet(viewsets.ModelViewSet):
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated],
+            throttle_classes=[token_bucket('like')])
     def like_tweet(self, request, pk=None):
         """Toggle like/unlike de um tweet."""
         tweet = self.get_object()
-        user = request.user
-
-        if user in tweet.likes.all():
-            tweet.likes.remove(user)
-            liked = False
-        else:
-            tweet.likes.add(user)
-            liked = True
+        liked = toggle_like(tweet, request.user)  # ver tweets/counters.py
 
         return JsonResponse({
             "liked": liked,
-            "total_likes": tweet.likes.count()
+            "total_likes": total_likes(tweet)
         })
     
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated],
+            throttle_classes=[token_bucket('comment')])
     def add_comment(self, request, pk=None):
         """POST /tweets/{id}/add_comment/"""
         tweet = self.get_object()
         serializer = CommentSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(author=request.user, tweet=tweet)
+            with transaction.atomic():
+                serializer.save(author=request.user, tweet=tweet)
+                Tweet.objects.filter(pk=tweet.pk).update(comments_count=F('comments_count') + 1)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=True, methods=['get'], permission_classes=[AllowAny])
     def comments(self, request, pk=None):
-        """GET /tweets/{id}/comments/"""
+        """GET /tweets/{id}/comments/?before=<cursor>&after=<cursor>&page_size=N"""
         tweet = self.get_object()
-        comments = tweet.comments.all().order_by('-created_at')
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        # Validadores baratos (índice de tweet_id), sem serializar os comentários
+        latest = tweet.comments.aggregate(n=Count('id'), last_id=Max('id'), last_at=Max('created_at'))
+        etag = hashlib.md5(
+            f"{tweet.pk}:{latest['n']}:{latest['last_id']}:{request.get_full_path()}".encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        last_modified = latest['last_at'].timestamp() if latest['last_at'] else None
+
+        def build_response():
+            page = self.paginate_queryset(tweet.comments.select_related('author'))
+            serializer = CommentSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        return conditional(request, etag, last_modified, build_response)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """GET /tweets/search/?q=<termos>&before=<cursor> — busca full-text ranqueada"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'next': None, 'previous': None, 'results': []})
+        paginator = SearchPagination()
+        page = paginator.paginate_search(query, request)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='archive')
+    def archived(self, request):
+        """GET /tweets/archive/?author=<id>&before=<cursor> — tweets arquivados de um autor (caminho lento)"""
+        try:
+            author_id = int(request.query_params['author'])
+        except (KeyError, ValueError):
+            return Response({'detail': "Informe ?author=<id>."}, status=status.HTTP_400_BAD_REQUEST)
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(
+            ArchivedTweet.objects.filter(author_id=author_id).select_related('author'), request,
+        )
+        serializer = ArchivedTweetSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
 
+    @action(detail=False, methods=['get'], url_path=r'archive/(?P<archived_pk>[0-9]+)')
+    def archived_detail(self, request, archived_pk=None):
+        """GET /tweets/archive/{id}/ — tweet arquivado com comentários (ver tweets/archive.py)"""
+        tweet = get_object_or_404(ArchivedTweet.objects.select_related('author'), pk=archived_pk)
+        return Response(ArchivedTweetDetailSerializer(tweet, context=self.get_serializer_context()).data)
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        """GET /tweets/cache_stats/ — hits/misses do cache de timeline"""
+        return Response(timeline_cache.stats())
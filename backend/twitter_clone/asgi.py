@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "twitter_clone.settings")
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if "whitenoise.middleware.WhiteNoiseMiddleware" not in settings.MIDDLEWARE:
+    # Pilha toda async (ASYNC_READ_PATH=1): estáticos fora do Django, ver twitter_clone/static.py
+    from twitter_clone.static import serve_static  # noqa: E402
+
+    application = serve_static(application, str(settings.STATIC_ROOT), settings.STATIC_URL)
@@ -0,0 +1,90 @@
+# twitter_clone/async_api.py
+"""
+Infra mínima para views async (ASGI) que respondem como a API DRF.
+
+O DRF não suporta views async, então `async_api_view` faz o papel do
+APIView: checa o método, autentica (JWT async, com fallback para a sessão),
+converte exceções da API em respostas JSON e entrega à view um
+`rest_framework.request.Request`, de modo que paginadores e serializers
+existentes funcionam sem mudança. O corpo é renderizado com o mesmo
+JSONRenderer das views síncronas.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from users.authentication import AsyncJWTAuthentication
+
+
+def render(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def _error(exc, authenticator):
+    if isinstance(exc, Http404):
+        exc = exceptions.NotFound()
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = render(data, status=exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response.status_code = status.HTTP_401_UNAUTHORIZED
+        response['WWW-Authenticate'] = authenticator.authenticate_header(None)
+    return response
+
+
+async def _authenticate(request, authenticator):
+    result = await authenticator.aauthenticate(request)
+    if result is not None:
+        return result[0]
+    # Sem Bearer token: sessão do Django (como o SessionAuthentication nos GETs)
+    return await request.auser()
+
+
+def async_api_view(methods=('GET',), auth_required=True):
+    """Decorator para `async def view(request, ...)`, onde `request` é um Request do DRF."""
+    allowed = {method.upper() for method in methods}
+    if 'GET' in allowed:
+        allowed.add('HEAD')
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            authenticator = AsyncJWTAuthentication()
+            try:
+                if request.method not in allowed:
+                    raise exceptions.MethodNotAllowed(request.method)
+                user = await _authenticate(request, authenticator)
+                if auth_required and not user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                api_request = Request(request)
+                api_request.user = user
+                return await view(api_request, *args, **kwargs)
+            except (exceptions.APIException, Http404) as exc:
+                return _error(exc, authenticator)
+
+        return wrapper
+
+    return decorator
+
+
+def by_method(sync_view, **async_views):
+    """
+    Uma rota, duas implementações: os métodos em `async_views` (ex.: get=...)
+    vão para as views async e o resto (POST, PATCH...) para a view síncrona,
+    que roda numa thread como qualquer view síncrona sob ASGI.
+    """
+    fallback = sync_to_async(sync_view)
+    handlers = {method.upper(): view for method, view in async_views.items()}
+    if 'GET' in handlers:
+        handlers.setdefault('HEAD', handlers['GET'])
+
+    async def view(request, *args, **kwargs):
+        handler = handlers.get(request.method, fallback)
+        return await handler(request, *args, **kwargs)
+
+    # O DRF faz a própria checagem de CSRF (SessionAuthentication), como em APIView.as_view
+    view.csrf_exempt = True
+    return view
@@ -0,0 +1,25 @@
+# twitter_clone/async_urls.py
+"""
+URLconf usado com ASYNC_READ_PATH=1 (app ASGI, ex.: uvicorn): as leituras
+quentes passam para as views async e todo o resto continua em urls.py.
+"""
+from django.urls import path
+
+from tweets import async_views as tweet_views
+from tweets.views import TweetViewSet
+from twitter_clone import urls
+from twitter_clone.async_api import by_method
+from users import async_views as user_views
+from users import views as user_sync_views
+
+tweet_list = TweetViewSet.as_view({'get': 'list', 'post': 'create'}, basename='tweet', detail=False)
+
+async_urlpatterns = [
+    path('api/tweets/', by_method(tweet_list, get=tweet_views.timeline), name='tweet-list'),
+    path('api/tweets/search/', tweet_views.search, name='tweet-search'),
+    path('api/tweets/stream/', tweet_views.stream, name='tweet-stream'),
+    path('api/tweets/<int:pk>/comments/', tweet_views.comments, name='tweet-comments'),
+    path('api/users/profile/', by_method(user_sync_views.profile, get=user_views.profile), name='profile'),
+]
+
+urlpatterns = async_urlpatterns + urls.urlpatterns
@@ -0,0 +1,43 @@
+# twitter_clone/conditional.py
+"""
+GET condicional para views DRF (ETag / Last-Modified).
+
+Os validadores são calculados pela view sem serializar o corpo; se o cliente
+mandou If-None-Match / If-Modified-Since compatíveis, `not_modified()` devolve
+o 304 antes do serializer rodar.
+"""
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """Retorna um 304 se a versão do cliente ainda é a atual, senão None."""
+    return get_conditional_response(
+        request,
+        etag=quote_etag(etag) if etag else None,
+        last_modified=int(last_modified) if last_modified is not None else None,
+    )
+
+
+def set_validators(response, etag=None, last_modified=None):
+    if etag:
+        response['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def conditional(request, etag, last_modified, build_response):
+    """Responde 304 ou chama `build_response()` e anexa ETag/Last-Modified."""
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        response = build_response()
+    return set_validators(response, etag, last_modified)
+
+
+async def aconditional(request, etag, last_modified, build_response):
+    """`conditional` para views async: `build_response()` é uma corrotina."""
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        response = await build_response()
+    return set_validators(response, etag, last_modified)
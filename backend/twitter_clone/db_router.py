@@ -0,0 +1,138 @@
+# twitter_clone/db_router.py
+"""
+Leituras nas réplicas, escritas no primário.
+
+Com DATABASE_REPLICAS configurado (SQL_REPLICA_HOSTS), `ReplicaRouter`
+manda as leituras feitas durante uma requisição GET/HEAD/OPTIONS para uma
+réplica sorteada por requisição, e toda escrita para o `default`. Ficam no
+primário:
+
+- todas as leituras de POST/PUT/PATCH/DELETE: o get_object() de um like ou o
+  usuário de um follow não podem vir de uma réplica atrasada;
+- leituras depois de uma escrita na mesma requisição e dentro de
+  transaction.atomic() (consistência da própria operação);
+- leituras fora de requisição (jobs, comandos, shell);
+- todas as leituras de um usuário por DATABASE_REPLICA_STICKY_SECONDS depois
+  de uma requisição dele que escreveu (read-your-writes): o tweet recém-criado
+  aparece no feed mesmo que a réplica ainda não o tenha recebido.
+
+A marca de "escreveu há pouco" fica no cache do Django, por usuário; com
+vários workers use um CACHE_BACKEND compartilhado, senão a marca só vale no
+worker que atendeu a escrita.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import LazyObject, empty
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_KEY = 'db:pin:{}'
+
+_state = ContextVar('db_routing', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def sticky_seconds():
+    return getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 5)
+
+
+def _known_user(request):
+    """Usuário já autenticado (DRF grava em request.user), sem disparar a autenticação lazy."""
+    user = request.__dict__.get('user')
+    if user is None or (isinstance(user, LazyObject) and user._wrapped is empty):
+        return None
+    return user if user.is_authenticated else None
+
+
+class RoutingState:
+    def __init__(self, request):
+        self.request = request
+        self.replica = random.choice(replicas())
+        self.unsafe = request.method not in SAFE_METHODS
+        self.wrote = False
+        self.pinned = None  # None: ainda não sabemos quem é o usuário
+
+    def use_primary(self):
+        if self.unsafe or self.wrote or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return True
+        if self.pinned is None:
+            user = _known_user(self.request)
+            if user is None:
+                return False  # a própria busca do usuário na autenticação vai para a réplica
+            self.pinned = cache.get(PIN_KEY.format(user.pk)) is not None
+        return self.pinned
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.use_primary():
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Objetos lidos da réplica podem ser ligados/salvos com os do primário
+        pool = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Sync e async. No app ASGI o estado vai num ContextVar, que o sync_to_async
+    copia para as threads onde o ORM roda: o router vê a mesma RoutingState.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not replicas():
+            return self.get_response(request)
+        state = RoutingState(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if self.should_pin(state, request):
+            cache.set(PIN_KEY.format(_known_user(request).pk), 1, sticky_seconds())
+        return response
+
+    async def __acall__(self, request):
+        if not replicas():
+            return await self.get_response(request)
+        state = RoutingState(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        if self.should_pin(state, request):
+            await cache.aset(PIN_KEY.format(_known_user(request).pk), 1, sticky_seconds())
+        return response
+
+    @staticmethod
+    def should_pin(state, request):
+        return state.wrote and _known_user(request) is not None and sticky_seconds() > 0
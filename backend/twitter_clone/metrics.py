@@ -0,0 +1,285 @@
+# twitter_clone/metrics.py
+"""
+Métricas por endpoint no formato do Prometheus.
+
+`MetricsMiddleware` registra, por nome de URL resolvido e método HTTP:
+latência (histograma), queries SQL e tempo no banco, tamanho da resposta e
+status. `/metrics` expõe tudo em texto para o Prometheus.
+
+Com vários workers do gunicorn, cada processo grava seus valores em arquivos
+mmap em PROMETHEUS_MULTIPROC_DIR (modo multiprocess do prometheus_client) e
+`/metrics` agrega o diretório inteiro; ver backend/gunicorn.conf.py. Sem a
+variável, os contadores ficam só na memória do processo.
+
+O middleware é sync e async: no app ASGI a requisição não passa por uma
+thread só para ser medida. As queries são contadas por um execute_wrapper
+fixo em cada conexão (instalado no connection_created) que soma no
+QueryCounter do contexto atual, então as queries que o ORM async roda nas
+threads do sync_to_async também entram na conta da requisição.
+
+Com o pool de conexões do Postgres ligado (SQL_POOL), cada requisição
+também atualiza o uso do pool: conexões abertas/em uso, pedidos esperando
+uma conexão livre (saturação), tempo total de espera e timeouts.
+"""
+import hmac
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+UNRESOLVED = '<unresolved>'
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Latência das requisições.', ['view', 'method'],
+    buckets=(.005, .01, .025, .05, .075, .1, .25, .5, .75, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter('http_requests', 'Requisições por status.', ['view', 'method', 'status'])
+DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Queries SQL por requisição.', ['view', 'method'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+DB_DURATION = Histogram(
+    'http_request_db_duration_seconds', 'Tempo no banco por requisição.', ['view', 'method'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1),
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Tamanho do corpo da resposta.', ['view', 'method'],
+    buckets=(100, 1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000),
+)
+
+# Pool de conexões, por alias de banco; as gauges somam os workers vivos
+DB_POOL_CONNECTIONS = Gauge(
+    'db_pool_connections', 'Conexões abertas no pool.', ['alias'], multiprocess_mode='livesum',
+)
+DB_POOL_IN_USE = Gauge(
+    'db_pool_connections_in_use', 'Conexões do pool emprestadas.', ['alias'], multiprocess_mode='livesum',
+)
+DB_POOL_WAITING = Gauge(
+    'db_pool_requests_waiting', 'Pedidos esperando uma conexão livre.', ['alias'], multiprocess_mode='livesum',
+)
+DB_POOL_MAX = Gauge('db_pool_max_connections', 'Tamanho máximo do pool.', ['alias'], multiprocess_mode='livesum')
+DB_POOL_REQUESTS = Counter('db_pool_requests', 'Conexões pedidas ao pool.', ['alias'])
+DB_POOL_QUEUED = Counter('db_pool_requests_queued', 'Pedidos que tiveram de esperar o pool.', ['alias'])
+DB_POOL_WAIT = Counter('db_pool_wait_seconds', 'Tempo total esperando uma conexão do pool.', ['alias'])
+DB_POOL_ERRORS = Counter('db_pool_requests_errors', 'Pedidos ao pool que falharam (timeout).', ['alias'])
+
+
+class QueryCounter:
+    """execute_wrapper que conta queries e soma o tempo gasto no banco."""
+
+    def __init__(self):
+        self.count = 0
+        self.time_ns = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter_ns()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time_ns += time.perf_counter_ns() - start
+            self.count += 1
+
+
+_counters = ContextVar('query_counters', default=())
+
+
+class ContextQueryCounter:
+    """execute_wrapper fixo de cada conexão: repassa a query aos QueryCounters do contexto."""
+
+    def __call__(self, execute, sql, params, many, context):
+        for counter in _counters.get():
+            execute = partial(counter, execute)
+        return execute(sql, params, many, context)
+
+
+def _install_counter(connection):
+    if not any(isinstance(wrapper, ContextQueryCounter) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(ContextQueryCounter())
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """Handler de connection_created: toda conexão, de qualquer thread, passa pelo contador."""
+    _install_counter(connection)
+
+
+@contextmanager
+def count_queries(counter):
+    """
+    Conta em `counter` as queries feitas neste contexto, inclusive nas threads
+    do sync_to_async (o contexto é copiado para elas). Pode ser aninhado.
+    """
+    for alias in connections:
+        _install_counter(connections[alias])  # conexões abertas antes do handler
+    token = _counters.set((*_counters.get(), counter))
+    try:
+        yield counter
+    finally:
+        _counters.reset(token)
+
+
+class SimulatedLatency:
+    """execute_wrapper que dorme antes de cada query (banco remoto de mentira)."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.seconds)
+        return execute(sql, params, many, context)
+
+
+def install_simulated_latency(sender, connection, **kwargs):
+    """Handler de connection_created; ver DB_SIMULATED_LATENCY_MS e DB_SIMULATED_CONNECT_MS."""
+    # Abrir conexão com um banco remoto: TCP + TLS + autenticação
+    time.sleep(getattr(settings, 'DB_SIMULATED_CONNECT_MS', 0) / 1000)
+    if not getattr(settings, 'DB_SIMULATED_LATENCY_MS', 0):
+        return
+    if any(isinstance(wrapper, SimulatedLatency) for wrapper in connection.execute_wrappers):
+        return  # o mesmo wrapper de conexão reconecta a cada requisição
+    latency = SimulatedLatency(settings.DB_SIMULATED_LATENCY_MS / 1000)
+    connection.execute_wrappers.append(latency)
+
+
+def db_pool(alias=DEFAULT_DB_ALIAS):
+    """ConnectionPool do psycopg para `alias`, ou None sem pool configurado."""
+    if not connections.settings[alias].get('OPTIONS', {}).get('pool'):
+        return None
+    return connections[alias].pool
+
+
+def pool_stats(alias=DEFAULT_DB_ALIAS):
+    """Uso atual do pool de `alias` (sem zerar os contadores), ou None sem pool."""
+    pool = db_pool(alias)
+    if pool is None:
+        return None
+    stats = pool.get_stats()
+    return {
+        'size': stats['pool_size'],
+        'available': stats['pool_available'],
+        'in_use': stats['pool_size'] - stats['pool_available'],
+        'max': stats['pool_max'],
+        'waiting': stats.get('requests_waiting', 0),
+    }
+
+
+def observe_pools():
+    """Atualiza as métricas db_pool_* com o que o psycopg acumulou desde a última chamada."""
+    for alias in connections:
+        pool = db_pool(alias)
+        if pool is None:
+            continue
+        stats = pool.pop_stats()  # zera os contadores: cada chamada soma só o delta
+        DB_POOL_CONNECTIONS.labels(alias).set(stats['pool_size'])
+        DB_POOL_IN_USE.labels(alias).set(stats['pool_size'] - stats['pool_available'])
+        DB_POOL_WAITING.labels(alias).set(stats.get('requests_waiting', 0))
+        DB_POOL_MAX.labels(alias).set(stats['pool_max'])
+        DB_POOL_REQUESTS.labels(alias).inc(stats.get('requests_num', 0))
+        DB_POOL_QUEUED.labels(alias).inc(stats.get('requests_queued', 0))
+        DB_POOL_WAIT.labels(alias).inc(stats.get('requests_wait_ms', 0) / 1000)
+        DB_POOL_ERRORS.labels(alias).inc(stats.get('requests_errors', 0))
+
+
+def metrics_enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def _labels(request):
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match is not None else UNRESOLVED
+    method = request.method if request.method in METHODS else 'other'
+    return view, method
+
+
+def _counting(content, labels):
+    """Envolve o corpo de um StreamingHttpResponse para medir os bytes ao final."""
+    size = 0
+    try:
+        for chunk in content:
+            size += len(chunk)
+            yield chunk
+    finally:
+        RESPONSE_SIZE.labels(*labels).observe(size)
+
+
+async def _acounting(content, labels):
+    size = 0
+    try:
+        async for chunk in content:
+            size += len(chunk)
+            yield chunk
+    finally:
+        RESPONSE_SIZE.labels(*labels).observe(size)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not metrics_enabled():
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with count_queries(counter):
+            response = self.get_response(request)
+        return self.observe(request, response, counter, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not metrics_enabled():
+            return await self.get_response(request)
+
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with count_queries(counter):
+            response = await self.get_response(request)
+        return self.observe(request, response, counter, time.perf_counter() - start)
+
+    def observe(self, request, response, counter, elapsed):
+        labels = _labels(request)
+        REQUEST_LATENCY.labels(*labels).observe(elapsed)
+        REQUESTS.labels(*labels, str(response.status_code)).inc()
+        DB_QUERIES.labels(*labels).observe(counter.count)
+        DB_DURATION.labels(*labels).observe(counter.time_ns / 1e9)
+        if response.streaming:
+            wrap = _acounting if getattr(response, 'is_async', False) else _counting
+            response.streaming_content = wrap(response.streaming_content, labels)
+        else:
+            RESPONSE_SIZE.labels(*labels).observe(len(response.content))
+        observe_pools()
+        return response
+
+
+def registry():
+    """Registry do processo, ou o agregado de todos os workers no modo multiprocess."""
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    collected = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collected)
+    return collected
+
+
+def metrics_view(request):
+    """Exposição no formato texto do Prometheus; exige METRICS_TOKEN se configurado."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
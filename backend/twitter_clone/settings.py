@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     # Apps do projeto
     "tweets",
     "users",
+    "jobs",
 ]
 
 # --------------------------------------------------------------
@@ -56,6 +57,8 @@ INSTALLED_APPS = [
 # --------------------------------------------------------------
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",  # TEM QUE SER O PRIMEIRO
+    "twitter_clone.metrics.MetricsMiddleware",  # mede tudo que vem depois
+    "twitter_clone.db_router.ReplicaRoutingMiddleware",  # leituras nas réplicas (DATABASE_REPLICAS)
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -97,6 +100,9 @@ CORS_ALLOW_HEADERS = list(default_headers) + [
     "x-csrftoken",
 ]
 
+# Validadores de GET condicional (twitter_clone/conditional.py) visíveis para o frontend
+CORS_EXPOSE_HEADERS = ["ETag", "Last-Modified"]
+
 CORS_ALLOW_METHODS = [
     "GET",
     "POST",
@@ -118,7 +124,14 @@ CSRF_TRUSTED_ORIGINS = [
 # --------------------------------------------------------------
 # 🔗 ROOT / TEMPLATES / WSGI
 # --------------------------------------------------------------
-ROOT_URLCONF = "twitter_clone.urls"
+# ASYNC_READ_PATH=1 (app ASGI): timeline, comentários, busca e perfil usam
+# views async (twitter_clone/async_urls.py). Sob WSGI, deixe em 0.
+ASYNC_READ_PATH = bool(int(os.environ.get("ASYNC_READ_PATH", 0)))
+ROOT_URLCONF = "twitter_clone.async_urls" if ASYNC_READ_PATH else "twitter_clone.urls"
+if ASYNC_READ_PATH:
+    # O WhiteNoiseMiddleware é só sync: no app ASGI toda requisição passaria por
+    # uma thread. Os estáticos saem do asgi.py (twitter_clone/static.py)
+    MIDDLEWARE.remove("whitenoise.middleware.WhiteNoiseMiddleware")
 
 AUTH_USER_MODEL = 'users.User'
 
@@ -144,6 +157,8 @@ WSGI_APPLICATION = "twitter_clone.wsgi.application"
 # 🗄️ BANCO DE DADOS
 # ==============================================================
 
+_conn_max_age = os.environ.get("SQL_CONN_MAX_AGE", "0" if ASYNC_READ_PATH else "60")
+
 DATABASES = {
     "default": {
         "ENGINE": os.environ.get("SQL_ENGINE", "django.db.backends.sqlite3"),
@@ -152,8 +167,75 @@ DATABASES = {
         "PASSWORD": os.environ.get("SQL_PASSWORD", "password"),
         "HOST": os.environ.get("SQL_HOST", "localhost"),
         "PORT": os.environ.get("SQL_PORT", "5432"),
+        # Conexões persistentes: segundos que a conexão sobrevive entre requisições
+        # ("none" = sem limite, 0 = uma conexão nova por requisição). No app ASGI
+        # o padrão é 0: conexões persistentes ficam presas às threads do sync_to_async
+        "CONN_MAX_AGE": None if _conn_max_age.lower() == "none" else int(_conn_max_age),
+        # Antes de reutilizar, testa a conexão (banco reiniciado, failover, timeout ocioso)
+        "CONN_HEALTH_CHECKS": bool(int(os.environ.get("SQL_CONN_HEALTH_CHECKS", 1))),
     }
 }
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # Transações pegam o lock de escrita no BEGIN: com vários escritores (workers
+    # de jobs, gunicorn), quem chega depois espera o timeout em vez de falhar
+    # com "database is locked" ao promover uma transação de leitura
+    DATABASES["default"]["OPTIONS"] = {"transaction_mode": "IMMEDIATE"}
+elif bool(int(os.environ.get("SQL_POOL", 0))):
+    # Pool de conexões no processo (Postgres + psycopg 3; ver twitter_clone/metrics.py
+    # para saturação e espera). Cada worker tem o seu: workers x SQL_POOL_MAX_SIZE
+    # precisa caber no max_connections do Postgres
+    DATABASES["default"]["CONN_MAX_AGE"] = 0  # o pool substitui as conexões persistentes
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.environ.get("SQL_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.environ.get("SQL_POOL_MAX_SIZE", 10)),
+            # Segundos esperando uma conexão livre antes de falhar a requisição
+            "timeout": float(os.environ.get("SQL_POOL_TIMEOUT", 10)),
+        },
+    }
+
+# Réplicas de leitura (twitter_clone/db_router.py): SQL_REPLICA_HOSTS="host1,host2",
+# mesmo banco e usuário do primário. Requisições leem de uma réplica; escritas
+# e o que vem logo depois delas vão para o primário
+_replica_hosts = [host.strip() for host in os.environ.get("SQL_REPLICA_HOSTS", "").split(",") if host.strip()]
+DATABASE_REPLICAS = []
+for _index, _host in enumerate(_replica_hosts, 1):
+    DATABASES[f"replica{_index}"] = {**DATABASES["default"], "HOST": _host, "TEST": {"MIRROR": "default"}}
+    DATABASE_REPLICAS.append(f"replica{_index}")
+# Depois de escrever, o usuário lê do primário por esse tempo (> lag da replicação)
+DATABASE_REPLICA_STICKY_SECONDS = float(os.environ.get("DATABASE_REPLICA_STICKY_SECONDS", 5))
+DATABASE_ROUTERS = ["twitter_clone.db_router.ReplicaRouter"]
+
+# ==============================================================
+# ⚡ CACHE
+# ==============================================================
+
+# CACHE_BACKEND: "locmem" (padrão, LRU por processo), "file" ou "redis"
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "locmem")
+
+_CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "twitter-clone"),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", str(BASE_DIR / ".cache")),
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis://127.0.0.1:6379/1"),
+}
+_cache_class, _cache_location = _CACHE_BACKENDS[CACHE_BACKEND]
+
+CACHES = {
+    "default": {
+        "BACKEND": _cache_class,
+        "LOCATION": os.environ.get("CACHE_LOCATION", _cache_location),
+        "TIMEOUT": int(os.environ.get("CACHE_TIMEOUT", 300)),
+    }
+}
+if CACHE_BACKEND != "redis":
+    # Número máximo de entradas antes do despejo (LRU no locmem)
+    CACHES["default"]["OPTIONS"] = {"MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", 10000))}
+
+# Cache da primeira página da timeline (tweets/cache.py)
+TIMELINE_CACHE_ENABLED = bool(int(os.environ.get("TIMELINE_CACHE_ENABLED", 1)))
+TIMELINE_CACHE_TTL = int(os.environ.get("TIMELINE_CACHE_TTL", 60))
+# ETag/304 do feed (tweets/cache.py, feed_version); 0 desliga o GET condicional do feed
+TIMELINE_CONDITIONAL_GET = bool(int(os.environ.get("TIMELINE_CONDITIONAL_GET", 1)))
 
 # ==============================================================
 # 🔐 VALIDAÇÃO DE SENHA
@@ -210,29 +292,158 @@ else:
     MEDIA_URL = "/media/"
     MEDIA_ROOT = BASE_DIR / "media"
 
+# Variantes de avatar geradas localmente (users/avatars.py), servidas com
+# cache imutável; em produção o nginx pode servir AVATAR_ROOT direto
+AVATAR_ROOT = os.environ.get("AVATAR_ROOT", str(BASE_DIR / "media" / "avatars"))
+AVATAR_URL = os.environ.get("AVATAR_URL", "/media/avatars/")
+AVATAR_SIZES = {"feed": 48, "list": 96, "profile": 400}
+# Uploads em partes (users/uploads.py): arquivos parciais e pool de threads
+# que decodifica/gera as variantes fora da requisição (0 = na própria thread)
+AVATAR_UPLOAD_DIR = os.environ.get("AVATAR_UPLOAD_DIR", str(BASE_DIR / "media" / "uploads"))
+AVATAR_UPLOAD_MAX_BYTES = int(os.environ.get("AVATAR_UPLOAD_MAX_BYTES", 10 * 1024 * 1024))
+AVATAR_WORKERS = int(os.environ.get("AVATAR_WORKERS", 2))
+# Upload incompleto sem PATCH há mais que isso é apagado (expire_avatar_uploads)
+AVATAR_UPLOAD_EXPIRE_HOURS = float(os.environ.get("AVATAR_UPLOAD_EXPIRE_HOURS", 24))
+
 # ==============================================================
 # ⚙️ REST FRAMEWORK / JWT
 # ==============================================================
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
         "rest_framework.authentication.BasicAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # Proxies reversos confiáveis na frente da app: o IP do rate limit é o
+    # endereço que o N-ésimo proxy (de trás para frente) pôs no X-Forwarded-For.
+    # 0 (padrão) usa o REMOTE_ADDR e ignora o header, que o cliente controla;
+    # atrás de um load balancer (Heroku/Railway, nginx) use 1
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES", 0)),
 }
 
+# Cache em memória do usuário do JWT (users/authentication.py); TTL 0 desliga
+JWT_USER_CACHE_TTL = int(os.environ.get("JWT_USER_CACHE_TTL", 30))
+JWT_USER_CACHE_SIZE = int(os.environ.get("JWT_USER_CACHE_SIZE", 10000))
+
+# Rate limit (token bucket) por IP e por usuário; ver twitter_clone/throttling.py.
+# Taxas no formato do DRF: "5/min" = rajada de 5, recarga de 5 por minuto.
+RATE_LIMITS = {
+    "login": {"ip": "20/min", "user": "5/min"},
+    "signup": {"ip": "10/hour"},
+    "like": {"ip": "300/min", "user": "60/min"},
+    "comment": {"ip": "100/min", "user": "20/min"},
+    "follow": {"ip": "100/min", "user": "30/min"},
+}
+# Desligado em twitter_clone/test_settings.py (os testes de rate limit ligam)
+RATE_LIMIT_ENABLED = bool(int(os.environ.get("RATE_LIMIT_ENABLED", 1)))
+# "sqlite": baldes num SQLite WAL compartilhado pelos workers; "cache": cache do Django
+RATE_LIMIT_STORE = os.environ.get("RATE_LIMIT_STORE", "sqlite")
+RATE_LIMIT_SQLITE_PATH = os.environ.get("RATE_LIMIT_SQLITE_PATH", str(BASE_DIR / ".ratelimit.sqlite3"))
+
+# Paginação por cursor (tweets/pagination.py): ?page_size= até API_MAX_PAGE_SIZE
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", 20))
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", 100))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # Revogação por jti com filtro de Bloom, sem o app token_blacklist (users/revocation.py)
+    "TOKEN_REFRESH_SERIALIZER": "users.revocation.RevocableTokenRefreshSerializer",
 }
 
+# Revogados desde a última sincronização só são vistos pelos outros workers
+# depois de JWT_REVOCATION_SYNC_SECONDS; a tabela é compactada com
+# `manage.py compact_revoked_tokens` (cron)
+JWT_REVOCATION_SYNC_SECONDS = float(os.environ.get("JWT_REVOCATION_SYNC_SECONDS", 1))
+JWT_REVOCATION_REBUILD_SECONDS = int(os.environ.get("JWT_REVOCATION_REBUILD_SECONDS", 3600))
+JWT_REVOCATION_BLOOM_CAPACITY = int(os.environ.get("JWT_REVOCATION_BLOOM_CAPACITY", 100_000))
+JWT_REVOCATION_BLOOM_ERROR_RATE = float(os.environ.get("JWT_REVOCATION_BLOOM_ERROR_RATE", 0.001))
+
+# ==============================================================
+# 📰 TIMELINE (fan-out-on-write)
+# ==============================================================
+
+# Autores com mais seguidores que isso não fazem fan-out; seus tweets são
+# mesclados na leitura (ver tweets/timeline.py)
+TIMELINE_FANOUT_FOLLOWER_LIMIT = int(os.environ.get("TIMELINE_FANOUT_FOLLOWER_LIMIT", 5000))
+# Quantos tweets recentes copiar para a timeline ao seguir alguém
+TIMELINE_BACKFILL_LIMIT = int(os.environ.get("TIMELINE_BACKFILL_LIMIT", 200))
+
+# Stream SSE de tweets novos (/api/tweets/stream/, só no app ASGI). O hub
+# padrão só entrega dentro do processo; com vários workers aponte para um hub
+# com broker (ver tweets/events.py)
+TWEET_EVENTS_HUB = os.environ.get("TWEET_EVENTS_HUB", "tweets.events.InProcessHub")
+TWEET_STREAM_HEARTBEAT = float(os.environ.get("TWEET_STREAM_HEARTBEAT", 15))
+# Eventos pendentes por conexão; cheia, o stream fecha e o cliente retoma pelo Last-Event-ID
+TWEET_STREAM_QUEUE_SIZE = int(os.environ.get("TWEET_STREAM_QUEUE_SIZE", 100))
+# Máximo de tweets reenviados numa reconexão; acima disso o cliente recebe "reset"
+TWEET_STREAM_REPLAY_LIMIT = int(os.environ.get("TWEET_STREAM_REPLAY_LIMIT", 100))
+TWEET_STREAM_RETRY_MS = int(os.environ.get("TWEET_STREAM_RETRY_MS", 3000))
+# Segundos entre as consultas ao banco do poller do InProcessHub (uma por
+# processo), que traz para o stream os tweets publicados em outros workers
+TWEET_STREAM_CATCHUP = float(os.environ.get("TWEET_STREAM_CATCHUP", 15))
+
+# Fatias do contador de likes por tweet (tweets/counters.py)
+LIKE_COUNTER_SHARDS = int(os.environ.get("LIKE_COUNTER_SHARDS", 8))
+# Com a fila de jobs ativa: segundos até somar as fatias em Tweet.likes_count
+LIKE_CONSOLIDATE_DELAY = int(os.environ.get("LIKE_CONSOLIDATE_DELAY", 60))
+
+# Configuração de text search do PostgreSQL para /api/tweets/search/
+# (usada na coluna gerada; rode `manage.py rebuild_search_index` se mudar)
+SEARCH_TEXT_CONFIG = os.environ.get("SEARCH_TEXT_CONFIG", "simple")
+
+# Arquivo frio (tweets/archive.py): `manage.py archive_tweets` (cron) move os
+# tweets mais velhos que TWEET_ARCHIVE_AFTER_DAYS, com comentários e likes,
+# para partições mensais comprimidas, TWEET_ARCHIVE_BATCH_SIZE por transação
+TWEET_ARCHIVE_AFTER_DAYS = int(os.environ.get("TWEET_ARCHIVE_AFTER_DAYS", 365))
+TWEET_ARCHIVE_BATCH_SIZE = int(os.environ.get("TWEET_ARCHIVE_BATCH_SIZE", 500))
+
+# Typeahead de usuários (/api/users/search/?mode=typeahead): trie em memória
+# por processo, reconstruído a cada USER_TYPEAHEAD_TRIE_TTL segundos
+USER_TYPEAHEAD_TRIE = bool(int(os.environ.get("USER_TYPEAHEAD_TRIE", 0)))
+USER_TYPEAHEAD_TRIE_TTL = int(os.environ.get("USER_TYPEAHEAD_TRIE_TTL", 300))
+
+# ==============================================================
+# 🧵 JOBS (fila no banco, jobs/queue.py)
+# ==============================================================
+
+# 1 (padrão): fan-out, backfill de follows etc. rodam na própria requisição.
+# 0: viram linhas na tabela de jobs, executadas por `manage.py run_jobs`.
+# Com 0, use um CACHE_BACKEND compartilhado: o worker invalida o cache de
+# timeline depois do fan-out
+JOBS_EAGER = bool(int(os.environ.get("JOBS_EAGER", 1)))
+JOBS_CONCURRENCY = int(os.environ.get("JOBS_CONCURRENCY", 4))
+JOBS_POLL_INTERVAL = float(os.environ.get("JOBS_POLL_INTERVAL", 1.0))
+# Tempo que um worker tem para terminar um job antes de outro poder pegá-lo
+JOBS_LEASE_SECONDS = int(os.environ.get("JOBS_LEASE_SECONDS", 300))
+JOBS_MAX_ATTEMPTS = int(os.environ.get("JOBS_MAX_ATTEMPTS", 5))
+# Retry: JOBS_RETRY_BACKOFF * 2^(tentativa-1) segundos, até JOBS_RETRY_BACKOFF_MAX
+JOBS_RETRY_BACKOFF = float(os.environ.get("JOBS_RETRY_BACKOFF", 5))
+JOBS_RETRY_BACKOFF_MAX = float(os.environ.get("JOBS_RETRY_BACKOFF_MAX", 3600))
+
+# ==============================================================
+# 📈 MÉTRICAS (Prometheus)
+# ==============================================================
+
+# Latência, queries, tamanho e status por endpoint (twitter_clone/metrics.py),
+# expostos em /metrics. Com gunicorn, PROMETHEUS_MULTIPROC_DIR é definido em
+# gunicorn.conf.py para agregar todos os workers.
+METRICS_ENABLED = bool(int(os.environ.get("METRICS_ENABLED", 1)))
+# Se definido, /metrics exige "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Só para benchmark: atraso (ms) somado a cada query, simulando um banco remoto
+# (ver benchmark_concurrency). Nunca ligue em produção.
+DB_SIMULATED_LATENCY_MS = float(os.environ.get("DB_SIMULATED_LATENCY_MS", 0))
+# Idem, uma vez por conexão aberta (handshake com um banco remoto; ver benchmark_pooling)
+DB_SIMULATED_CONNECT_MS = float(os.environ.get("DB_SIMULATED_CONNECT_MS", 0))
+
 # ==============================================================
 # 🧠 OUTRAS CONFIGURAÇÕES
 # ==============================================================
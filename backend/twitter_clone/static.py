@@ -0,0 +1,28 @@
+# twitter_clone/static.py
+"""
+Arquivos estáticos no app ASGI sem o WhiteNoiseMiddleware.
+
+O middleware do WhiteNoise é só sync, e um único middleware sync na pilha faz
+o Django rodar toda requisição ASGI numa thread. Com ASYNC_READ_PATH=1 ele sai
+do MIDDLEWARE e `serve_static` atende STATIC_URL antes do Django: só essas
+requisições passam pelo WhiteNoise (WSGI, numa thread); o resto segue async.
+"""
+from asgiref.wsgi import WsgiToAsgi
+from whitenoise import WhiteNoise
+
+
+def _not_found(environ, start_response):
+    start_response('404 Not Found', [('Content-Type', 'text/plain')])
+    return [b'Not Found']
+
+
+def serve_static(application, root, prefix):
+    """App ASGI: `prefix` vem de `root` via WhiteNoise, o resto vai para `application`."""
+    static = WsgiToAsgi(WhiteNoise(_not_found, root=root, prefix=prefix))
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'].startswith(prefix):
+            return await static(scope, receive, send)
+        return await application(scope, receive, send)
+
+    return app
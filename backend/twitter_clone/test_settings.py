@@ -0,0 +1,13 @@
+# twitter_clone/test_settings.py
+"""
+Settings dos testes: `manage.py test` usa este módulo por padrão; outros
+runners devem apontar DJANGO_SETTINGS_MODULE=twitter_clone.test_settings.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+# Os testes de rate limit ligam com override_settings
+RATE_LIMIT_ENABLED = False
+
+# Réplica de mentira para os testes do roteador: um segundo SQLite, sem replicação
+DATABASES["replica"] = {"ENGINE": "django.db.backends.sqlite3", "NAME": BASE_DIR / "db-replica.sqlite3"}
@@ -0,0 +1,164 @@
+# twitter_clone/throttling.py
+"""
+Rate limit por token bucket para login, cadastro e escritas.
+
+Cada escopo (RATE_LIMITS) define um balde por IP e/ou por usuário, no
+formato de taxa do DRF ("5/min": capacidade 5, recarga de 5 fichas por
+minuto, então rajadas curtas passam e abuso contínuo não). Nas views:
+
+    @throttle_classes([token_bucket('signup')])
+    @action(..., throttle_classes=[token_bucket('like')])
+
+Quem estoura recebe 429 com Retry-After (o DRF monta a resposta a partir
+de `wait()`). O IP vem do `get_ident` do DRF: com REST_FRAMEWORK["NUM_PROXIES"]
+igual ao número de proxies da implantação, um X-Forwarded-For forjado pelo
+cliente não troca o balde.
+
+O estado fica num SQLite em modo WAL (RATE_LIMIT_SQLITE_PATH), compartilhado
+por todos os workers da máquina; cada consumo é uma transação BEGIN
+IMMEDIATE, então é atômico entre processos. Se o arquivo não puder ser usado
+(RATE_LIMIT_STORE="cache" ou erro do SQLite), os baldes vão para o cache do
+Django: atômico só dentro do processo (com locmem, cada worker tem os seus).
+"""
+import logging
+import math
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Balde parado há mais que isso já encheu (nenhuma taxa tem período maior que um dia)
+IDLE_SECONDS = 86400
+PRUNE_PROBABILITY = 0.001
+
+
+def parse_rate(rate):
+    """'5/min' -> (capacidade, fichas por segundo)."""
+    count, period = rate.split('/')
+    return int(count), int(count) / PERIODS[period[0]]
+
+
+def refill(state, capacity, per_second, now):
+    """Consome uma ficha: (novo estado, permitido, segundos até a próxima ficha)."""
+    tokens, updated = state if state is not None else (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * per_second)
+    if tokens >= 1:
+        return (tokens - 1, now), True, 0.0
+    return (tokens, now), False, (1 - tokens) / per_second
+
+
+class SQLiteBucketStore:
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets '
+                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, capacity, per_second):
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            state = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            (tokens, updated), allowed, wait = refill(state, capacity, per_second, now)
+            conn.execute(
+                'INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                (key, tokens, updated),
+            )
+            if random.random() < PRUNE_PROBABILITY:
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - IDLE_SECONDS,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, wait
+
+
+class CacheBucketStore:
+    _lock = threading.Lock()
+
+    def take(self, key, capacity, per_second):
+        cache = caches[getattr(settings, 'RATE_LIMIT_CACHE_ALIAS', 'default')]
+        with self._lock:
+            state, allowed, wait = refill(cache.get(key), capacity, per_second, time.time())
+            cache.set(key, state, timeout=math.ceil(capacity / per_second) + 1)
+        return allowed, wait
+
+
+_stores = {}
+
+
+def get_store():
+    if getattr(settings, 'RATE_LIMIT_STORE', 'sqlite') != 'sqlite':
+        return _stores.setdefault('cache', CacheBucketStore())
+    path = str(settings.RATE_LIMIT_SQLITE_PATH)
+    if path not in _stores:
+        _stores[path] = SQLiteBucketStore(path)
+    return _stores[path]
+
+
+def take(key, capacity, per_second):
+    store = get_store()
+    try:
+        return store.take(key, capacity, per_second)
+    except sqlite3.Error:
+        logger.warning("Rate limit: SQLite indisponível, usando o cache do Django", exc_info=True)
+        return _stores.setdefault('cache', CacheBucketStore()).take(key, capacity, per_second)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def identities(self, request):
+        """(tipo, identificador) de cada balde que a requisição consome."""
+        yield 'ip', self.get_ident(request)
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            yield 'user', user.pk
+        elif isinstance(request.data, dict) and request.data.get('email'):
+            # Login/cadastro: o "usuário" é a conta visada, contra tentativas vindas de vários IPs
+            yield 'user', str(request.data['email']).strip().lower()
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        limits = getattr(settings, 'RATE_LIMITS', {}).get(self.scope)
+        if not limits or not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+            return True
+        waits = []
+        for kind, ident in self.identities(request):
+            if kind not in limits:
+                continue
+            capacity, per_second = parse_rate(limits[kind])
+            allowed, wait = take(f"rl:{self.scope}:{kind}:{ident}", capacity, per_second)
+            if not allowed:
+                waits.append(wait)
+        if waits:
+            self.retry_after = max(waits)
+        return not waits
+
+    def wait(self):
+        return self.retry_after
+
+
+def token_bucket(scope):
+    """Classe de throttle para o escopo `scope` de RATE_LIMITS."""
+    return type(f'TokenBucketThrottle_{scope}', (TokenBucketThrottle,), {'scope': scope})
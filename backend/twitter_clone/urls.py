@@ -1,18 +1,25 @@
 # twitter_clone/urls.py
 from twitter_clone import views
+from twitter_clone.metrics import metrics_view
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
+from users.avatars import serve_avatar
+from users.views import ThrottledTokenObtainPairView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('tweets.urls')),
     path('api/users/', include('users.urls')),
-    path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path("api/token/", ThrottledTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("hello/", views.hello_world, name="hello_world"),
+    path("metrics", metrics_view, name="metrics"),
+    path("health/", views.health, name="health"),
+    # Antes do static(MEDIA_URL) abaixo: as variantes precisam do Cache-Control imutável
+    path(f"{settings.AVATAR_URL.strip('/')}/<str:name>", serve_avatar, name="avatar-file"),
 ]
 
 # Servir arquivos de mídia (uploads) em desenvolvimento e produção
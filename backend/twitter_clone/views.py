@@ -1,7 +1,39 @@
-from django.http import HttpResponse
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.http import HttpResponse, JsonResponse
 from django.template import loader
 
+from twitter_clone.metrics import pool_stats
+
 
 def hello_world(request):
     template = loader.get_template('hello_world.html')
-    return HttpResponse(template.render())
\ No newline at end of file
+    return HttpResponse(template.render())
+
+
+def health(request):
+    """
+    Readiness para o balanceador: SELECT 1 no primário e em cada réplica, com
+    a latência e o uso do pool de conexões. 503 se algum banco não responder.
+    """
+    databases = {}
+    for alias in [DEFAULT_DB_ALIAS, *getattr(settings, 'DATABASE_REPLICAS', [])]:
+        start = time.perf_counter()
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except DatabaseError as exc:
+            databases[alias] = {'ok': False, 'error': type(exc).__name__}
+            continue
+        databases[alias] = {'ok': True, 'latency_ms': round((time.perf_counter() - start) * 1000, 2)}
+        pool = pool_stats(alias)
+        if pool is not None:
+            databases[alias]['pool'] = pool
+    healthy = all(db['ok'] for db in databases.values())
+    return JsonResponse(
+        {'status': 'ok' if healthy else 'unavailable', 'databases': databases},
+        status=200 if healthy else 503,
+        headers={'Cache-Control': 'no-store'},
+    )
@@ -0,0 +1,18 @@
+# users/async_views.py
+"""Leitura async do perfil (ASYNC_READ_PATH=1); o PATCH continua em views.profile."""
+from twitter_clone.async_api import async_api_view, render
+from twitter_clone.conditional import aconditional
+
+from .serializers import UserUpdateSerializer
+from .views import profile_etag
+
+
+@async_api_view()
+async def profile(request):
+    """GET /api/users/profile/ — o usuário já vem carregado pela autenticação."""
+    user = request.user
+
+    async def build_response():
+        return render(UserUpdateSerializer(user, context={'request': request}).data)
+
+    return await aconditional(request, profile_etag(request, user), None, build_response)
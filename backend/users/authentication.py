@@ -0,0 +1,154 @@
+# users/authentication.py
+"""
+Autenticação JWT com cache do usuário.
+
+O JWTAuthentication do simplejwt busca o User no banco a cada requisição.
+`CachedJWTAuthentication` valida o token igual (assinatura, expiração, tipo)
+e resolve o usuário pelo claim `user_id` num cache em memória do processo,
+pequeno (JWT_USER_CACHE_SIZE, LRU) e de vida curta (JWT_USER_CACHE_TTL).
+Edição de perfil, troca de senha e desativação invalidam a entrada
+(users/signals.py); em outros workers a entrada antiga vive no máximo o TTL.
+Os contadores desnormalizados e o fanout_on_read (atualizados via
+`.update()`, sem signals) não entram no cache: ficam adiados e, se lidos, vêm do banco; e um
+save() do usuário do cache não os sobrescreve com valores velhos.
+
+`AsyncJWTAuthentication` é a mesma coisa para as views async
+(twitter_clone/async_api.py): num miss, busca o usuário com o ORM async.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def cache_ttl():
+    return getattr(settings, 'JWT_USER_CACHE_TTL', 30)
+
+
+def cache_size():
+    return getattr(settings, 'JWT_USER_CACHE_SIZE', 10000)
+
+
+# Fora do cache (ver acima); o resto dos campos concretos vai para o snapshot
+UNCACHED_FIELDS = {'followers_count', 'following_count', 'tweets_count', 'fanout_on_read'}
+
+
+def cached_fields(model):
+    return [field.attname for field in model._meta.concrete_fields if field.attname not in UNCACHED_FIELDS]
+
+
+class UserCache:
+    """
+    LRU com TTL, thread-safe. Guarda os valores dos campos, não a instância:
+    cada requisição recebe um User próprio, que a view pode alterar e salvar.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, model, user_id):
+        # O simplejwt grava o claim como string; a chave é sempre str(id)
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, values = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return model.from_db(DEFAULT_DB_ALIAS, cached_fields(model), values)
+
+    def set(self, user):
+        ttl = cache_ttl()
+        if ttl <= 0:
+            return
+        key = str(getattr(user, api_settings.USER_ID_FIELD))
+        values = [getattr(user, name) for name in cached_fields(type(user))]
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > cache_size():
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """Drop-in para rest_framework_simplejwt.authentication.JWTAuthentication."""
+
+    def user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def check_user(self, user, validated_token):
+        """As mesmas checagens do simplejwt, valendo também para o usuário do cache."""
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+    def cached_user(self, validated_token):
+        user = user_cache.get(self.user_model, self.user_id(validated_token))
+        return self.check_user(user, validated_token) if user is not None else None
+
+    def _lookup(self, validated_token):
+        return {api_settings.USER_ID_FIELD: self.user_id(validated_token)}
+
+    def get_user(self, validated_token):
+        user = self.cached_user(validated_token)
+        if user is not None:
+            return user
+        try:
+            user = self.user_model.objects.get(**self._lookup(validated_token))
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+        user_cache.set(user)
+        return self.check_user(user, validated_token)
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    async def aauthenticate(self, request):
+        """(user, token) ou None se a requisição não traz um Bearer token."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user = self.cached_user(validated_token)
+        if user is not None:
+            return user
+        try:
+            user = await self.user_model.objects.aget(**self._lookup(validated_token))
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+        user_cache.set(user)
+        return self.check_user(user, validated_token)
@@ -0,0 +1,106 @@
+# users/avatars.py
+"""
+Pipeline local de avatares.
+
+No PATCH do perfil a imagem enviada é recortada em quadrado e salva em
+variantes WebP e JPEG de AVATAR_SIZES pixels (48 para as linhas do feed,
+96 para listas, 400 para o perfil), com nome derivado do conteúdo:
+`<hash>-<tamanho>.<ext>`. O mesmo arquivo nunca muda de conteúdo, então
+`serve_avatar` responde com cache "immutable" de um ano; trocar o avatar
+gera nomes novos. O User guarda só o hash (`avatar_hash`); as URLs são
+montadas a partir dele. Os serializers devolvem a WebP; o JPEG tem o mesmo
+nome com extensão .jpg, para clientes sem suporte a WebP.
+
+Usuários antigos, sem hash, continuam com a URL do campo `avatar` (Cloudinary
+ou MEDIA_ROOT).
+"""
+import hashlib
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404
+from django.views.decorators.http import require_GET
+from PIL import Image, ImageOps
+
+# Mudou o processamento (qualidade, recorte...)? Incrementar gera nomes novos
+PIPELINE_VERSION = b'1'
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+# Tamanho usado por cada tipo de tela
+FEED, LIST, PROFILE = 'feed', 'list', 'profile'
+NAME_RE = re.compile(r'^(?P<hash>[0-9a-f]{20})-(?P<size>\d+)\.(?P<ext>webp|jpg)$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def sizes():
+    return getattr(settings, 'AVATAR_SIZES', {FEED: 48, LIST: 96, PROFILE: 400})
+
+
+def storage():
+    return FileSystemStorage(location=settings.AVATAR_ROOT, base_url=settings.AVATAR_URL, allow_overwrite=True)
+
+
+def variant_name(digest, size, ext):
+    return f"{digest}-{size}.{ext}"
+
+
+def process_avatar(upload):
+    """Gera e grava as variantes de `upload` (arquivo enviado); devolve o hash do conteúdo."""
+    hasher = hashlib.sha256(PIPELINE_VERSION)
+    for chunk in upload.chunks():
+        hasher.update(chunk)
+    digest = hasher.hexdigest()[:20]
+
+    files = storage()
+    upload.seek(0)
+    with Image.open(upload) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        for size in sorted(set(sizes().values())):
+            square = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            for ext, (fmt, _, options) in FORMATS.items():
+                name = variant_name(digest, size, ext)
+                if files.exists(name):  # mesmo conteúdo já processado (nome = hash)
+                    continue
+                frame = square
+                if fmt == 'JPEG' and square.mode == 'RGBA':
+                    frame = Image.new('RGB', square.size, 'white')
+                    frame.paste(square, mask=square.getchannel('A'))
+                buffer = BytesIO()
+                frame.save(buffer, fmt, **options)
+                files.save(name, ContentFile(buffer.getvalue()))
+    return digest
+
+
+def variant_url(digest, kind=FEED, ext='webp'):
+    return storage().url(variant_name(digest, sizes()[kind], ext))
+
+
+def avatar_url(user, request=None, kind=FEED, ext='webp'):
+    """URL da variante de `user` para o tipo de tela `kind`, ou None sem avatar."""
+    if user.avatar_hash:
+        url = variant_url(user.avatar_hash, kind, ext)
+    elif user.avatar:
+        url = user.avatar.url
+    else:
+        return None
+    if url.startswith('/') and request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+@require_GET
+def serve_avatar(request, name):
+    """Serve uma variante com cache imutável (em produção, prefira o nginx servindo AVATAR_ROOT)."""
+    match = NAME_RE.match(name)
+    files = storage()
+    if match is None or not files.exists(name):
+        raise Http404
+    response = FileResponse(files.open(name), content_type=FORMATS[match['ext']][1])
+    response['Cache-Control'] = IMMUTABLE
+    return response
@@ -0,0 +1,65 @@
+# users/export.py
+"""
+Exportação do diretório de usuários em streaming (NDJSON ou CSV).
+
+Os usuários são lidos com `.iterator(chunk_size=...)` e as contagens de
+seguidores vêm na mesma linha do SELECT, então a memória fica constante
+independentemente do tamanho da base.
+"""
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+
+from tweets.models import count_subquery
+
+User = get_user_model()
+
+FIELDS = ['id', 'email', 'username', 'bio', 'followers_count', 'following_count']
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def iter_users(exact=False, chunk_size=2000):
+    """
+    Dicts prontos para exportar. Por padrão usa os contadores desnormalizados;
+    com `exact=True` recalcula as contagens com subqueries no mesmo SQL.
+    """
+    queryset = User.objects.order_by('pk')
+    if exact:
+        follows = User.followers.through.objects.all()
+        queryset = queryset.annotate(
+            n_followers=count_subquery(follows, 'from_user_id'),
+            n_following=count_subquery(follows, 'to_user_id'),
+        )
+        counts = ('n_followers', 'n_following')
+    else:
+        counts = ('followers_count', 'following_count')
+    rows = queryset.values_list('id', 'email', 'bio', *counts).iterator(chunk_size=chunk_size)
+    for pk, email, bio, followers, following in rows:
+        yield {
+            'id': pk,
+            'email': email,
+            'username': email.split('@')[0],
+            'bio': bio or '',
+            'followers_count': followers,
+            'following_count': following,
+        }
+
+
+class _Echo:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de guardar."""
+
+    def write(self, value):
+        return value
+
+
+def render(rows, output='ndjson'):
+    """Gera as linhas (str) no formato pedido."""
+    if output == 'csv':
+        writer = csv.DictWriter(_Echo(), fieldnames=FIELDS)
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
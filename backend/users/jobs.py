@@ -0,0 +1,9 @@
+# users/jobs.py
+from jobs.queue import register
+
+from .uploads import process_upload
+
+
+@register('avatars.process')
+def process_avatar_upload(upload_id):
+    process_upload(upload_id)
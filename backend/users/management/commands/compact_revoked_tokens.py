@@ -0,0 +1,15 @@
+# users/management/commands/compact_revoked_tokens.py
+from django.core.management.base import BaseCommand
+
+from users.revocation import COMPACT_BATCH_SIZE, revocation_store
+
+
+class Command(BaseCommand):
+    help = "Apaga as revogações de refresh tokens que já expiraram (rode periodicamente, ex.: cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=COMPACT_BATCH_SIZE, help="Linhas apagadas por transação.")
+
+    def handle(self, *args, batch_size, **options):
+        deleted = revocation_store.compact(batch_size=batch_size)
+        self.stdout.write(f"{deleted} revogações expiradas removidas.")
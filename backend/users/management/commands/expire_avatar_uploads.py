@@ -0,0 +1,15 @@
+# users/management/commands/expire_avatar_uploads.py
+from django.core.management.base import BaseCommand
+
+from users.uploads import EXPIRE_BATCH_SIZE, expire_stale
+
+
+class Command(BaseCommand):
+    help = "Apaga uploads de avatar abandonados no meio e seus arquivos parciais (rode periodicamente, ex.: cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EXPIRE_BATCH_SIZE, help="Uploads apagados por lote.")
+
+    def handle(self, *args, batch_size, **options):
+        deleted = expire_stale(batch_size=batch_size)
+        self.stdout.write(f"{deleted} uploads abandonados removidos.")
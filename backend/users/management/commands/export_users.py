@@ -0,0 +1,24 @@
+# users/management/commands/export_users.py
+from django.core.management.base import BaseCommand
+
+from users.export import FORMATS, iter_users, render
+
+
+class Command(BaseCommand):
+    help = "Exporta todos os usuários em NDJSON ou CSV, em streaming (memória constante)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=sorted(FORMATS), default='ndjson', help="Formato de saída.")
+        parser.add_argument('--file', help="Arquivo de destino (padrão: stdout).")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Linhas lidas por vez do banco.")
+        parser.add_argument('--exact', action='store_true', help="Recalcula as contagens em vez de usar os contadores.")
+
+    def handle(self, *args, output, file, chunk_size, exact, **options):
+        rows = render(iter_users(exact=exact, chunk_size=chunk_size), output)
+        if file:
+            with open(file, 'w', encoding='utf-8', newline='') as fh:
+                fh.writelines(rows)
+            self.stderr.write(f"Usuários exportados para {file}.")
+        else:
+            for line in rows:
+                self.stdout.write(line, ending='')
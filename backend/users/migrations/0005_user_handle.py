@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:40
+
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Left, Lower, StrIndex
+
+
+def populate_handles(apps, schema_editor):
+    """handle = parte local do email, em minúsculas (igual a users.models.email_handle)."""
+    User = apps.get_model('users', 'User')
+    User.objects.filter(email__contains='@').update(
+        handle=Lower(Left('email', StrIndex('email', Value('@')) - 1)),
+    )
+    User.objects.exclude(email__contains='@').update(handle=Lower(F('email')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0004_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='handle',
+            field=models.CharField(default='', editable=False, max_length=254),
+        ),
+        migrations.RunPython(populate_handles, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['handle'], name='user_handle_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Índices compostos no through table de follows para a paginação keyset
+    (WHERE from_user_id = X AND id < c ORDER BY id DESC) de users/pagination.py.
+    O through table é criado automaticamente pelo ManyToManyField, por isso SQL direto.
+    """
+
+    dependencies = [
+        ('users', '0005_user_handle'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX users_follow_followee_id_idx ON users_user_followers (from_user_id, id)',
+            'DROP INDEX users_follow_followee_id_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX users_follow_follower_id_idx ON users_user_followers (to_user_id, id)',
+            'DROP INDEX users_follow_follower_id_idx',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_celebrities(apps, schema_editor):
+    """Quem já está acima do limite pode ter tweets sem fan-out (igual a tweets.timeline.fan_out_tweet)."""
+    User = apps.get_model('users', 'User')
+    limit = getattr(settings, 'TIMELINE_FANOUT_FOLLOWER_LIMIT', 5000)
+    User.objects.filter(followers_count__gt=limit).update(fanout_on_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_avatarupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='fanout_on_read',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_celebrities, migrations.RunPython.noop),
+    ]
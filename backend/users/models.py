@@ -1,27 +1,91 @@
 # users/models.py
+import uuid
+
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.db import models
 from cloudinary.models import CloudinaryField
 from .managers import MyUserManager
 
+
+def email_handle(email):
+    """Handle exibido nos serializers: parte local do email (minúscula para o índice)."""
+    return (email or '').split('@')[0].lower()
+
+
 class User(AbstractUser):
     # Remove o username herdado
     username = None
     
     email = models.EmailField(unique=True)
+    # Derivado do email em save(); indexado para busca por prefixo (users/typeahead.py)
+    handle = models.CharField(max_length=254, default='', editable=False)
 
     bio = models.TextField(blank=True, null=True)
     avatar = CloudinaryField('avatar', blank=True, null=True, folder='avatars')
+    # Hash do avatar processado localmente (users/avatars.py); vazio = usa `avatar`
+    avatar_hash = models.CharField(max_length=20, blank=True, default='', editable=False)
 
     groups = models.ManyToManyField(Group, related_name='custom_user_groups', blank=True)
     user_permissions = models.ManyToManyField(Permission, related_name='custom_user_permissions', blank=True)
     followers = models.ManyToManyField('self', symmetrical=False, related_name='following', blank=True)
 
+    # Contadores desnormalizados (atualizados com F(); ver `manage.py repair_counters`)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+    tweets_count = models.PositiveIntegerField(default=0, editable=False)
+    # Tem tweets postados acima de TIMELINE_FANOUT_FOLLOWER_LIMIT, sem fan-out:
+    # continua sendo mesclado na leitura mesmo depois de voltar ao limite
+    fanout_on_read = models.BooleanField(default=False, editable=False)
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []  # sem username, sem first_name etc.,
 
     # Atribui o manager customizado
     objects = MyUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # varchar_pattern_ops: LIKE 'x%' usa o índice no PostgreSQL (ignorado no SQLite)
+            models.Index(fields=['handle'], name='user_handle_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
     def __str__(self):
         return self.email
+
+    def save(self, *args, **kwargs):
+        self.handle = email_handle(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'handle'}
+        super().save(*args, **kwargs)
+
+
+class RevokedToken(models.Model):
+    """Refresh tokens revogados (rotação, logout); ver users/revocation.py."""
+    jti = models.CharField(max_length=255, unique=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Depois disso o token já expirou sozinho e a linha pode ser apagada (compact_revoked_tokens)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+class AvatarUpload(models.Model):
+    """Upload de avatar em partes, processado em segundo plano (users/uploads.py)."""
+    UPLOADING, QUEUED, PROCESSING, DONE, FAILED = 'uploading', 'queued', 'processing', 'done', 'failed'
+    STATUS_CHOICES = [(s, s) for s in (UPLOADING, QUEUED, PROCESSING, DONE, FAILED)]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey('User', on_delete=models.CASCADE, related_name='avatar_uploads')
+    size = models.PositiveBigIntegerField()
+    # Bytes já gravados em disco; o próximo PATCH tem que começar aqui (Upload-Offset)
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=UPLOADING)
+    error = models.TextField(blank=True, default='')
+    avatar_hash = models.CharField(max_length=20, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}:{self.id} ({self.status})"
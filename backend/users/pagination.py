@@ -0,0 +1,44 @@
+# users/pagination.py
+from collections import OrderedDict
+
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from tweets.pagination import KeysetPagination, decode_parts, encode_parts
+
+
+class FollowPagination(KeysetPagination):
+    """
+    Keyset sobre o id da linha de follow (users_user_followers), mais recentes
+    primeiro. Usa os índices (from_user_id, id) / (to_user_id, id) da migration
+    0006_follow_keyset_indexes. Só anda para frente com `?before=<cursor>`.
+    """
+
+    def paginate_follows(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        before = request.query_params.get(self.before_query_param)
+        if before:
+            (pk,) = decode_parts(before, int)
+            queryset = queryset.filter(pk__lt=pk)
+
+        rows = list(queryset.order_by('-pk')[:self.page_size + 1])
+        self.has_older = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.page or not self.has_older:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.before_query_param, encode_parts(self.page[-1].pk))
+
+    def get_previous_link(self):
+        return None
+
+    def get_paginated_response(self, data, count=None):
+        return Response(OrderedDict([
+            ('count', count),
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
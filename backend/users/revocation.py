@@ -0,0 +1,163 @@
+# users/revocation.py
+"""
+Revogação de refresh tokens por `jti`, sem o app token_blacklist do simplejwt.
+
+Com ROTATE_REFRESH_TOKENS + BLACKLIST_AFTER_ROTATION, o /token/refresh/
+revoga o refresh usado (RevocableRefreshToken.blacklist) e recusa tokens
+revogados (verify). Os revogados ficam em `RevokedToken` até expirarem;
+`manage.py compact_revoked_tokens` (cron) apaga os vencidos.
+
+Cada processo mantém um filtro de Bloom com os jtis da tabela: se o jti não
+está no filtro, o token com certeza não foi revogado e o banco não é
+consultado (o caso comum). Só um "talvez" do filtro confirma na tabela. O
+filtro puxa as revogações novas dos outros workers a cada
+JWT_REVOCATION_SYNC_SECONDS (uma query por processo, não por requisição) e é
+reconstruído a cada JWT_REVOCATION_REBUILD_SECONDS, descartando os jtis já
+compactados.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import RevokedToken
+
+COMPACT_BATCH_SIZE = 1000
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class BloomFilter:
+    """Filtro de Bloom em bytearray, com k posições por double hashing (blake2b)."""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        # `count` estima as chaves distintas: reinserir um jti (a margem do
+        # _sync relê os mesmos a cada sincronização) não acende bit novo
+        new = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                new = True
+        self.count += new
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class RevocationStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._since = None
+        self._synced_at = 0.0
+        self._built_at = 0.0
+
+    def _new_bloom(self):
+        return BloomFilter(
+            _setting('JWT_REVOCATION_BLOOM_CAPACITY', 100_000),
+            _setting('JWT_REVOCATION_BLOOM_ERROR_RATE', 0.001),
+        )
+
+    def _sync(self):
+        """Traz para o filtro os jtis revogados desde a última sincronização."""
+        now = time.monotonic()
+        rebuild = (
+            self._bloom is None
+            or now - self._built_at >= _setting('JWT_REVOCATION_REBUILD_SECONDS', 3600)
+            or self._bloom.count > _setting('JWT_REVOCATION_BLOOM_CAPACITY', 100_000)
+        )
+        if not rebuild and now - self._synced_at < _setting('JWT_REVOCATION_SYNC_SECONDS', 1):
+            return
+        started = timezone.now()
+        if rebuild:
+            bloom = self._new_bloom()
+            rows = RevokedToken.objects.filter(expires_at__gt=started)
+        else:
+            # Relê uma margem: uma transação mais lenta pode gravar um revoked_at
+            # anterior à última sincronização (ids também não chegam em ordem)
+            bloom = self._bloom
+            rows = RevokedToken.objects.filter(revoked_at__gte=self._since - SYNC_OVERLAP)
+        for jti in rows.values_list('jti', flat=True).iterator():
+            bloom.add(jti)
+        self._bloom, self._since, self._synced_at = bloom, started, now
+        if rebuild:
+            self._built_at = now
+
+    def is_revoked(self, jti):
+        with self._lock:
+            self._sync()
+            maybe = jti in self._bloom
+        # Falso positivo do filtro (ou jti já compactado): a tabela decide
+        return maybe and RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, jti, expires_at):
+        """Revoga `jti`; False se já estava revogado (a constraint unique decide corridas)."""
+        _, created = RevokedToken.objects.get_or_create(jti=jti, defaults={'expires_at': expires_at})
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+        return created
+
+    def compact(self, batch_size=COMPACT_BATCH_SIZE):
+        """Apaga, em lotes, as revogações de tokens já expirados. Retorna quantas."""
+        deleted = 0
+        now = timezone.now()
+        while True:
+            ids = list(RevokedToken.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            with transaction.atomic():
+                deleted += RevokedToken.objects.filter(id__in=ids).delete()[0]
+
+    def reset(self):
+        with self._lock:
+            self._bloom = None
+
+
+revocation_store = RevocationStore()
+
+
+class RevocableRefreshToken(RefreshToken):
+    """RefreshToken que consulta/grava o revocation_store no lugar do token_blacklist."""
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+        if revocation_store.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        # Dois refresh simultâneos com o mesmo token: só um leva o token novo
+        if not revocation_store.revoke(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload['exp'])):
+            raise TokenError(_("Token is blacklisted"))
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RevocableRefreshToken
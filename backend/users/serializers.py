@@ -4,9 +4,22 @@ from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from .avatars import LIST, PROFILE, avatar_url
+from .uploads import create_from_file, max_bytes
+
 User = get_user_model()
 
 
+def absolute_avatar_url(user, request, kind):
+    """URL da variante `kind`; sem request, completa com BACKEND_URL."""
+    url = avatar_url(user, request, kind)
+    if url is None or request is not None or not url.startswith('/'):
+        return url
+    from django.conf import settings
+    base_url = getattr(settings, 'BACKEND_URL', 'https://twitter-b01m.onrender.com')
+    return f"{base_url}{url}"
+
+
 class UserCreateSerializer(serializers.ModelSerializer):
     """
     Serializador para criar um novo usuário.
@@ -56,22 +69,12 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'email', 'bio', 'avatar', 'avatar_url']
     
     def get_avatar_url(self, obj):
-        if obj.avatar:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.avatar.url)
-            # Fallback: construir URL completa usando settings
-            from django.conf import settings
-            if hasattr(settings, 'BACKEND_URL'):
-                base_url = settings.BACKEND_URL
-            else:
-                base_url = 'https://twitter-b01m.onrender.com'
-            return f"{base_url}{obj.avatar.url}"
-        return None
+        return absolute_avatar_url(obj, self.context.get('request'), LIST)
 
 class UserUpdateSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
-    avatar = serializers.ImageField(required=False)
+    # FileField: o Pillow decodifica/valida no worker (users/uploads.py), fora da requisição
+    avatar = serializers.FileField(required=False)
     avatar_url = serializers.SerializerMethodField()
 
     class Meta:
@@ -80,26 +83,28 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         read_only_fields = ['avatar_url']
     
     def get_avatar_url(self, obj):
-        if obj.avatar:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.avatar.url)
-            # Fallback: construir URL completa usando settings
-            from django.conf import settings
-            if hasattr(settings, 'BACKEND_URL'):
-                base_url = settings.BACKEND_URL
-            else:
-                base_url = 'https://twitter-b01m.onrender.com'
-            return f"{base_url}{obj.avatar.url}"
-        return None
+        return absolute_avatar_url(obj, self.context.get('request'), PROFILE)
+
+    def validate_avatar(self, value):
+        if value.size > max_bytes():
+            raise serializers.ValidationError(f"Avatar maior que {max_bytes()} bytes.")
+        return value
 
     def update(self, instance, validated_data):
         password = validated_data.pop('password', None)
+        upload = validated_data.pop('avatar', None)
+        if upload is not None:
+            # Variantes locais geradas em segundo plano; a view responde 202
+            self.avatar_upload = create_from_file(instance, upload)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
+        update_fields = list(validated_data)
         if password:
             instance.set_password(password)
-        instance.save()
+            update_fields.append('password')
+        # Só o que veio na requisição: os contadores são mantidos com F() em outras linhas
+        if update_fields:
+            instance.save(update_fields=update_fields)
         return instance
 
 
@@ -0,0 +1,22 @@
+# users/signals.py
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import user_cache
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, update_fields=None, **kwargs):
+    """Perfil, senha ou is_active mudaram: a próxima requisição relê o usuário do banco."""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    user_id = getattr(instance, api_settings.USER_ID_FIELD)
+    user_cache.invalidate(user_id)
+    # De novo após o commit: uma requisição concorrente pode ter recarregado a versão antiga
+    transaction.on_commit(lambda: user_cache.invalidate(user_id))
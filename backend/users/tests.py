@@ -1,7 +1,28 @@
-from django.test import TestCase
+import csv
+import json
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from users.models import User
+from rest_framework_simplejwt.tokens import RefreshToken
+from PIL import Image
+from tweets.models import Tweet
+from users.authentication import user_cache
+from users import uploads
+from users.models import AvatarUpload, RevokedToken, User
+from users.revocation import BloomFilter, revocation_store
+from users.typeahead import reset_trie
+from twitter_clone import throttling
 
 
 class UserAPITest(TestCase):
@@ -34,3 +55,392 @@ class UserAPITest(TestCase):
         }
         response = self.client.post('/api/users/', data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class UserTypeaheadTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="me@example.com", password="password123")
+        self.client.force_authenticate(self.user)
+        self.ana = User.objects.create_user(email="Ana.Silva@example.com", password="x")
+        self.anabel = User.objects.create_user(email="anabel@other.com", password="x")
+        User.objects.create_user(email="bruna@example.com", password="x")
+        self.ana.followers.add(self.user)
+
+    def typeahead(self, query):
+        response = self.client.get('/api/users/search/', {"q": query, "mode": "typeahead"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()["results"]
+
+    def test_prefix_match_on_handle_with_follow_state(self):
+        self.assertEqual(self.ana.handle, "ana.silva")
+        results = self.typeahead("AN")
+        self.assertEqual([r["id"] for r in results], [self.ana.id, self.anabel.id])
+        self.assertEqual([r["is_following"] for r in results], [True, False])
+        self.assertEqual(self.typeahead("example"), [])
+
+    def test_follow_state_resolved_in_one_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.typeahead("an")
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    @override_settings(USER_TYPEAHEAD_TRIE=True)
+    def test_trie_mode_matches_database_mode(self):
+        reset_trie()
+        try:
+            self.assertEqual([r["id"] for r in self.typeahead("ana")], [self.ana.id, self.anabel.id])
+            self.assertEqual([r["id"] for r in self.typeahead("anab")], [self.anabel.id])
+        finally:
+            reset_trie()
+
+
+class FollowListTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.star = User.objects.create_user(email="star@example.com", password="password123")
+        self.fans = [User.objects.create_user(email=f"fan{i}@example.com", password="x") for i in range(5)]
+        for fan in self.fans:
+            self.client.force_authenticate(fan)
+            self.client.post(f'/api/users/toggle-follow/{self.star.id}/')
+
+    def test_followers_are_keyset_paginated_newest_first(self):
+        first = self.client.get(f'/api/users/{self.star.id}/followers/?page_size=3').json()
+        self.assertEqual(first["count"], 5)
+        self.assertEqual([u["username"] for u in first["results"]], ["fan4", "fan3", "fan2"])
+        rest = self.client.get(first["next"]).json()
+        self.assertEqual([u["username"] for u in rest["results"]], ["fan1", "fan0"])
+        self.assertIsNone(rest["next"])
+
+    def test_following_for_any_user(self):
+        data = self.client.get(f'/api/users/{self.fans[0].id}/following/').json()
+        self.assertEqual((data["count"], [u["id"] for u in data["results"]]), (1, [self.star.id]))
+
+    def test_ndjson_stream(self):
+        response = self.client.get(f'/api/users/{self.star.id}/followers/?stream=ndjson')
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])["username"], "fan4")
+
+
+class UserExportTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(email="admin@example.com", password="password123")
+        self.fan = User.objects.create_user(email="fan@example.com", password="x", bio="oi, tudo bem?")
+        self.admin.followers.add(self.fan)  # fora do toggle_follow: contadores defasados
+
+    def test_export_requires_admin(self):
+        self.client.force_authenticate(self.fan)
+        self.assertEqual(self.client.get('/api/users/export/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_ndjson_with_exact_counts(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/users/export/?exact=1')
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(r["username"], r["followers_count"], r["following_count"]) for r in rows],
+                         [("admin", 1, 0), ("fan", 0, 1)])
+
+    def test_csv_command(self):
+        out = StringIO()
+        call_command('export_users', output='csv', stdout=out)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual([r["email"] for r in rows], ["admin@example.com", "fan@example.com"])
+        self.assertEqual(rows[1]["bio"], "oi, tudo bem?")
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(email="cached@example.com", password="password123")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def user_lookups(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/users/profile/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [q for q in ctx.captured_queries if 'FROM "users_user"' in q['sql']]
+
+    def test_second_request_skips_user_query(self):
+        self.assertEqual(len(self.user_lookups()), 1)
+        self.assertEqual(self.user_lookups(), [])
+
+    @override_settings(JWT_USER_CACHE_TTL=0)
+    def test_ttl_zero_disables_cache(self):
+        self.user_lookups()
+        self.assertEqual(len(self.user_lookups()), 1)
+
+    def test_profile_update_and_password_change_invalidate(self):
+        self.user_lookups()
+        self.client.patch('/api/users/profile/', {'bio': 'nova bio'}, format='json')
+        self.assertEqual(self.client.get('/api/users/profile/').json()['bio'], 'nova bio')
+
+        self.client.patch('/api/users/profile/', {'password': 'outrasenha123'}, format='json')
+        self.assertIsNone(user_cache.get(User, self.user.pk))
+
+    def test_profile_update_keeps_counters_changed_after_caching(self):
+        self.user_lookups()
+        fan = User.objects.create_user(email="fan-of-cached@example.com", password="password123")
+        fan_client = APIClient()
+        fan_client.force_authenticate(fan)
+        fan_client.post(f'/api/users/toggle-follow/{self.user.pk}/')
+        self.client.patch('/api/users/profile/', {'first_name': 'Ann'}, format='json')
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.first_name, self.user.followers_count), ('Ann', 1))
+
+    def test_deactivation_takes_effect_immediately(self):
+        self.user_lookups()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(JWT_REVOCATION_SYNC_SECONDS=3600)
+class RevocationStoreTest(TestCase):
+    def setUp(self):
+        revocation_store.reset()
+        User.objects.create_user(email="rotate@example.com", password="password123")
+        self.refresh = self.client.post(
+            '/api/token/', {'email': "rotate@example.com", 'password': "password123"},
+        ).json()['refresh']
+
+    def test_rotated_refresh_token_is_rejected(self):
+        response = self.client.post('/api/token/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rotated = response.json()['refresh']
+
+        reused = self.client.post('/api/token/refresh/', {'refresh': self.refresh})
+        self.assertEqual(reused.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': rotated}).status_code, status.HTTP_200_OK)
+
+    def test_unrevoked_check_skips_database(self):
+        revocation_store.is_revoked('warm-up')  # primeira carga do filtro
+        with self.assertNumQueries(0):
+            self.assertFalse(revocation_store.is_revoked('never-revoked'))
+
+    def test_revocations_from_other_workers_are_synced(self):
+        revocation_store.is_revoked('warm-up')
+        # Outro processo revogou: a linha existe, mas o filtro local ainda não sabe
+        RevokedToken.objects.create(jti='elsewhere', expires_at=timezone.now() + timedelta(hours=1))
+        self.assertFalse(revocation_store.is_revoked('elsewhere'))
+        with override_settings(JWT_REVOCATION_SYNC_SECONDS=0):
+            self.assertTrue(revocation_store.is_revoked('elsewhere'))
+
+    def test_resync_does_not_inflate_bloom_count(self):
+        expires_at = timezone.now() + timedelta(hours=1)
+        RevokedToken.objects.bulk_create(RevokedToken(jti=f'jti-{i}', expires_at=expires_at) for i in range(5))
+        with override_settings(JWT_REVOCATION_SYNC_SECONDS=0):
+            for _ in range(10):
+                revocation_store.is_revoked('warm-up')
+        self.assertEqual(revocation_store._bloom.count, 5)
+
+    def test_compaction_removes_expired_entries(self):
+        now = timezone.now()
+        RevokedToken.objects.create(jti='old', expires_at=now - timedelta(minutes=1))
+        RevokedToken.objects.create(jti='live', expires_at=now + timedelta(hours=1))
+        out = StringIO()
+        call_command('compact_revoked_tokens', batch_size=1, stdout=out)
+        self.assertIn("1 revogações", out.getvalue())
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['live'])
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        keys = [f"jti-{i}" for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class RateLimitTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(override_settings(
+            RATE_LIMIT_ENABLED=True,
+            RATE_LIMIT_SQLITE_PATH=str(Path(tmp.name) / 'ratelimit.sqlite3'),
+            RATE_LIMITS={'login': {'ip': '3/min', 'user': '2/min'}, 'follow': {'user': '1/hour'}},
+        ))
+        self.user = User.objects.create_user(email="limited@example.com", password="password123")
+
+    def login(self, email, address='10.0.0.1'):
+        return self.client.post('/api/token/', {'email': email, 'password': 'wrong'}, REMOTE_ADDR=address)
+
+    def test_login_limited_per_account_and_per_ip(self):
+        self.assertEqual([self.login("limited@example.com").status_code for _ in range(2)], [401, 401])
+        blocked = self.login("limited@example.com", address='10.0.0.2')  # outro IP, mesma conta
+        self.assertEqual(blocked.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreaterEqual(int(blocked['Retry-After']), 1)
+
+        self.assertEqual(self.login("other@example.com").status_code, 401)
+        self.assertEqual(self.login("third@example.com").status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.login("fourth@example.com", address='10.0.0.3').status_code, 401)
+
+    def test_forwarded_for_does_not_pick_the_bucket(self):
+        for i, email in enumerate(["a@example.com", "b@example.com", "c@example.com"]):
+            self.client.post('/api/token/', {'email': email, 'password': 'x'}, HTTP_X_FORWARDED_FOR=f'1.2.3.{i}')
+        response = self.client.post('/api/token/', {'email': "d@example.com", 'password': 'x'},
+                                    HTTP_X_FORWARDED_FOR='1.2.3.99')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # Atrás de um proxy: vale o endereço que ele acrescentou ao header
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            response = self.client.post('/api/token/', {'email': "e@example.com", 'password': 'x'},
+                                        HTTP_X_FORWARDED_FOR='6.6.6.6, 10.9.9.9')
+        self.assertEqual(response.status_code, 401)
+
+    def test_write_endpoint_limited_per_user(self):
+        other = User.objects.create_user(email="followed@example.com", password="password123")
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        self.assertEqual(client.post(f'/api/users/toggle-follow/{other.id}/').status_code, 200)
+        response = client.post(f'/api/users/toggle-follow/{other.id}/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 3000)
+
+    def test_bucket_refills(self):
+        store = throttling.get_store()
+        self.assertIsInstance(store, throttling.SQLiteBucketStore)
+        self.assertEqual(store.take('k', 1, 1000.0)[0], True)
+        allowed, wait = store.take('k', 1, 1000.0)
+        if not allowed:  # a recarga é de 1 ficha/ms: pode já ter voltado
+            self.assertLessEqual(wait, 0.001)
+
+    def test_cache_store(self):
+        with override_settings(RATE_LIMIT_STORE='cache'):
+            self.assertIsInstance(throttling.get_store(), throttling.CacheBucketStore)
+            self.assertEqual(self.login("limited@example.com").status_code, 401)
+            self.assertEqual(self.login("limited@example.com").status_code, 401)
+            self.assertEqual(self.login("limited@example.com").status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+def png_upload(size=(640, 480), color=(200, 30, 30, 255)):
+    buffer = BytesIO()
+    Image.new('RGBA', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile('avatar.png', buffer.getvalue(), content_type='image/png')
+
+
+class AvatarPipelineTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name) / 'avatars'
+        self.parts = Path(tmp.name) / 'uploads'
+        # AVATAR_WORKERS=0: processa no on_commit, na thread do teste
+        self.enterContext(override_settings(AVATAR_ROOT=str(self.root), AVATAR_UPLOAD_DIR=str(self.parts), AVATAR_WORKERS=0))
+        self.user = User.objects.create_user(email="pic@example.com", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/api/users/profile/', {'avatar': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        return response
+
+    def test_patch_generates_hashed_variants(self):
+        response = self.upload(png_upload())
+        self.user.refresh_from_db()
+        digest = self.user.avatar_hash
+        self.assertRegex(digest, r'^[0-9a-f]{20}$')
+        names = sorted(p.name for p in self.root.iterdir())
+        self.assertEqual(names, sorted(f"{digest}-{size}.{ext}" for size in (48, 96, 400) for ext in ('jpg', 'webp')))
+        with Image.open(self.root / f"{digest}-48.jpg") as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (48, 48)))
+        status_url = response.json()['avatar_upload']['status_url']
+        self.assertEqual(response['Location'], status_url)
+        done = self.client.get(status_url).json()
+        self.assertEqual(done['status'], 'done')
+        self.assertTrue(done['avatar_url'].endswith(f"/media/avatars/{digest}-400.webp"))
+        self.assertEqual(list(self.parts.iterdir()), [])
+
+        # Mesmo conteúdo, mesmo nome; conteúdo novo, nomes novos
+        self.upload(png_upload())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_hash, digest)
+        self.upload(png_upload(color=(0, 0, 255, 255)))
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.avatar_hash, digest)
+
+    def test_feed_uses_small_variant_served_immutable(self):
+        self.upload(png_upload())
+        self.user.refresh_from_db()
+        Tweet.objects.create(author=self.user, content="com avatar")
+        row = self.client.get('/api/tweets/').json()['results'][0]
+        self.assertTrue(row['avatar_url'].endswith(f"{self.user.avatar_hash}-48.webp"))
+
+        response = self.client.get(f"/media/avatars/{self.user.avatar_hash}-48.webp")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get('/media/avatars/../settings.py').status_code, 404)
+
+    def test_chunked_upload_resumes_from_offset(self):
+        body = png_upload().read()
+        response = self.client.post('/api/users/avatar/uploads/', {'size': len(body)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        url = response['Location']
+
+        def send(offset, chunk):
+            return self.client.generic('PATCH', url, chunk, content_type='application/offset+octet-stream',
+                                       HTTP_UPLOAD_OFFSET=str(offset))
+
+        half = len(body) // 2
+        self.assertEqual(send(0, body[:half]).status_code, status.HTTP_204_NO_CONTENT)
+        # Cliente reenvia a partir do offset errado: 409 com o offset certo
+        conflict = send(0, body)
+        self.assertEqual(conflict.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(conflict['Upload-Offset'], str(half))
+        self.assertEqual(self.client.head(url)['Upload-Offset'], str(half))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = send(half, body[half:])
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.json()['status'], 'queued')
+        self.assertEqual(self.client.get(url).json()['status'], 'done')
+        self.user.refresh_from_db()
+        self.assertRegex(self.user.avatar_hash, r'^[0-9a-f]{20}$')
+
+    def test_upload_discarded_while_queued_is_skipped(self):
+        upload = AvatarUpload.objects.create(user=self.user, size=1, offset=1, status=AvatarUpload.QUEUED)
+        pk = upload.pk
+        uploads.discard(upload)
+        uploads.process_upload(pk)  # o job/thread do pool roda depois do DELETE
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_hash, '')
+
+    def test_abandoned_uploads_expire_with_their_parts(self):
+        response = self.client.post('/api/users/avatar/uploads/', {'size': 10}, format='json')
+        url = response['Location']
+        self.client.generic('PATCH', url, b'12345', content_type='application/offset+octet-stream',
+                            HTTP_UPLOAD_OFFSET='0')
+        abandoned = AvatarUpload.objects.get()
+        recent = AvatarUpload.objects.create(user=self.user, size=10)
+        uploads.part_path(recent).write_bytes(b'12')
+        AvatarUpload.objects.filter(pk=abandoned.pk).update(updated_at=timezone.now() - timedelta(days=2))
+
+        out = StringIO()
+        call_command('expire_avatar_uploads', stdout=out)
+        self.assertIn("1 uploads abandonados", out.getvalue())
+        self.assertEqual(list(AvatarUpload.objects.values_list('pk', flat=True)), [recent.pk])
+        self.assertEqual([p.name for p in self.parts.iterdir()], [f"{recent.pk}.part"])
+        self.assertEqual(self.client.head(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_image_fails_and_limits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/api/users/profile/',
+                                         {'avatar': SimpleUploadedFile('a.png', b'not an image')}, format='multipart')
+        failed = self.client.get(response['Location']).json()
+        self.assertEqual(failed['status'], 'failed')
+        self.assertIn('error', failed)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_hash, '')
+
+        with override_settings(AVATAR_UPLOAD_MAX_BYTES=10):
+            response = self.client.post('/api/users/avatar/uploads/', {'size': 11}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        other = User.objects.create_user(email="other@example.com", password="password123")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(failed['status_url']).status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,107 @@
+# users/typeahead.py
+"""
+Typeahead de usuários por prefixo do handle (parte local do email).
+
+A busca padrão usa o índice `user_handle_prefix_idx`. Com USER_TYPEAHEAD_TRIE
+ligado, um trie em memória (reconstruído a cada USER_TYPEAHEAD_TRIE_TTL
+segundos) resolve o prefixo sem ir ao banco; o banco só carrega as linhas
+encontradas.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+
+from .models import email_handle
+
+User = get_user_model()
+
+
+def prefix_filter(prefix):
+    """
+    Q que casa handles começando com `prefix` usando o índice.
+    No SQLite, LIKE é case-insensitive e ignora o índice; um range
+    [prefix, prefix+1) na collation BINARY usa.
+    """
+    if connection.vendor == 'sqlite':
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return Q(handle__gte=prefix, handle__lt=upper)
+    return Q(handle__startswith=prefix)
+
+
+class HandleTrie:
+    """Trie de handles; cada nó guarda até `width` ids (em ordem alfabética do handle)."""
+
+    def __init__(self, width=10):
+        self.width = width
+        self.root = {}
+        self.built_at = 0.0
+
+    @classmethod
+    def build(cls, rows, width=10):
+        trie = cls(width)
+        for pk, handle in rows:  # `rows` já vem ordenado por handle
+            node = trie.root
+            for char in handle:
+                node = node.setdefault(char, {})
+                ids = node.setdefault('', [])
+                if len(ids) < width:
+                    ids.append(pk)
+        trie.built_at = time.monotonic()
+        return trie
+
+    def lookup(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        return list(node.get('', []))
+
+
+_trie = None
+_trie_lock = threading.Lock()
+
+
+def trie_enabled():
+    return getattr(settings, 'USER_TYPEAHEAD_TRIE', False)
+
+
+def get_trie(width):
+    """Trie do processo, reconstruído quando passa do TTL (só uma thread reconstrói)."""
+    global _trie
+    ttl = getattr(settings, 'USER_TYPEAHEAD_TRIE_TTL', 300)
+    trie = _trie
+    if trie is not None and trie.width >= width and time.monotonic() - trie.built_at < ttl:
+        return trie
+    if not _trie_lock.acquire(blocking=trie is None):
+        return trie  # outra thread está reconstruindo: usa o trie antigo
+    try:
+        if _trie is not trie:
+            return _trie  # reconstruído enquanto esperávamos o lock
+        rows = User.objects.filter(is_active=True).order_by('handle', 'pk').values_list('pk', 'handle')
+        _trie = HandleTrie.build(rows.iterator(chunk_size=5000), width=max(width, 10))
+        return _trie
+    finally:
+        _trie_lock.release()
+
+
+def reset_trie():
+    global _trie
+    _trie = None
+
+
+def typeahead_users(query, limit=10, exclude_id=None):
+    """Queryset (sem fatiar) de usuários cujo handle começa com `query`, ordenado por handle."""
+    prefix = email_handle(query.strip().lstrip('@'))
+    if not prefix:
+        return User.objects.none()
+    if trie_enabled():
+        ids = [pk for pk in get_trie(limit + 1).lookup(prefix) if pk != exclude_id]
+        queryset = User.objects.filter(pk__in=ids[:limit])
+    else:
+        queryset = User.objects.filter(prefix_filter(prefix), is_active=True).exclude(pk=exclude_id)
+    return queryset.order_by('handle', 'pk')
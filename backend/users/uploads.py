@@ -0,0 +1,197 @@
+# users/uploads.py
+"""
+Upload de avatar em partes (retomável), processado fora da requisição.
+
+Fluxo (no estilo do protocolo tus):
+
+    POST  /api/users/avatar/uploads/            {"size": N}  -> 201, Location
+    PATCH /api/users/avatar/uploads/<id>/       Upload-Offset: k + bytes -> 204 (ou 202 no fim)
+    HEAD  /api/users/avatar/uploads/<id>/       -> Upload-Offset atual, para retomar
+    GET   /api/users/avatar/uploads/<id>/       -> status (queued, processing, done, failed)
+
+Cada parte vai do socket direto para o arquivo `<id>.part` em
+AVATAR_UPLOAD_DIR, em blocos de CHUNK_SIZE: nada é bufferizado inteiro na
+memória. Com o arquivo completo, a decodificação, validação e geração das
+variantes (users/avatars.py) rodam num pool de threads local
+(AVATAR_WORKERS por processo) e a requisição devolve 202 na hora.
+AVATAR_WORKERS=0 processa na própria thread (testes). Com a fila de jobs
+ativa (JOBS_EAGER=0), o processamento vira o job `avatars.process`
+(users/jobs.py): sobrevive a restarts e tem retry, mas o worker precisa
+enxergar o mesmo AVATAR_UPLOAD_DIR.
+
+Uploads abandonados no meio (status uploading, sem PATCH há mais de
+AVATAR_UPLOAD_EXPIRE_HOURS) são apagados, com o `.part`, por
+`manage.py expire_avatar_uploads` (cron).
+"""
+import fcntl
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from jobs import queue as jobs
+
+from .avatars import process_avatar
+from .models import AvatarUpload
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# queued/processing parado há mais que isso: o processo que ia tratar morreu
+STALE_AFTER = timedelta(minutes=5)
+EXPIRE_BATCH_SIZE = 500
+
+
+class OffsetMismatch(Exception):
+    def __init__(self, offset):
+        super().__init__(f"Upload-Offset esperado: {offset}")
+        self.offset = offset
+
+
+def upload_dir():
+    path = Path(getattr(settings, 'AVATAR_UPLOAD_DIR', settings.BASE_DIR / 'media' / 'uploads'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def part_path(upload):
+    return upload_dir() / f"{upload.pk}.part"
+
+
+def max_bytes():
+    return getattr(settings, 'AVATAR_UPLOAD_MAX_BYTES', 10 * 1024 * 1024)
+
+
+def expire_after():
+    return timedelta(hours=getattr(settings, 'AVATAR_UPLOAD_EXPIRE_HOURS', 24))
+
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Grava `length` bytes de `stream` a partir de `offset` e devolve o upload
+    atualizado. O lock no arquivo serializa PATCHes concorrentes do mesmo upload.
+    """
+    with open(part_path(upload), 'ab+') as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        upload.refresh_from_db(fields=['offset', 'status'])
+        if upload.status != AvatarUpload.UPLOADING or offset != upload.offset:
+            raise OffsetMismatch(upload.offset)
+        fh.truncate(offset)  # descarta o resto de uma parte anterior interrompida
+        remaining = length
+        while remaining:
+            data = stream.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                break  # cliente caiu: o que chegou vale, ele retoma pelo HEAD
+            fh.write(data)
+            remaining -= len(data)
+        fh.flush()
+        upload.offset = offset + length - remaining
+        AvatarUpload.objects.filter(pk=upload.pk).update(offset=upload.offset, updated_at=timezone.now())
+    if upload.offset == upload.size:
+        enqueue(upload)
+    return upload
+
+
+def create_from_file(user, uploaded_file):
+    """Upload completo vindo do multipart do PATCH /profile/: copia para o disco e enfileira."""
+    upload = AvatarUpload.objects.create(user=user, size=uploaded_file.size, offset=uploaded_file.size)
+    with open(part_path(upload), 'wb') as fh:
+        for chunk in uploaded_file.chunks(CHUNK_SIZE):
+            fh.write(chunk)
+    enqueue(upload)
+    return upload
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'AVATAR_WORKERS', 2), thread_name_prefix='avatar',
+            )
+        return _executor
+
+
+def enqueue(upload):
+    AvatarUpload.objects.filter(pk=upload.pk).update(status=AvatarUpload.QUEUED, updated_at=timezone.now())
+    upload.status = AvatarUpload.QUEUED
+    if not jobs.eager():
+        jobs.enqueue('avatars.process', {'upload_id': str(upload.pk)}, key=f'avatar:{upload.pk}')
+    elif getattr(settings, 'AVATAR_WORKERS', 2) == 0:
+        transaction.on_commit(lambda: process_upload(upload.pk))
+    else:
+        # Depois do commit: a thread do pool usa outra conexão e precisa ver a linha
+        transaction.on_commit(lambda: executor().submit(_run, upload.pk))
+
+
+def requeue_if_stale(upload):
+    """Reenfileira um upload que ficou parado (o processo que o tratava reiniciou)."""
+    active = (AvatarUpload.QUEUED, AvatarUpload.PROCESSING)
+    if upload.status in active and timezone.now() - upload.updated_at > STALE_AFTER:
+        logger.warning("Avatar upload %s parado em %s; reenfileirando", upload.pk, upload.status)
+        enqueue(upload)
+
+
+def _run(upload_id):
+    try:
+        process_upload(upload_id)
+    finally:
+        close_old_connections()
+
+
+def process_upload(upload_id):
+    upload = AvatarUpload.objects.select_related('user').filter(pk=upload_id).first()
+    if upload is None:
+        return  # cancelado (DELETE) enquanto esperava na fila
+    if upload.status in (AvatarUpload.DONE, AvatarUpload.FAILED):
+        return  # reenfileirado por requeue_if_stale, mas o primeiro terminou
+    AvatarUpload.objects.filter(pk=upload_id).update(status=AvatarUpload.PROCESSING, updated_at=timezone.now())
+    path = part_path(upload)
+    try:
+        with open(path, 'rb') as fh:
+            digest = process_avatar(File(fh, name=path.name))
+    except Exception as exc:  # imagem inválida/corrompida, formato não suportado...
+        logger.info("Avatar upload %s falhou: %s", upload_id, exc)
+        AvatarUpload.objects.filter(pk=upload_id).update(
+            status=AvatarUpload.FAILED, error=f"Imagem inválida: {exc}", updated_at=timezone.now(),
+        )
+    else:
+        user = upload.user
+        user.avatar_hash = digest
+        user.save(update_fields=['avatar_hash'])  # signals: cache do JWT e das timelines
+        AvatarUpload.objects.filter(pk=upload_id).update(
+            status=AvatarUpload.DONE, avatar_hash=digest, updated_at=timezone.now(),
+        )
+    path.unlink(missing_ok=True)
+
+
+def discard(upload):
+    part_path(upload).unlink(missing_ok=True)
+    upload.delete()
+
+
+def expire_stale(batch_size=EXPIRE_BATCH_SIZE):
+    """Apaga os uploads abandonados no meio e seus arquivos parciais. Retorna quantos."""
+    cutoff = timezone.now() - expire_after()
+    deleted = 0
+    while True:
+        stale = AvatarUpload.objects.filter(status=AvatarUpload.UPLOADING, updated_at__lt=cutoff)
+        ids = list(stale.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        # Refaz o filtro no DELETE: um PATCH que chegou agora renovou updated_at e fica
+        deleted += stale.filter(pk__in=ids).delete()[0]
+        kept = set(AvatarUpload.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        for pk in ids:
+            if pk not in kept:
+                (upload_dir() / f"{pk}.part").unlink(missing_ok=True)
@@ -11,7 +11,9 @@ from .views import (
     toggle_follow,
     followers_following,
     search_users,
-    list_all_users
+    export_users,
+    avatar_uploads,
+    avatar_upload,
 )
 
 router = routers.SimpleRouter()
@@ -20,12 +22,15 @@ router.register('', UserViewSet, basename='users')
 urlpatterns = [
     path('signup/', signup, name='signup'),
     path('profile/', profile, name='profile'),
+    path('avatar/uploads/', avatar_uploads, name='avatar-uploads'),
+    path('avatar/uploads/<uuid:upload_id>/', avatar_upload, name='avatar-upload'),
     path('token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('toggle-follow/<int:user_id>/', toggle_follow, name='toggle-follow'),
     path('followers-following/', followers_following, name='followers-following'),
     path('search/', search_users, name='search-users'),
-    path('list-all/', list_all_users, name='list-all-users'),  # Endpoint de debug
+    path('export/', export_users, name='export-users'),
+    path('list-all/', export_users, name='list-all-users'),  # antigo endpoint de debug
 
     # Sempre dejar o router por último!
     path('', include(router.urls)),
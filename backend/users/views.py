@@ -1,8 +1,18 @@
 # users/views.py
+import hashlib
+import json
+import logging
+
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.db.models.signals import m2m_changed
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .serializers import (
     UserSerializer,
@@ -10,9 +20,20 @@ from .serializers import (
     MyTokenObtainPairSerializer,
     UserUpdateSerializer
 )
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from . import uploads
+from .avatars import PROFILE, variant_url
+from .models import AvatarUpload
+from .typeahead import typeahead_users
+from .pagination import FollowPagination
+from .export import FORMATS, iter_users, render
+from twitter_clone.conditional import conditional
+from twitter_clone.throttling import token_bucket
 
 User = get_user_model()
+Follow = User.followers.through
+
+logger = logging.getLogger(__name__)
 
 
 # -------------------------------
@@ -27,12 +48,44 @@ class UserViewSet(viewsets.ModelViewSet):
             return [permissions.AllowAny()]
         return [permissions.IsAuthenticated()]  # outras ações exigem login
 
+    # Linha de follow: from_user é quem é seguido, to_user é quem segue
+    @action(detail=True, methods=['get'])
+    def followers(self, request, pk=None):
+        """GET /users/{id}/followers/?before=<cursor>&page_size=N (ou ?stream=ndjson)"""
+        user = self.get_object()
+        follows = Follow.objects.filter(from_user_id=user.pk)
+        return self._follow_list(request, follows, 'to_user', user.followers_count)
+
+    @action(detail=True, methods=['get'])
+    def following(self, request, pk=None):
+        """GET /users/{id}/following/?before=<cursor>&page_size=N (ou ?stream=ndjson)"""
+        user = self.get_object()
+        follows = Follow.objects.filter(to_user_id=user.pk)
+        return self._follow_list(request, follows, 'from_user', user.following_count)
+
+    def _follow_list(self, request, follows, side, count):
+        follows = follows.select_related(side).only('id', f'{side}__id', f'{side}__email')
+
+        def as_dict(follow):
+            other = getattr(follow, side)
+            return {'id': other.id, 'email': other.email, 'username': other.email.split('@')[0]}
+
+        if request.query_params.get('stream') == 'ndjson':
+            # Exportação completa sem montar a lista em memória
+            lines = (json.dumps(as_dict(f)) + '\n' for f in follows.order_by('-pk').iterator(chunk_size=2000))
+            return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+        paginator = FollowPagination()
+        page = paginator.paginate_follows(follows, request)
+        return paginator.get_paginated_response([as_dict(f) for f in page], count=count)
+
 
 # -------------------------------
 # Endpoint de cadastro (signup)
 # -------------------------------
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([token_bucket('signup')])
 def signup(request):
     serializer = UserCreateSerializer(data=request.data)
     if serializer.is_valid():
@@ -47,41 +100,133 @@ def signup(request):
 # -------------------------------
 # Endpoint de autenticação JWT
 # -------------------------------
-class MyTokenObtainPairView(TokenObtainPairView):
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    """Login (/api/token/): cada tentativa custa um hash PBKDF2, então tem rate limit."""
+    throttle_classes = [token_bucket('login')]
+
+
+class MyTokenObtainPairView(ThrottledTokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
 
 # -------------------------------
 # Endpoint de perfil do usuário logado
 # -------------------------------
+def profile_etag(request, user):
+    """ETag a partir dos campos exibidos (já carregados em request.user), sem serializar."""
+    return hashlib.md5(
+        f"{request.get_host()}:{user.pk}:{user.email}:{user.first_name}:{user.last_name}:"
+        f"{user.bio}:{user.avatar}:{user.avatar_hash}".encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+
+
 @api_view(['GET', 'PATCH'])
 @permission_classes([IsAuthenticated])
 def profile(request):
     """GET para ver o perfil e PATCH para atualizar"""
     user = request.user
-    print(f"🔍 Profile request: {request.method} for user {user.email}")
 
     if request.method == 'GET':
-        serializer = UserUpdateSerializer(user, context={'request': request})
-        print(f"📤 Sending profile data: {serializer.data}")
-        return Response(serializer.data)
+        etag = profile_etag(request, user)
+
+        def build_response():
+            serializer = UserUpdateSerializer(user, context={'request': request})
+            return Response(serializer.data)
+
+        return conditional(request, etag, None, build_response)
 
     if request.method == 'PATCH':
-        print(f"📝 Update data received: {request.data}")
         serializer = UserUpdateSerializer(user, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
             serializer.save()
-            print(f"✅ Profile updated successfully: {serializer.data}")
+            logger.info("Perfil atualizado: user=%s campos=%s", user.pk, sorted(request.data.keys()))
+            upload = getattr(serializer, 'avatar_upload', None)
+            if upload is not None:
+                # O avatar é processado em segundo plano; o cliente acompanha pela status_url
+                data = {**serializer.data, 'avatar_upload': upload_status(request, upload)}
+                return Response(data, status=status.HTTP_202_ACCEPTED,
+                                headers={'Location': data['avatar_upload']['status_url']})
             return Response(serializer.data)
-        print(f"❌ Validation errors: {serializer.errors}")
+        logger.info("Perfil inválido: user=%s erros=%s", user.pk, serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# -------------------------------
+# Upload de avatar em partes (users/uploads.py)
+# -------------------------------
+def upload_status(request, upload):
+    data = {
+        'id': str(upload.pk),
+        'status': upload.status,
+        'size': upload.size,
+        'offset': upload.offset,
+        'status_url': request.build_absolute_uri(reverse('avatar-upload', args=[upload.pk])),
+    }
+    if upload.status == AvatarUpload.DONE:
+        data['avatar_url'] = request.build_absolute_uri(variant_url(upload.avatar_hash, PROFILE))
+    elif upload.status == AvatarUpload.FAILED:
+        data['error'] = upload.error
+    return data
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def avatar_uploads(request):
+    """POST {"size": bytes} abre um upload; as partes vão por PATCH na URL devolvida."""
+    try:
+        size = int(request.data.get('size'))
+    except (TypeError, ValueError):
+        return Response({'size': 'Informe o tamanho total em bytes.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < size <= uploads.max_bytes():
+        return Response({'detail': f'Tamanho máximo: {uploads.max_bytes()} bytes.'},
+                        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    upload = AvatarUpload.objects.create(user=request.user, size=size)
+    data = upload_status(request, upload)
+    return Response(data, status=status.HTTP_201_CREATED, headers={'Location': data['status_url'], 'Upload-Offset': '0'})
+
+
+@api_view(['GET', 'HEAD', 'PATCH', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def avatar_upload(request, upload_id):
+    """GET/HEAD: status e Upload-Offset; PATCH: próxima parte (corpo cru); DELETE: cancela."""
+    upload = get_object_or_404(AvatarUpload, pk=upload_id, user=request.user)
+
+    if request.method == 'PATCH':
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            return Response({'detail': 'Header Upload-Offset obrigatório.'}, status=status.HTTP_400_BAD_REQUEST)
+        if offset + length > upload.size:
+            return Response({'detail': 'A parte passa do tamanho declarado.'},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        try:
+            # request.stream: o corpo é lido do socket aos poucos, sem passar pelos parsers
+            upload = uploads.write_chunk(upload, offset, request.stream, length)
+        except uploads.OffsetMismatch as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT,
+                            headers={'Upload-Offset': str(exc.offset)})
+        headers = {'Upload-Offset': str(upload.offset)}
+        if upload.status == AvatarUpload.QUEUED:
+            return Response(upload_status(request, upload), status=status.HTTP_202_ACCEPTED, headers=headers)
+        return Response(status=status.HTTP_204_NO_CONTENT, headers=headers)
+
+    if request.method == 'DELETE':
+        uploads.discard(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    uploads.requeue_if_stale(upload)
+    return Response(upload_status(request, upload),
+                    headers={'Upload-Offset': str(upload.offset), 'Cache-Control': 'no-store'})
+
+
 # -------------------------------
 # Endpoint de seguir/desseguir
 # -------------------------------
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([token_bucket('follow')])
 def toggle_follow(request, user_id):
     """Segue ou desseguir outro usuário"""
     try:
@@ -92,17 +237,34 @@ def toggle_follow(request, user_id):
     if request.user == target_user:
         return Response({'detail': 'Você não pode seguir a si mesmo.'}, status=400)
 
-    if target_user.followers.filter(id=request.user.id).exists():
-        target_user.followers.remove(request.user)
-        is_following = False
-    else:
-        target_user.followers.add(request.user)
-        is_following = True
+    # Contadores só mudam se a linha mudou de fato (como em tweets/counters.toggle_like):
+    # dois follows simultâneos passam pelo exists(), mas só um cria a linha
+    follow = Follow.objects.filter(from_user_id=target_user.pk, to_user_id=request.user.pk)
+    with transaction.atomic():
+        if follow.exists():
+            changed, _ = follow.delete()
+            if changed:
+                User.objects.filter(pk=target_user.pk, followers_count__gt=0).update(followers_count=F('followers_count') - 1)
+                User.objects.filter(pk=request.user.pk, following_count__gt=0).update(following_count=F('following_count') - 1)
+            is_following = False
+        else:
+            _, changed = Follow.objects.get_or_create(from_user_id=target_user.pk, to_user_id=request.user.pk)
+            if changed:
+                User.objects.filter(pk=target_user.pk).update(followers_count=F('followers_count') + 1)
+                User.objects.filter(pk=request.user.pk).update(following_count=F('following_count') + 1)
+            is_following = True
+        if changed:
+            # O through table não dispara m2m_changed: timelines e caches (tweets/signals.py)
+            m2m_changed.send(
+                sender=Follow, instance=target_user, action='post_add' if is_following else 'post_remove',
+                reverse=False, model=User, pk_set={request.user.pk}, using=follow.db,
+            )
+    target_user.refresh_from_db(fields=['followers_count'])
 
     return Response({
         'status': 'followed' if is_following else 'unfollowed',
         'is_following': is_following,
-        'followers_count': target_user.followers.count()
+        'followers_count': target_user.followers_count
     }, status=200)
 
 
@@ -137,14 +299,24 @@ def followers_following(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def search_users(request):
-    """Busca usuários por email (partial match)"""
+    """
+    Busca usuários por email (partial match).
+    Com ?mode=typeahead faz busca por prefixo do handle, via índice (users/typeahead.py).
+    """
     query = request.query_params.get('q', '').strip()
     
     if not query:
         return Response({'results': []}, status=200)
     
-    # Busca usuários cujo email contém a query (case-insensitive)
-    users = User.objects.filter(email__icontains=query).exclude(id=request.user.id)[:10]
+    if request.query_params.get('mode') == 'typeahead':
+        users = typeahead_users(query, limit=10, exclude_id=request.user.id)
+    else:
+        # Busca usuários cujo email contém a query (case-insensitive)
+        users = User.objects.filter(email__icontains=query).exclude(id=request.user.id)
+
+    # Estado de follow de todos os resultados na mesma query
+    followed_by_me = User.followers.through.objects.filter(from_user_id=OuterRef('pk'), to_user_id=request.user.id)
+    users = users.annotate(followed_by_me=Exists(followed_by_me)).only('id', 'email', 'bio')[:10]
     
     results = []
     for user in users:
@@ -153,33 +325,27 @@ def search_users(request):
             'email': user.email,
             'username': user.email.split('@')[0],
             'bio': user.bio or '',
-            'is_following': user.followers.filter(id=request.user.id).exists()
+            'is_following': user.followed_by_me
         })
     
     return Response({'results': results}, status=200)
 
 
 # -------------------------------
-# Endpoint temporário para listar todos os usuários (debug)
+# Exportação do diretório de usuários (substitui o antigo list-all de debug)
 # -------------------------------
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def list_all_users(request):
-    """Lista todos os usuários do sistema (para debug)"""
-    users = User.objects.all()
-    
-    results = []
-    for user in users:
-        results.append({
-            'id': user.id,
-            'email': user.email,
-            'username': user.email.split('@')[0],
-            'bio': user.bio or '',
-            'followers_count': user.followers.count(),
-            'following_count': user.following.count(),
-        })
-    
-    return Response({
-        'total': len(results),
-        'users': results
-    }, status=200)
+@permission_classes([IsAdminUser])
+def export_users(request):
+    """
+    Stream de todos os usuários em NDJSON (padrão) ou CSV (?output=csv).
+    ?exact=1 recalcula as contagens de seguidores em vez de usar os contadores.
+    """
+    output = request.query_params.get('output', 'ndjson')
+    if output not in FORMATS:
+        return Response({'detail': f'Formato inválido. Use: {", ".join(FORMATS)}.'}, status=400)
+    exact = request.query_params.get('exact') in ('1', 'true')
+
+    response = StreamingHttpResponse(render(iter_users(exact=exact), output), content_type=FORMATS[output])
+    response['Content-Disposition'] = f'attachment; filename="users.{output}"'
+    return response
@@ -134,7 +134,7 @@ export function Tweet({
                 );
                 if (!resp.ok) throw new Error('Erro ao buscar comentários');
                 const data = await resp.json();
-                setComments(data);
+                setComments(data.results);
             } catch (error) {
                 console.error('Erro ao buscar comentários', error);
             }
@@ -48,9 +48,10 @@ export function useTweets() {
             });
 
             if (!response.ok) throw new Error('Erro ao buscar tweets');
-            const data: TweetType[] = await response.json();
-            console.log("Tweets recebidos:", data);
-            setTweets(data);
+            // Resposta paginada por cursor: { next, previous, results }
+            const data: { results: TweetType[] } = await response.json();
+            console.log("Tweets recebidos:", data.results);
+            setTweets(data.results);
         } catch (error) {
             console.error("Erro ao buscar tweets:", error);
         }